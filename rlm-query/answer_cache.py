@@ -0,0 +1,172 @@
+"""
+answer_cache.py — Persistent cache of rlm-query answers.
+
+The same question against the same document with the same settings gives a
+full multi-iteration RLM run every time. Answers are stored on disk with the
+usage of the run that produced them and returned without calling the model.
+
+Key: SHA-256 over
+    document content hash (from DocCache, so an unchanged file is not re-read)
+    normalised question (Unicode NFKC, case-folded, whitespace collapsed,
+                         trailing ?/./! dropped)
+    model, max_iterations, max_depth, plus any variant (e.g. retrieval settings)
+
+Entries expire after a TTL; the oldest-used entries are evicted once the
+cache exceeds its size limit.
+
+Location:   ~/.cache/rlm-query/answers (override the root with RLM_CACHE_DIR)
+TTL:        7 days (override with RLM_ANSWER_TTL_HOURS; 0 = never expire)
+Size limit: 64 MB (override with RLM_ANSWER_CACHE_MAX_MB)
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+import unicodedata
+from pathlib import Path
+
+ANSWER_CACHE_VERSION = "1"
+
+CACHE_DIR = Path(os.environ.get("RLM_CACHE_DIR", Path.home() / ".cache" / "rlm-query")) / "answers"
+TTL_SECONDS = float(os.environ.get("RLM_ANSWER_TTL_HOURS", "168")) * 3600
+MAX_CACHE_BYTES = int(float(os.environ.get("RLM_ANSWER_CACHE_MAX_MB", "64")) * 1024 * 1024)
+
+MANIFEST_NAME = "manifest.json"
+
+_lock = threading.Lock()
+
+
+def normalize_question(question: str) -> str:
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip("?.! ")
+
+
+def context_variant(retrieve: int | None = None, chunk_chars: int | None = None,
+                    byte_range: tuple[int, int | None] | None = None,
+                    summary_tree: bool = False) -> str:
+    """The answer-key variant for the context settings of a single-file question."""
+    variant = f"bm25:k{retrieve}:c{chunk_chars}" if retrieve else ""
+    if byte_range:
+        variant += f"bytes:{byte_range[0]}:{byte_range[1]}"
+    if summary_tree:
+        variant += "tree"
+    return variant
+
+
+def answer_key(doc_hash: str, question: str, model: str, max_iterations: int,
+               max_depth: int, variant: str = "") -> str:
+    """``variant`` distinguishes runs that see different context for the same question."""
+    fields = [ANSWER_CACHE_VERSION, doc_hash, normalize_question(question), model,
+              max_iterations, max_depth]
+    if variant:
+        fields.append(variant)
+    material = json.dumps(fields)
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class AnswerCache:
+    """On-disk answer store with a TTL and LRU size eviction."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, ttl: float = TTL_SECONDS,
+                 max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.manifest_path = self.cache_dir / MANIFEST_NAME
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        manifest.setdefault("entries", {})  # key -> {"bytes", "created", "last_access"}
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        tmp_path.replace(self.manifest_path)
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def _expired(self, entry: dict, now: float) -> bool:
+        return self.ttl > 0 and now - entry["created"] > self.ttl
+
+    def get(self, key: str) -> dict | None:
+        """Return the stored record for ``key``, or None if missing or expired."""
+        now = time.time()
+        with _lock:
+            manifest = self._load_manifest()
+            entry = manifest["entries"].get(key)
+            if entry is None:
+                return None
+            if self._expired(entry, now):
+                self._entry_path(key).unlink(missing_ok=True)
+                del manifest["entries"][key]
+                self._save_manifest(manifest)
+                return None
+            try:
+                with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                    record = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError):
+                del manifest["entries"][key]
+                self._save_manifest(manifest)
+                return None
+            entry["last_access"] = now
+            self._save_manifest(manifest)
+        return record
+
+    def put(self, key: str, record: dict) -> None:
+        """Store a JSON-serialisable record (adds "cached_at") and evict if over limits."""
+        now = time.time()
+        record = {**record, "cached_at": now}
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        entry_path = self._entry_path(key)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(record, f, ensure_ascii=False)
+        tmp_path.replace(entry_path)
+
+        with _lock:
+            manifest = self._load_manifest()
+            manifest["entries"][key] = {
+                "bytes": entry_path.stat().st_size,
+                "created": now,
+                "last_access": now,
+            }
+            self._evict(manifest, now, keep=key)
+            self._save_manifest(manifest)
+
+    def _evict(self, manifest: dict, now: float, keep: str) -> None:
+        """Drop expired entries, then least-recently-used ones until the total size fits."""
+        entries = manifest["entries"]
+        for key in [k for k, e in entries.items() if k != keep and self._expired(e, now)]:
+            self._entry_path(key).unlink(missing_ok=True)
+            del entries[key]
+
+        total = sum(e["bytes"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]["bytes"]
+            self._entry_path(key).unlink(missing_ok=True)
+            del entries[key]
+
+    def clear(self) -> int:
+        """Remove every cached answer. Returns the number of bytes freed."""
+        if not self.cache_dir.exists():
+            return 0
+        freed = sum(p.stat().st_size for p in self.cache_dir.rglob("*") if p.is_file())
+        shutil.rmtree(self.cache_dir)
+        return freed
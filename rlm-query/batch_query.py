@@ -0,0 +1,215 @@
+"""
+batch_query.py — Ask many questions about one document in a single rlm-query run.
+
+The document is loaded and wrapped once, then each question gets its own
+RLM.completion() on a pool of worker processes (bounded by ``concurrency``).
+Answers are written as JSON Lines in question order, each line flushed as
+soon as it and every earlier answer are done.
+
+Processes rather than threads: rlm's LocalREPL swaps sys.stdout/sys.stderr
+and chdirs into its temp dir while running model code, which is process-wide
+state that concurrent completions in one process would trample.
+
+Question file: one question per line; blank lines and lines starting with #
+are skipped.
+"""
+
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, TextIO
+
+import prompt_cache
+from answer_cache import AnswerCache
+
+DEFAULT_CONCURRENCY = 4
+
+# Per-worker state, set once by init_worker so the document is sent to each
+# worker process once rather than with every question
+_document: str | None = None
+_rlm_kwargs: dict = {}
+
+
+def document_block(file_name: str, file_content: str) -> str:
+    return f"=== DOCUMENT: {file_name} ===\n{file_content}\n=== END DOCUMENT ==="
+
+
+def excerpt_name(file_name: str, stats: dict) -> str:
+    """Document name for a retrieval excerpt, so the model knows it is partial."""
+    return f"{file_name} (excerpts: {stats['chunks_sent']} of {stats['chunks_total']} chunks)"
+
+
+def with_question(document: str, question: str) -> str:
+    """The RLM context for one question: the document block, then the question."""
+    return f"{document}\n\nQuestion: {question}"
+
+
+def document_prompt(file_name: str, file_content: str, question: str) -> str:
+    """document_block() + with_question() in a single copy of the (possibly huge) text."""
+    return "".join((
+        f"=== DOCUMENT: {file_name} ===\n",
+        file_content,
+        f"\n=== END DOCUMENT ===\n\nQuestion: {question}",
+    ))
+
+
+def read_questions(path: str) -> list[str]:
+    with open(path, "r", encoding="utf-8") as f:
+        lines = (line.strip() for line in f)
+        return [line for line in lines if line and not line.startswith("#")]
+
+
+def init_worker(document: str | None, rlm_kwargs: dict, use_prompt_cache: bool) -> None:
+    """Process-pool initializer shared with corpus_query (which passes no document)."""
+    global _document, _rlm_kwargs
+    _document = document
+    _rlm_kwargs = rlm_kwargs
+    import rlm  # noqa: F401  (pay the import once per worker, not per question)
+    if use_prompt_cache:
+        prompt_cache.install()
+
+
+def worker_model():
+    """A fresh RLM built from the settings init_worker received."""
+    from rlm import RLM
+
+    return RLM(**_rlm_kwargs)
+
+
+def result_fields(result) -> dict:
+    """Answer, timing and usage of an RLMChatCompletion as JSON-ready fields."""
+    fields = {"answer": result.response, "execution_time": round(result.execution_time, 3)}
+    if result.usage_summary:
+        usage = result.usage_summary
+        fields["input_tokens"] = usage.total_input_tokens
+        fields["output_tokens"] = usage.total_output_tokens
+        fields["cache_write_tokens"], fields["cache_read_tokens"] = prompt_cache.cache_tokens(usage)
+        fields["cost"] = usage.total_cost
+        fields["usage"] = usage.to_dict()
+    return fields
+
+
+def _answer(index: int, question: str, document: str | None = None) -> dict:
+    """Run one completion in a worker process; errors become part of the record.
+
+    ``document`` overrides the worker's shared document (per-question retrieval).
+    """
+    record = {"index": index, "question": question, "answer": None, "error": None}
+    started = time.perf_counter()
+    try:
+        model = worker_model()
+        context = with_question(document or _document, question)
+        result = model.completion(context, root_prompt=question)
+        record.update(result_fields(result))
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def run_batch(
+    file_name: str,
+    file_content: str,
+    questions: list[str],
+    rlm_kwargs: dict,
+    out: TextIO,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    use_prompt_cache: bool = True,
+    answers: AnswerCache | None = None,
+    answer_key: Callable[[str], str] | None = None,
+    select: Callable[[str], tuple[str, dict]] | None = None,
+    document: str | None = None,
+) -> list[dict]:
+    """Answer ``questions`` concurrently, writing JSONL records to ``out`` in order.
+
+    ``rlm_kwargs`` are passed to RLM() in every worker; ``use_prompt_cache`` installs
+    the caching Anthropic client there (see prompt_cache.py). With ``answers`` and
+    ``answer_key`` (question -> cache key), cached answers are written without a
+    model run (marked "cached": true) and new ones are stored. With ``select``
+    (question -> (excerpt text, retrieval stats), see retrieval.py) each question
+    gets its own excerpts instead of the whole document. ``document`` replaces
+    document_block(file_name, file_content), e.g. with a summary tree in front
+    (see summary_tree.py). Returns the records.
+    """
+    if select:
+        document = None
+    elif document is None:
+        document = document_block(file_name, file_content)
+
+    hits = {}
+    if answers:
+        for i, question in enumerate(questions):
+            cached = answers.get(answer_key(question))
+            if cached is not None:
+                hits[i] = {"index": i, "question": question, **cached, "error": None,
+                           "cached": True, "seconds": 0.0}
+    pending = [i for i in range(len(questions)) if i not in hits]
+
+    workers = max(1, min(concurrency, len(pending)))
+    print(
+        f"Answering {len(questions)} questions about {file_name} "
+        f"({len(hits)} cached, {workers} at a time)...",
+        file=sys.stderr,
+    )
+
+    records = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(document, rlm_kwargs, use_prompt_cache),
+    ) as pool:
+        futures = {}
+        retrieval_stats = {}
+        for i in pending:
+            excerpt = None
+            if select:
+                text, retrieval_stats[i] = select(questions[i])
+                excerpt = document_block(excerpt_name(file_name, retrieval_stats[i]), text)
+            futures[i] = pool.submit(_answer, i, questions[i], excerpt)
+        try:
+            for i in range(len(questions)):
+                if i in hits:
+                    record = hits[i]
+                else:
+                    record = futures[i].result()
+                    if i in retrieval_stats:
+                        record["retrieval"] = retrieval_stats[i]
+                    if answers and not record["error"]:
+                        answers.put(answer_key(questions[i]), {
+                            k: v for k, v in record.items()
+                            if k not in ("index", "question", "seconds")
+                        })
+                records.append(record)
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                if record["error"]:
+                    status = f"error: {record['error']}"
+                else:
+                    status = "cached" if record.get("cached") else "ok"
+                print(
+                    f"  [{i + 1}/{len(questions)}] {status} ({record['seconds']:.1f}s)",
+                    file=sys.stderr,
+                )
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    elapsed = time.perf_counter() - started
+    failed = sum(1 for r in records if r["error"])
+    ran = [r for r in records if not r.get("cached")]
+    input_tokens = sum(r.get("input_tokens", 0) for r in ran)
+    output_tokens = sum(r.get("output_tokens", 0) for r in ran)
+    cache_write = sum(r.get("cache_write_tokens", 0) for r in ran)
+    cache_read = sum(r.get("cache_read_tokens", 0) for r in ran)
+    print("\n--- Batch ---", file=sys.stderr)
+    print(f"  Answered:      {len(records) - failed}/{len(records)} "
+          f"({len(hits)} from answer cache)", file=sys.stderr)
+    print(f"  Input tokens:  {input_tokens:,}", file=sys.stderr)
+    print(f"  Output tokens: {output_tokens:,}", file=sys.stderr)
+    if cache_write or cache_read:
+        print(f"  Cache write:   {cache_write:,}", file=sys.stderr)
+        print(f"  Cache read:    {cache_read:,}", file=sys.stderr)
+    print(f"  Wall time:     {elapsed:.1f}s", file=sys.stderr)
+    return records
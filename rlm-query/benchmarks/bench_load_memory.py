@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+bench_load_memory.py — Peak RSS of loading a text file into an rlm-query prompt.
+
+Generates log files of increasing size (ASCII lines with one latin-1 byte near
+the end, so the old loader's UTF-8 read fails after decoding almost all of it)
+and measures, in a fresh process per run, the peak RSS above the process
+baseline of:
+
+    legacy  the previous loader: read as UTF-8, re-read as latin-1 on failure,
+            then one f-string prompt while the text is still referenced
+    mmap    file_loader.read_document() + batch_query.document_prompt(),
+            dropping the text once the prompt exists
+    tail    file_loader.read_text() of the last 10% of the file (--tail)
+
+Linux/macOS only (uses resource.getrusage).
+
+Usage:
+    python benchmarks/bench_load_memory.py
+    python benchmarks/bench_load_memory.py --sizes 64 256 1024
+    python benchmarks/bench_load_memory.py --json results/load_memory.json
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+LINE = "2024-05-01T12:00:00Z INFO request handled path=/api/v1/items status=200 ms=12\n"
+
+# Run in a child process: prints baseline and peak RSS in bytes
+_MEASURE = r"""
+import os, resource, sys
+sys.path.insert(0, {root!r})
+path, method = sys.argv[1], sys.argv[2]
+
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+def peak():
+    kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb if sys.platform == "darwin" else kb * 1024
+
+import batch_query, file_loader
+baseline = rss() if os.path.exists("/proc/self/statm") else peak()
+
+if method == "legacy":
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+    except UnicodeDecodeError:
+        with open(path, "r", encoding="latin-1") as f:
+            content = f.read()
+    prompt = (
+        f"=== DOCUMENT: bench.log ===\n"
+        f"{{content}}\n"
+        f"=== END DOCUMENT ===\n\n"
+        f"Question: what failed?"
+    )
+elif method == "mmap":
+    content = file_loader.read_document(path)
+    prompt = batch_query.document_prompt("bench.log", content, "what failed?")
+    del content
+elif method == "tail":
+    size = os.path.getsize(path)
+    content, _ = file_loader.read_text(path, (-(size // 10), None))
+    prompt = batch_query.document_prompt("bench.log", content, "what failed?")
+    del content
+print(baseline, peak(), len(prompt))
+"""
+
+METHODS = ("legacy", "mmap", "tail")
+
+
+def generate_log(path: str, size_mb: int) -> None:
+    """ASCII log lines up to ``size_mb`` MB, with one latin-1 byte near the end."""
+    target = size_mb * 1024 * 1024
+    block = (LINE * 4096).encode("ascii")
+    with open(path, "wb") as f:
+        written = 0
+        while written + len(block) < target:
+            f.write(block)
+            written += len(block)
+        f.write(b"2024-05-01T12:00:01Z ERROR caf\xe9 upstream timeout\n")
+
+
+def measure(path: str, method: str) -> dict:
+    code = _MEASURE.format(root=str(ROOT))
+    out = subprocess.run(
+        [sys.executable, "-c", code, path, method], capture_output=True, text=True, check=True
+    ).stdout.split()
+    baseline, peak, prompt_chars = map(int, out)
+    return {"peak_mb": round((peak - baseline) / 1024 / 1024, 1), "prompt_chars": prompt_chars}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark peak RSS of loading large text files.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[16, 64, 256],
+                        help="File sizes in MB (default: 16 64 256)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size_mb in args.sizes:
+            path = os.path.join(tmp, f"bench-{size_mb}.log")
+            print(f"Generating {size_mb} MB log...", file=sys.stderr)
+            generate_log(path, size_mb)
+            row = {"file_mb": size_mb}
+            for method in METHODS:
+                row[method] = measure(path, method)
+            rows.append(row)
+            os.unlink(path)
+
+    print(f"\nPeak RSS above baseline (MB), and as a multiple of the file size")
+    print(f"{'file MB':>8} " + " ".join(f"{m:>16}" for m in METHODS))
+    for row in rows:
+        cells = []
+        for method in METHODS:
+            peak = row[method]["peak_mb"]
+            cells.append(f"{peak:>9.1f} ({peak / row['file_mb']:.2f}x)")
+        print(f"{row['file_mb']:>8} " + " ".join(f"{c:>16}" for c in cells))
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"benchmark": "load_memory", "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+bench_overhead.py — rlm-query's own cost per input size, without a real model.
+
+Generates synthetic inputs and runs the full CLI on each
+(rlm-query.py FILE "question" --no-server --no-cache --trace ...) against
+fake_anthropic.py, whose replies are deterministic and whose latency is set
+with --latency (default 0, so all of the time is rlm-query's). Per input it
+reports:
+
+    wall        process start to exit
+    steps       load file (read / PDF extraction), build prompt, rlm setup,
+                the whole rlm completion and the REPL time within it -- from
+                the run's --trace file
+    model       seconds spent waiting on the fake API
+    peak RSS    of the rlm-query process (os.wait4)
+    sent        request bytes the API received, and the number of requests
+
+Inputs:
+
+    txt   prose paragraphs
+    log   timestamped log lines
+    pdf   pages of dense text (bench_pdf_extract.generate_pdf); PDFs are
+          generated page by page, so sizes above --max-pdf-mb are skipped
+
+Results are written as JSON (--json) with the git commit they were measured
+at; --compare OLD.json prints the change against an earlier run, so a
+regression between commits shows up as a percentage.
+
+Linux/macOS only (os.wait4).
+
+Usage:
+    python benchmarks/bench_overhead.py                         # 1 MB to 1 GB
+    python benchmarks/bench_overhead.py --sizes 1 16 --kinds txt log
+    python benchmarks/bench_overhead.py --latency 0.2 --json results/overhead.json
+    python benchmarks/bench_overhead.py --json new.json --compare results/overhead.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+KINDS = ("txt", "log", "pdf")
+QUESTION = "Which upstream error is reported, and when?"
+STEPS = ("load file", "build prompt", "rlm setup", "rlm completion", "repl")
+COMPARED = ("wall_seconds", "peak_rss_mb", "bytes_sent")
+
+PARAGRAPH = (
+    "The committee reviewed the quarterly schedule of rates and noted that the "
+    "adjustments for outpatient services remain within the limits set last year. "
+    "Members asked for a breakdown by region before the next meeting, and the "
+    "finance office agreed to circulate it together with the revised forecast.\n\n"
+)
+LOG_LINE = "2024-05-01T12:00:00Z INFO request handled path=/api/v1/items status=200 ms=12\n"
+NEEDLE = "2024-05-01T12:00:01Z ERROR upstream timeout from billing-service\n"
+
+
+def generate_text(path: str, size_mb: float, unit: str) -> None:
+    """``unit`` repeated up to ``size_mb`` MB, with NEEDLE as the last line."""
+    target = int(size_mb * 1024 * 1024)
+    block = (unit * max(1, (1 << 20) // len(unit))).encode("utf-8")
+    with open(path, "wb") as f:
+        written = 0
+        while written + len(block) < target:
+            f.write(block)
+            written += len(block)
+        rest = target - written - len(NEEDLE)
+        f.write(block[:max(0, rest)])
+        f.write(NEEDLE.encode("utf-8"))
+
+
+def generate_pdf(path: str, size_mb: float) -> None:
+    """A text PDF of roughly ``size_mb`` MB (page count estimated from a sample)."""
+    from bench_pdf_extract import generate_pdf as generate_pages
+
+    sample = path + ".sample.pdf"
+    generate_pages(sample, 100)
+    bytes_per_page = os.path.getsize(sample) / 100
+    os.unlink(sample)
+    generate_pages(path, max(1, round(size_mb * 1024 * 1024 / bytes_per_page)))
+
+
+def generate(path: str, kind: str, size_mb: float) -> None:
+    if kind == "pdf":
+        generate_pdf(path, size_mb)
+    else:
+        generate_text(path, size_mb, PARAGRAPH if kind == "txt" else LOG_LINE)
+
+
+def run_query(path: str, env: dict, trace_path: str, backend) -> dict:
+    """One CLI run: wall time, peak RSS, bytes sent and the trace's step times."""
+    command = [sys.executable, str(ROOT / "rlm-query.py"), path, QUESTION,
+               "--no-server", "--no-cache", "--trace", trace_path]
+    received, requests = backend.stats["bytes_received"], len(backend.requests)
+    started = time.perf_counter()
+    process = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL,
+                               stderr=subprocess.PIPE)
+    stderr = process.stderr.read()
+    _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - started
+    process.returncode = os.waitstatus_to_exitcode(status)
+    if process.returncode:
+        raise RuntimeError(f"rlm-query failed on {path}:\n{stderr.decode(errors='replace')}")
+
+    peak = usage.ru_maxrss if sys.platform == "darwin" else usage.ru_maxrss * 1024
+    with open(trace_path, encoding="utf-8") as f:
+        totals = json.load(f)["totals"]
+    steps = totals["seconds_by_step"]
+    model = sum(depth["seconds"] for depth in totals["model_calls_by_depth"].values())
+    return {
+        "wall_seconds": round(wall, 4),
+        "model_seconds": round(model, 4),
+        "overhead_seconds": round(wall - model, 4),
+        "steps": {name: round(steps.get(name, 0.0), 4) for name in STEPS},
+        "peak_rss_mb": round(peak / 1024 / 1024, 1),
+        "bytes_sent": backend.stats["bytes_received"] - received,
+        "requests": len(backend.requests) - requests,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(rows: list[dict], baseline: dict | None) -> None:
+    print(f"\n{'input':>12} {'MB':>8} {'wall s':>8} {'model s':>8} {'load s':>8} "
+          f"{'prompt s':>8} {'setup s':>8} {'rlm s':>8} {'repl s':>8} {'RSS MB':>8} "
+          f"{'sent KB':>9} {'reqs':>5}")
+    for row in rows:
+        steps = row["steps"]
+        print(f"{row['kind']:>12} {row['file_mb']:>8.1f} {row['wall_seconds']:>8.2f} "
+              f"{row['model_seconds']:>8.2f} {steps['load file']:>8.2f} "
+              f"{steps['build prompt']:>8.2f} {steps['rlm setup']:>8.2f} "
+              f"{steps['rlm completion']:>8.2f} {steps['repl']:>8.2f} "
+              f"{row['peak_rss_mb']:>8.1f} {row['bytes_sent'] / 1024:>9.1f} {row['requests']:>5}")
+        old = (baseline or {}).get((row["kind"], row["size_mb"]))
+        if old:
+            changes = []
+            for key in COMPARED:
+                if old.get(key):
+                    changes.append(f"{key} {100 * (row[key] - old[key]) / old[key]:+.1f}%")
+            print(f"{'':>12} vs baseline: {', '.join(changes)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark rlm-query overhead per input size.")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 16, 128, 1024],
+                        help="Input sizes in MB (default: 1 16 128 1024)")
+    parser.add_argument("--kinds", nargs="+", choices=KINDS, default=list(KINDS),
+                        help="Input kinds (default: txt log pdf)")
+    parser.add_argument("--max-pdf-mb", type=float, default=16,
+                        help="Skip PDFs larger than this; they take minutes to generate "
+                        "(default: 16)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Fake model latency per request in seconds (default: 0)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", metavar="FILE",
+                        help="Earlier --json results to print changes against")
+    args = parser.parse_args()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {(r["kind"], r["size_mb"]): r for r in json.load(f)["results"]}
+
+    backend = serve_in_thread(latency=args.latency)
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {
+            **os.environ,
+            "ANTHROPIC_BASE_URL": backend.url,
+            "ANTHROPIC_API_KEY": "fake",
+            "RLM_CACHE_DIR": os.path.join(tmp, "cache"),
+        }
+        for kind in args.kinds:
+            for size_mb in args.sizes:
+                if kind == "pdf" and size_mb > args.max_pdf_mb:
+                    print(f"Skipping {size_mb:g} MB pdf (above --max-pdf-mb)", file=sys.stderr)
+                    continue
+                path = os.path.join(tmp, f"bench-{size_mb:g}mb.{kind}")
+                print(f"Generating {size_mb:g} MB {kind}...", file=sys.stderr)
+                generate(path, kind, size_mb)
+                print(f"Querying {size_mb:g} MB {kind}...", file=sys.stderr)
+                row = {"kind": kind, "size_mb": size_mb,
+                       "file_mb": round(os.path.getsize(path) / 1024 / 1024, 2)}
+                row.update(run_query(path, env, os.path.join(tmp, "trace.json"), backend))
+                rows.append(row)
+                os.unlink(path)
+    backend.shutdown()
+
+    print_table(rows, baseline)
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "overhead",
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "latency": args.latency,
+                "question": QUESTION,
+                "results": rows,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+bench_pdf_extract.py — PDF extraction scaling with worker count.
+
+Generates a multi-thousand-page text PDF and times pdf_extract.extract_text_parts()
+with increasing worker counts, checking every run produces identical text.
+
+Usage:
+    python benchmarks/bench_pdf_extract.py
+    python benchmarks/bench_pdf_extract.py --pages 5000 --workers 1 2 4 8
+    python benchmarks/bench_pdf_extract.py --json results/pdf_extract.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pdf_extract  # noqa: E402
+
+LINES_PER_PAGE = 45
+
+
+def generate_pdf(path: str, pages: int) -> None:
+    """Write a PDF with ``pages`` pages of dense text (every 50th page left blank)."""
+    pymupdf = pdf_extract.import_pymupdf()
+    doc = pymupdf.open()
+    for n in range(1, pages + 1):
+        page = doc.new_page()
+        if n % 50 == 0:
+            continue
+        text = "\n".join(
+            f"Section {n}.{line}: Rate schedule item {n * 100 + line} amended effective FY{2020 + line % 7}."
+            for line in range(LINES_PER_PAGE)
+        )
+        page.insert_text((36, 36), text, fontsize=8)
+    doc.save(path)
+    doc.close()
+
+
+def default_worker_counts() -> list[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark parallel PDF text extraction.")
+    parser.add_argument("--pages", type=int, default=3000, help="Pages to generate (default: 3000)")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Worker counts to try (default: 1, 2, 4, ... up to CPU count)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per worker count; best is kept")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    worker_counts = args.workers or default_worker_counts()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        print(f"Generating {args.pages:,}-page PDF...", file=sys.stderr)
+        generate_pdf(pdf_path, args.pages)
+        size_mb = os.path.getsize(pdf_path) / 1024 / 1024
+
+        reference = None
+        rows = []
+        for workers in worker_counts:
+            best = None
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                parts = pdf_extract.extract_text_parts(pdf_path, workers=workers)
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            text = "\n\n".join(parts)
+            if reference is None:
+                reference = text
+            elif text != reference:
+                print(f"Error: output with {workers} workers differs from serial", file=sys.stderr)
+                sys.exit(1)
+            rows.append({"workers": workers, "seconds": round(best, 4)})
+
+    serial = rows[0]["seconds"]
+    print(f"\n{args.pages:,} pages ({size_mb:.1f} MB), {os.cpu_count()} CPUs, best of {args.repeat}")
+    print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+    for row in rows:
+        row["pages_per_second"] = round(args.pages / row["seconds"], 1)
+        row["speedup"] = round(serial / row["seconds"], 2)
+        print(f"{row['workers']:>8} {row['seconds']:>9.3f} {row['pages_per_second']:>9.0f} "
+              f"{row['speedup']:>7.2f}x")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "pdf_extract",
+                "pages": args.pages,
+                "pdf_mb": round(size_mb, 2),
+                "cpus": os.cpu_count(),
+                "results": rows,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
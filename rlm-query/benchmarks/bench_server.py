@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+bench_server.py — Per-query latency of one-shot rlm-query runs vs a warm --serve.
+
+Runs against fake_anthropic.py (no key or network needed), with a fresh
+cache directory and a new question each time so no answer is served from the
+answer cache. For a generated text document it measures the wall time of:
+
+    cold    python rlm-query.py doc "q" --no-server   (a full process per query)
+    client  python rlm-query.py doc "q" while --serve runs (thin client)
+    direct  server.ask() from this process             (the server's own time)
+
+and how many new HTTP connections each query opened to the API. The fake
+backend's --latency is 0 by default, so the numbers are rlm-query's own
+overhead; model time adds the same amount to every mode.
+
+Linux/macOS only (Unix socket).
+
+Usage:
+    python benchmarks/bench_server.py
+    python benchmarks/bench_server.py --runs 10 --doc-mb 32 --latency 0.2
+    python benchmarks/bench_server.py --json results/server.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import server  # noqa: E402
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+LINE = "2024-05-01T12:00:00Z INFO request handled path=/api/v1/items status=200 ms=12\n"
+MODES = ("cold", "client", "direct")
+
+
+def generate_doc(path: str, size_mb: float) -> None:
+    target = int(size_mb * 1024 * 1024)
+    block = LINE * 4096
+    with open(path, "w", encoding="utf-8") as f:
+        written = 0
+        while written + len(block) < target:
+            f.write(block)
+            written += len(block)
+        f.write("2024-05-01T12:00:01Z ERROR upstream timeout\n")
+
+
+def wait_for_server(socket_path: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    while server.status(socket_path) is None:
+        if process.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError(f"rlm-query --serve did not start:\n{process.stderr.read()}")
+        time.sleep(0.05)
+
+
+def measure(mode: str, runs: int, doc: str, env: dict, socket_path: str, backend) -> dict:
+    times, connections = [], []
+    for i in range(runs):
+        question = f"{mode} question {i}: what failed?"
+        opened = backend.stats["connections"]
+        started = time.perf_counter()
+        if mode == "direct":
+            record = server.ask({"file_path": doc, "question": question}, socket_path)
+            if record is None or record.get("error"):
+                raise RuntimeError(f"server query failed: {record}")
+        else:
+            command = [sys.executable, str(ROOT / "rlm-query.py"), doc, question]
+            if mode == "cold":
+                command.append("--no-server")
+            subprocess.run(command, env=env, capture_output=True, check=True)
+        times.append(time.perf_counter() - started)
+        connections.append(backend.stats["connections"] - opened)
+    return {
+        "median_seconds": round(statistics.median(times), 4),
+        "min_seconds": round(min(times), 4),
+        "connections_per_query": statistics.median(connections),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one-shot rlm-query vs --serve.")
+    parser.add_argument("--runs", type=int, default=5, help="Queries per mode (default: 5)")
+    parser.add_argument("--doc-mb", type=float, default=8,
+                        help="Size of the generated document in MB (default: 8)")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Fake model latency per request in seconds (default: 0)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    backend = serve_in_thread(latency=args.latency)
+    with tempfile.TemporaryDirectory() as tmp:
+        doc = os.path.join(tmp, "bench.log")
+        generate_doc(doc, args.doc_mb)
+        socket_path = os.path.join(tmp, "server.sock")
+        env = {
+            **os.environ,
+            "ANTHROPIC_BASE_URL": backend.url,
+            "ANTHROPIC_API_KEY": "fake",
+            "RLM_CACHE_DIR": os.path.join(tmp, "cache"),
+            "RLM_QUERY_SOCKET": socket_path,
+        }
+
+        print("Starting rlm-query --serve...", file=sys.stderr)
+        process = subprocess.Popen(
+            [sys.executable, str(ROOT / "rlm-query.py"), "--serve"],
+            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True,
+        )
+        try:
+            wait_for_server(socket_path, process)
+            # The first query loads the document into the server, as a real session would
+            server.ask({"file_path": doc, "question": "warm-up"}, socket_path)
+            results = {}
+            for mode in MODES:
+                print(f"Measuring {mode}...", file=sys.stderr)
+                results[mode] = measure(mode, args.runs, doc, env, socket_path, backend)
+        finally:
+            server.stop(socket_path)
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    backend.shutdown()
+
+    cold = results["cold"]["median_seconds"]
+    print(f"\nPer-query wall time, {args.doc_mb:g} MB document, {args.latency:g}s fake "
+          f"model latency, median of {args.runs}")
+    print(f"{'mode':>8} {'median s':>10} {'min s':>8} {'speedup':>8} {'new conns':>10}")
+    for mode in MODES:
+        row = results[mode]
+        print(f"{mode:>8} {row['median_seconds']:>10.3f} {row['min_seconds']:>8.3f} "
+              f"{cold / row['median_seconds']:>7.1f}x {row['connections_per_query']:>10g}")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "server",
+                "doc_mb": args.doc_mb,
+                "latency": args.latency,
+                "runs": args.runs,
+                "results": results,
+            }, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+fake_anthropic.py — Local stand-in for the Anthropic Messages API.
+
+Lets rlm-query run end to end without a key or network: point the Anthropic
+SDK at it with ANTHROPIC_BASE_URL and any API key. Every conversation takes
+two turns, like a minimal real RLM run:
+
+    1. no assistant turn yet -> a ```repl``` block that measures the context
+    2. otherwise              -> a ```repl``` block that submits the answer dict,
+                                 quoting the question and the REPL output
+
+A question containing "(revise)" gets an answer turn that rewrites the
+assigned answer in code before submitting it, so the final answer differs
+from the string literal a streaming client drafts from.
+
+Requests whose system prompt does not mention the REPL (anything but an RLM
+turn, e.g. a summary-tree build) get a one-line summary instead: the first
+words of the last message, skipping lines that end in a colon.
+
+Usage is reported from request size (~4 bytes per input token), and
+--latency adds a fixed delay per request to stand in for model time.
+Requests with "stream": true get the same reply as server-sent events, one
+word per content_block_delta, --token-delay seconds apart.
+
+Prompt caching is simulated: the request prefix up to each cache_control
+breakpoint is remembered, a later request starting with a remembered prefix
+reports it as cache_read_input_tokens, and newly marked prefixes are reported
+as cache_creation_input_tokens. Request payloads are kept in server.requests
+and, with --record FILE, appended to FILE as JSON Lines. Connections are kept
+alive (HTTP/1.1); server.stats counts "connections" and "bytes_received"
+(request bodies), so a client's connection reuse and upload size are
+measurable.
+
+Usage:
+    python fake_anthropic.py [--port 8799] [--latency 0.5] [--token-delay 0.05]
+                             [--record requests.jsonl]
+    ANTHROPIC_BASE_URL=http://127.0.0.1:8799 ANTHROPIC_API_KEY=fake \\
+        python ../rlm-query.py doc.txt "What is this?"
+
+Library:
+    from fake_anthropic import serve_in_thread
+    server = serve_in_thread(latency=0.2, token_delay=0.02)   # ANTHROPIC_BASE_URL is server.url
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8799
+
+_WORD = re.compile(r"\s*\S+|\s+")
+_QUESTION = re.compile(r"^Answer the following: (.*?)\n\n", re.DOTALL | re.MULTILINE)
+
+
+def _text(content) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+
+def fake_reply(messages: list[dict]) -> str:
+    """The scripted assistant turn for a conversation."""
+    texts = [_text(m.get("content", "")) for m in messages]
+    question = next(
+        (m.group(1) for t in reversed(texts) if (m := _QUESTION.search(t))), "the question"
+    )
+    if not any(m.get("role") == "assistant" for m in messages):
+        return "Measuring the context first.\n```repl\nprint(f'context chars: {len(str(context))}')\n```"
+    observed = re.findall(r"context chars: (\d+)", "\n".join(texts))
+    size = observed[-1] if observed else "unknown"
+    answer = f"Answer to: {question} [context chars: {size}]"
+    revise = ""
+    if "(revise)" in question:
+        revise = "answer['content'] = answer['content'].replace('Answer', 'Revised answer')\n"
+    return f"Done.\n```repl\nanswer['content'] = {answer!r}\n{revise}answer['ready'] = True\n```"
+
+
+def fake_summary(messages: list[dict]) -> str:
+    """The scripted reply to a plain (non-RLM) request."""
+    text = _text(messages[-1].get("content", "")) if messages else ""
+    lines = [line for line in text.splitlines() if not line.rstrip().endswith(":")]
+    words = " ".join(lines).split()
+    return f"{' '.join(words[:30])} ... ({len(text):,} chars)"
+
+
+def _content_blocks(request: dict):
+    """Every content block of a request in prompt order: system, then messages."""
+    system = request.get("system") or []
+    yield from ([{"type": "text", "text": system}] if isinstance(system, str) else system)
+    for message in request.get("messages", []):
+        content = message.get("content", "")
+        if isinstance(content, str):
+            yield {"type": "text", "text": content}
+        else:
+            yield from content
+
+
+def cache_usage(request: dict, cached: set) -> tuple[int, int]:
+    """(cache_creation, cache_read) tokens for a request; remembers new breakpoint prefixes."""
+    h = hashlib.sha256()
+    size = 0
+    breakpoints = []  # (prefix tokens, prefix digest)
+    for block in _content_blocks(request):
+        text = block.get("text", "")
+        h.update(text.encode("utf-8"))
+        size += len(text)
+        if block.get("cache_control"):
+            breakpoints.append((size // 4, h.copy().hexdigest()))
+
+    read = max((tokens for tokens, digest in breakpoints if digest in cached), default=0)
+    written = max((tokens for tokens, _ in breakpoints), default=0)
+    cached.update(digest for _, digest in breakpoints)
+    return max(0, written - read), read
+
+
+class FakeAnthropicHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    token_delay = 0.0
+    record_path = None
+    requests = None  # list shared with the server
+    cached = None    # breakpoint prefix digests
+    lock = None
+    stats = None        # {"connections": n, "bytes_received": n}, shared with the server
+
+    def setup(self):
+        super().setup()
+        with self.lock:
+            self.stats["connections"] += 1
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/v1/messages"):
+            self.send_error(404)
+            return
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        request = json.loads(body)
+        with self.lock:
+            self.stats["bytes_received"] += len(body)
+            self.requests.append(request)
+            if self.record_path:
+                with open(self.record_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(request) + "\n")
+            cache_write, cache_read = cache_usage(request, self.cached)
+        if self.latency:
+            time.sleep(self.latency)
+
+        if "REPL" in _text(request.get("system") or ""):
+            text = fake_reply(request.get("messages", []))
+        else:
+            text = fake_summary(request.get("messages", []))
+        input_tokens = len(body) // 4
+        message = {
+            "id": f"msg_{uuid.uuid4().hex[:24]}",
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "fake"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {
+                "input_tokens": max(0, input_tokens - cache_write - cache_read),
+                "cache_creation_input_tokens": cache_write,
+                "cache_read_input_tokens": cache_read,
+                "output_tokens": len(text) // 4,
+            },
+        }
+        if request.get("stream"):
+            self._stream(message)
+            return
+
+        payload = json.dumps(message).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _stream(self, message: dict) -> None:
+        """Send ``message`` as Messages API server-sent events, a word per delta."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # the stream ends when the connection does
+        self.end_headers()
+        self.close_connection = True
+
+        def send(event: str, data: dict) -> None:
+            self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        usage = message["usage"]
+        send("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None,
+            "usage": {**usage, "output_tokens": 1},
+        }})
+        send("content_block_start", {"type": "content_block_start", "index": 0,
+                                     "content_block": {"type": "text", "text": ""}})
+        for word in _WORD.findall(message["content"][0]["text"]):
+            if self.token_delay:
+                time.sleep(self.token_delay)
+            send("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                         "delta": {"type": "text_delta", "text": word}})
+        send("content_block_stop", {"type": "content_block_stop", "index": 0})
+        send("message_delta", {"type": "message_delta",
+                               "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                               "usage": {"output_tokens": usage["output_tokens"]}})
+        send("message_stop", {"type": "message_stop"})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(port: int = DEFAULT_PORT, latency: float = 0.0,
+                record_path: str | None = None, token_delay: float = 0.0) -> ThreadingHTTPServer:
+    requests = []
+    stats = {"connections": 0, "bytes_received": 0}
+    handler = type("Handler", (FakeAnthropicHandler,), {
+        "latency": latency,
+        "token_delay": token_delay,
+        "record_path": record_path,
+        "requests": requests,
+        "cached": set(),
+        "lock": threading.Lock(),
+        "stats": stats,
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"
+    server.requests = requests
+    server.stats = stats
+    return server
+
+
+def serve_in_thread(port: int = 0, latency: float = 0.0,
+                    record_path: str | None = None, token_delay: float = 0.0) -> ThreadingHTTPServer:
+    """Start a server on a background thread (port 0 = any free port)."""
+    server = make_server(port, latency, record_path, token_delay)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic Messages API.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of delay per request")
+    parser.add_argument("--token-delay", type=float, default=0.0,
+                        help="Seconds between streamed words (stream requests only)")
+    parser.add_argument("--record", metavar="FILE", help="Append request payloads to FILE (JSONL)")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency, args.record, args.token_delay)
+    print(f"Fake Anthropic API on {server.url} (latency {args.latency}s, "
+          f"token delay {args.token_delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+corpus_query.py — Ask one question across a directory or glob of documents.
+
+Map: every file is loaded and queried on its own, in worker processes
+(bounded by ``concurrency``). A worker holds one file's text at a time and
+returns only the answer, so a corpus streams through without all of its text
+being in memory at once. Files with nothing relevant answer NO_ANSWER.
+
+Reduce: one more RLM completion over the relevant per-file answers, each under
+its file path, combines them into a single answer attributed to its sources.
+
+Per-file answers go through the answer cache (see answer_cache.py), so
+re-running a question over a corpus only re-reads files that changed.
+"""
+
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import TextIO
+
+import batch_query
+import retrieval
+from answer_cache import AnswerCache, answer_key
+from doc_cache import DocCache
+from file_loader import SUPPORTED_EXTENSIONS, DocumentError, read_document
+
+NO_ANSWER = "NO RELEVANT INFORMATION"
+
+MAP_INSTRUCTION = (
+    "Answer from this document only, citing pages where the text has page markers. "
+    f"If it contains nothing relevant, answer exactly: {NO_ANSWER}"
+)
+REDUCE_INSTRUCTION = (
+    "The context holds answers to this question from separate documents, each under "
+    "its file path. Combine them into one answer and attribute every point to its "
+    "source file (and page, where given)."
+)
+
+
+def is_corpus_path(path: str) -> bool:
+    """True for a directory or a glob pattern rather than a single file.
+
+    An existing file is never a pattern, even with glob characters in its name.
+    """
+    if os.path.isfile(path):
+        return False
+    return os.path.isdir(path) or any(c in path for c in "*?[")
+
+
+def _is_supported(path: str) -> bool:
+    return os.path.splitext(path)[1].lower() in SUPPORTED_EXTENSIONS
+
+
+def expand_corpus(path: str) -> list[str]:
+    """Supported files under a directory (recursively, skipping hidden ones) or matching a glob."""
+    if os.path.isdir(path):
+        files = []
+        for root, dirs, names in os.walk(path):
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            files.extend(
+                os.path.join(root, name) for name in names
+                if not name.startswith(".") and _is_supported(name)
+            )
+        return sorted(files)
+    return sorted(
+        p for p in glob.glob(path, recursive=True) if os.path.isfile(p) and _is_supported(p)
+    )
+
+
+def _map_file(index: int, file_path: str, question: str, settings: dict) -> dict:
+    """Load one file and answer the question from it (runs in a worker process)."""
+    record = {"index": index, "file": file_path, "answer": None, "error": None}
+    started = time.perf_counter()
+    try:
+        answers = key = None
+        if settings["use_cache"]:
+            answers = AnswerCache()
+            key = answer_key(
+                DocCache().content_hash(file_path), question, settings["model"],
+                settings["max_iterations"], settings["max_depth"], settings["variant"],
+            )
+            cached = answers.get(key)
+            if cached is not None:
+                record.update(cached, error=None, cached=True)
+                record["seconds"] = round(time.perf_counter() - started, 3)
+                return record
+
+        # Parallelism is across files, so each PDF is extracted serially
+        text = read_document(file_path, use_cache=settings["use_cache"], pdf_workers=1)
+        name = file_path
+        if settings["retrieve"]:
+            bm25 = retrieval.load_index(
+                file_path, text, cache=DocCache() if settings["use_cache"] else None,
+                max_chars=settings["chunk_chars"],
+            )
+            text, record["retrieval"] = retrieval.select_chunks(
+                text, bm25, question, settings["retrieve"]
+            )
+            name = batch_query.excerpt_name(file_path, record["retrieval"])
+        record["chars"] = len(text)
+
+        context = batch_query.with_question(batch_query.document_block(name, text), question)
+        del text
+        result = batch_query.worker_model().completion(
+            context, root_prompt=f"{question}\n\n{MAP_INSTRUCTION}"
+        )
+        record.update(batch_query.result_fields(result))
+        if answers:
+            answers.put(key, {k: v for k, v in record.items()
+                              if k not in ("index", "file", "seconds")})
+    except DocumentError as e:
+        record["error"] = str(e)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def is_relevant(record: dict) -> bool:
+    answer = (record.get("answer") or "").strip()
+    return not record["error"] and bool(answer) and not answer.upper().startswith(NO_ANSWER)
+
+
+def run_map(
+    files: list[str],
+    question: str,
+    rlm_kwargs: dict,
+    settings: dict,
+    out: TextIO | None = None,
+    concurrency: int = batch_query.DEFAULT_CONCURRENCY,
+    use_prompt_cache: bool = True,
+) -> list[dict]:
+    """Answer ``question`` from each file; records (JSONL to ``out``) come back in file order.
+
+    ``settings``: use_cache, model, max_iterations, max_depth, variant (answer-cache
+    key), retrieve and chunk_chars (see retrieval.py).
+    """
+    workers = max(1, min(concurrency, len(files)))
+    print(f"Querying {len(files)} files ({workers} at a time)...", file=sys.stderr)
+
+    records = []
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=batch_query.init_worker,
+        initargs=(None, rlm_kwargs, use_prompt_cache),
+    ) as pool:
+        futures = [
+            pool.submit(_map_file, i, path, question, settings) for i, path in enumerate(files)
+        ]
+        try:
+            for i, future in enumerate(futures):
+                record = future.result()
+                records.append(record)
+                if out:
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+                if record["error"]:
+                    status = f"error: {record['error']}"
+                elif record.get("cached"):
+                    status = "cached"
+                else:
+                    status = "relevant" if is_relevant(record) else "nothing relevant"
+                print(f"  [{i + 1}/{len(files)}] {files[i]}: {status} ({record['seconds']:.1f}s)",
+                      file=sys.stderr)
+        except KeyboardInterrupt:
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+    return records
+
+
+def reduce_context(question: str, records: list[dict]) -> str:
+    parts = [f"--- FILE: {r['file']} ---\n{r['answer'].strip()}" for r in records]
+    return (
+        f"=== ANSWERS FROM {len(records)} DOCUMENTS ===\n"
+        + "\n\n".join(parts)
+        + "\n=== END ANSWERS ===\n\n"
+        + f"Question: {question}"
+    )
+
+
+def run_reduce(question: str, records: list[dict], rlm_kwargs: dict, verbose: bool = False,
+               **rlm_options):
+    """Combine the relevant per-file answers with one RLM completion; returns its result.
+
+    ``rlm_options`` are passed on to RLM() (e.g. streaming callbacks).
+    """
+    from rlm import RLM
+
+    model = RLM(**rlm_kwargs, verbose=verbose, **rlm_options)
+    return model.completion(
+        reduce_context(question, records), root_prompt=f"{question}\n\n{REDUCE_INSTRUCTION}"
+    )
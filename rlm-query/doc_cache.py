@@ -0,0 +1,172 @@
+"""
+doc_cache.py — Persistent cache of extracted document text for rlm-query.
+
+Extracting a large PDF page by page is slow, and rlm-query is usually asked
+several questions about the same file. Extracted text is stored on disk and
+reused while the file is unchanged.
+
+Lookup:
+    1. (absolute path, size, mtime) matches the manifest -> reuse its content hash
+       without reading the file (the millisecond path)
+    2. otherwise hash the file contents; an identical file already extracted
+       (copied, renamed or touched) is still a hit
+    3. otherwise the caller extracts and stores the text
+
+Entries are evicted least-recently-used once the cache exceeds its size limit.
+The stat -> hash memo is bounded on its own (oldest paths dropped first), so a
+plain text file that never gets an entry is still not re-hashed on every run.
+
+Location: ~/.cache/rlm-query/docs (override with RLM_CACHE_DIR)
+Size limit: 2048 MB (override with RLM_CACHE_MAX_MB)
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+
+# Bump when the extracted text format changes, so stale entries are ignored
+EXTRACTOR_VERSION = "1"
+
+CACHE_DIR = Path(os.environ.get("RLM_CACHE_DIR", Path.home() / ".cache" / "rlm-query")) / "docs"
+MAX_CACHE_BYTES = int(float(os.environ.get("RLM_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+
+MANIFEST_NAME = "manifest.json"
+MAX_MEMO_FILES = 10_000  # stat -> hash memo size, independent of the entries
+
+_lock = threading.Lock()
+
+
+def file_hash(file_path: str) -> str:
+    """SHA-256 of the file contents."""
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+class DocCache:
+    """On-disk text cache keyed by path/size/mtime and content hash, with LRU eviction."""
+
+    def __init__(self, cache_dir: Path = CACHE_DIR, max_bytes: int = MAX_CACHE_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.manifest_path = self.cache_dir / MANIFEST_NAME
+
+    # --- manifest ---
+
+    def _load_manifest(self) -> dict:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            manifest = {}
+        manifest.setdefault("files", {})    # "path|size|mtime" -> content hash
+        manifest.setdefault("entries", {})  # content key -> {"bytes", "last_access"}
+        return manifest
+
+    def _save_manifest(self, manifest: dict) -> None:
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        tmp_path.replace(self.manifest_path)
+
+    @staticmethod
+    def _stat_key(file_path: str) -> str:
+        st = os.stat(file_path)
+        return f"{os.path.abspath(file_path)}|{st.st_size}|{st.st_mtime_ns}"
+
+    def _entry_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.txt"
+
+    # --- public API ---
+
+    def content_key(self, file_path: str, kind: str = "text") -> str:
+        """Cache key for the file's current contents (hashes only when the stat changed).
+
+        ``kind`` separates different derived artefacts of the same file.
+        """
+        return f"{self.content_hash(file_path)}-{kind}-v{EXTRACTOR_VERSION}"
+
+    def content_hash(self, file_path: str) -> str:
+        """SHA-256 of the file, served from the manifest while its stat is unchanged."""
+        stat_key = self._stat_key(file_path)
+        with _lock:
+            manifest = self._load_manifest()
+            digest = manifest["files"].get(stat_key)
+        if digest is None:
+            digest = file_hash(file_path)
+            with _lock:
+                manifest = self._load_manifest()
+                # Drop stale stat keys for this path before recording the new one
+                prefix = stat_key.rsplit("|", 2)[0] + "|"
+                for old in [k for k in manifest["files"] if k.startswith(prefix)]:
+                    del manifest["files"][old]
+                manifest["files"][stat_key] = digest
+                # Insertion order is oldest first; json keeps it across saves
+                for old in list(manifest["files"])[:-MAX_MEMO_FILES]:
+                    del manifest["files"][old]
+                self._save_manifest(manifest)
+        return digest
+
+    def get(self, file_path: str, kind: str = "text") -> str | None:
+        """Return cached text for the file, or None on a miss."""
+        key = self.content_key(file_path, kind)
+        entry_path = self._entry_path(key)
+        try:
+            with open(entry_path, "r", encoding="utf-8") as f:
+                text = f.read()
+        except FileNotFoundError:
+            return None
+
+        with _lock:
+            manifest = self._load_manifest()
+            entry = manifest["entries"].setdefault(key, {"bytes": entry_path.stat().st_size})
+            entry["last_access"] = time.time()
+            self._save_manifest(manifest)
+        return text
+
+    def put(self, file_path: str, text: str, kind: str = "text") -> None:
+        """Store extracted text for the file and evict old entries if over the limit."""
+        key = self.content_key(file_path, kind)
+        entry_path = self._entry_path(key)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        tmp_path.replace(entry_path)
+
+        with _lock:
+            manifest = self._load_manifest()
+            manifest["entries"][key] = {
+                "bytes": entry_path.stat().st_size,
+                "last_access": time.time(),
+            }
+            self._evict(manifest, keep=key)
+            self._save_manifest(manifest)
+
+    def _evict(self, manifest: dict, keep: str) -> None:
+        """Delete least-recently-used entries until the total size fits."""
+        entries = manifest["entries"]
+        total = sum(e["bytes"] for e in entries.values())
+        for key in sorted(entries, key=lambda k: entries[k]["last_access"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            total -= entries[key]["bytes"]
+            self._entry_path(key).unlink(missing_ok=True)
+            del entries[key]
+
+    def clear(self) -> int:
+        """Remove the whole cache. Returns the number of bytes freed."""
+        if not self.cache_dir.exists():
+            return 0
+        freed = sum(p.stat().st_size for p in self.cache_dir.rglob("*") if p.is_file())
+        shutil.rmtree(self.cache_dir)
+        return freed
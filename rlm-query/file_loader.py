@@ -0,0 +1,218 @@
+"""
+file_loader.py — Read a document into text for rlm-query.
+
+Shared by single-file queries and the worker processes of batch and corpus
+queries, so it reports failures as DocumentError instead of exiting; the
+rlm-query.py CLI turns that into an error message.
+
+Text files are memory-mapped and decoded straight from the mapping, so the
+only full-size allocation is the resulting str (no bytes copy, no failed
+full decode). The encoding is chosen from samples at the start, middle and
+end of the file: UTF-8 if they all decode (any invalid bytes elsewhere become
+U+FFFD), otherwise latin-1, which never fails. That fallback is only for the
+known text extensions: any other file must decode as UTF-8 throughout, so
+binary files are rejected rather than sent as mojibake. A byte range (head, tail or
+start:end, aligned to line breaks) decodes only that part of the file.
+"""
+
+import argparse
+import codecs
+import hashlib
+import mmap
+import os
+import re
+import sys
+
+import pdf_extract
+from doc_cache import DocCache
+
+TEXT_EXTENSIONS = (".txt", ".md", ".json", ".csv", ".log", ".xml", ".html", ".yaml", ".yml")
+SUPPORTED_EXTENSIONS = TEXT_EXTENSIONS + (".pdf",)
+
+SAMPLE_BYTES = 64 * 1024
+# How far a range boundary may move to land on a line break
+ALIGN_WINDOW = 64 * 1024
+
+_BOMS = ((codecs.BOM_UTF8, "utf-8-sig"), (codecs.BOM_UTF16_LE, "utf-16"),
+         (codecs.BOM_UTF16_BE, "utf-16"))
+
+
+class DocumentError(Exception):
+    """A file could not be read as a document."""
+
+
+def parse_size(text: str) -> int:
+    """Bytes from "4096", "512K", "100M" or "2G" (binary units)."""
+    match = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([KMG]?)I?B?\s*", text.upper())
+    if not match:
+        raise ValueError(f"invalid size: {text!r}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMG".index(unit or " "))
+
+
+def parse_range(text: str) -> tuple[int, int | None]:
+    """(start, end) bytes from "START:END", "START:" or ":END" (sizes as in parse_size)."""
+    start, sep, end = text.partition(":")
+    if not sep:
+        raise ValueError(f"invalid range: {text!r} (expected START:END)")
+    start = parse_size(start) if start.strip() else 0
+    end = parse_size(end) if end.strip() else None
+    if end is not None and end <= start:
+        raise argparse.ArgumentTypeError(f"range end must be after its start: {text!r}")
+    return start, end
+
+
+def detect_encoding(data) -> str:
+    """Encoding of a bytes-like buffer from its BOM or from samples of its content."""
+    head = bytes(data[:4])
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    size = len(data)
+    offsets = sorted({0, max(0, size // 2 - SAMPLE_BYTES // 2), max(0, size - SAMPLE_BYTES)})
+    for offset in offsets:
+        sample = bytes(data[offset:offset + SAMPLE_BYTES])
+        if offset:
+            # Skip UTF-8 continuation bytes so the sample starts on a character
+            skip = 0
+            while skip < min(3, len(sample)) and 0x80 <= sample[skip] < 0xC0:
+                skip += 1
+            sample = sample[skip:]
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(sample, final=False)
+        except UnicodeDecodeError:
+            return "latin-1"
+    return "utf-8"
+
+
+def _align(data, start: int, end: int) -> tuple[int, int]:
+    """Move a cut start forward and a cut end back to the nearest line break."""
+    size = len(data)
+    if 0 < start < size:
+        newline = data.find(b"\n", start - 1, min(end, start + ALIGN_WINDOW))
+        if newline >= 0:
+            start = newline + 1
+    if 0 < end < size:
+        newline = data.rfind(b"\n", max(start, end - ALIGN_WINDOW), end)
+        if newline >= 0:
+            end = newline + 1
+    return start, end
+
+
+def _resolve_range(data, byte_range: tuple[int, int | None] | None) -> tuple[int, int]:
+    """(start, end) offsets of ``byte_range`` in ``data``, cut at line breaks."""
+    size = len(data)
+    if not byte_range:
+        return 0, size
+    start, end = byte_range
+    start = max(0, size + start) if start < 0 else min(start, size)
+    end = size if end is None else min(end, size)
+    return _align(data, start, end)
+
+
+def content_hash(file_path: str, byte_range: tuple[int, int | None] | None = None) -> str:
+    """SHA-256 of the text a question sees: the whole file, or just its byte range.
+
+    The whole file goes through DocCache's stat memo; a range hashes only the
+    bytes read_text() would read, so a --tail of a huge log does not read all of it.
+    """
+    if not byte_range:
+        return DocCache().content_hash(file_path)
+    h = hashlib.sha256()
+    if os.path.getsize(file_path):
+        with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start, end = _resolve_range(mm, byte_range)
+            for offset in range(start, end, 1024 * 1024):
+                h.update(mm[offset:min(end, offset + 1024 * 1024)])
+    return h.hexdigest()
+
+
+def read_text(file_path: str, byte_range: tuple[int, int | None] | None = None
+              ) -> tuple[str, tuple[int, int, int]]:
+    """Decode a text file (or a byte range of it) from a memory map.
+
+    ``byte_range`` is (start, end); a negative start counts from the end of the
+    file and end None means end of file. Returns the text and the (start, end,
+    file size) actually read after aligning the cuts to line breaks. Files
+    without a TEXT_EXTENSIONS extension raise UnicodeDecodeError unless they
+    are valid UTF-8 (or UTF-16 with a BOM).
+    """
+    strict = os.path.splitext(file_path)[1].lower() not in TEXT_EXTENSIONS
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return "", (0, 0, 0)
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        start, end = _resolve_range(mm, byte_range)
+
+        encoding = detect_encoding(mm)
+        if strict and encoding == "latin-1":
+            encoding = "utf-8"  # so the decode below raises instead of guessing
+        if encoding == "utf-16" and start:
+            start += start % 2
+        view = memoryview(mm)[start:end]
+        try:
+            if encoding == "utf-8-sig" and start:
+                encoding = "utf-8"
+            text = str(view, encoding, "strict" if strict else "replace")
+            crlf = b"\r\n" in mm[start:min(end, start + SAMPLE_BYTES)]
+        finally:
+            view.release()
+
+    if crlf:
+        # Match what text-mode open() used to return
+        text = text.replace("\r\n", "\n")
+    return text, (start, end, size)
+
+
+def read_document(file_path: str, use_cache: bool = True, pdf_workers: int | None = None) -> str:
+    """Load file contents. Supports .txt, .md, and .pdf.
+
+    PDF text is served from the persistent document cache when the file is
+    unchanged; pass use_cache=False to always re-extract (and not store).
+    Large PDFs are extracted by ``pdf_workers`` processes (default: CPU count).
+    """
+    if not os.path.isfile(file_path):
+        raise DocumentError(f"File not found: {file_path}")
+
+    ext = os.path.splitext(file_path)[1].lower()
+
+    if ext == ".pdf":
+        cache = DocCache() if use_cache else None
+        if cache:
+            cached = cache.get(file_path)
+            if cached is not None:
+                return cached
+
+        try:
+            pdf_extract.import_pymupdf()
+        except ImportError:
+            raise DocumentError(
+                "pymupdf (PyMuPDF) is required for PDF files. Install with: pip install pymupdf"
+            ) from None
+
+        try:
+            text_parts = pdf_extract.extract_text_parts(file_path, workers=pdf_workers)
+            if not text_parts:
+                print(
+                    f"Warning: PDF appears to contain no extractable text: {file_path}",
+                    file=sys.stderr,
+                )
+                return "(empty PDF)"
+            text = "\n\n".join(text_parts)
+        except Exception as e:
+            raise DocumentError(f"Failed to read PDF: {e}") from e
+
+        if cache:
+            cache.put(file_path, text)
+        return text
+
+    else:
+        # Unknown extensions are read as text too, if they are valid UTF-8
+        try:
+            return read_text(file_path)[0]
+        except (OSError, ValueError, LookupError) as e:
+            if ext in TEXT_EXTENSIONS:
+                raise DocumentError(f"Failed to read file: {e}") from e
+            raise DocumentError(f"Cannot read file with extension '{ext}': {e}") from e
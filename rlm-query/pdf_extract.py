@@ -0,0 +1,77 @@
+"""
+pdf_extract.py — PDF page-text extraction for rlm-query, split across processes.
+
+PyMuPDF extraction is CPU-bound and single-threaded, so large PDFs are split
+into page ranges and extracted by a process pool; each worker opens its own
+copy of the document. Results are reassembled in page order into the same
+"--- Page N ---" blocks that a serial pass produces (empty pages skipped).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+# Below this many pages, process start-up costs more than it saves
+PARALLEL_MIN_PAGES = 200
+# Ranges per worker: more, smaller ranges even out pages of uneven density
+RANGES_PER_WORKER = 4
+
+
+def import_pymupdf():
+    """Return the PyMuPDF module under either of its import names (raises ImportError)."""
+    try:
+        import pymupdf  # PyMuPDF
+    except ImportError:
+        import fitz as pymupdf  # older PyMuPDF import name
+    return pymupdf
+
+
+def page_count(file_path: str) -> int:
+    pymupdf = import_pymupdf()
+    with pymupdf.open(file_path) as doc:
+        return doc.page_count
+
+
+def extract_range(file_path: str, start: int, stop: int) -> list[str]:
+    """Extract pages [start, stop) (0-based) as "--- Page N ---" blocks, skipping empty pages."""
+    pymupdf = import_pymupdf()
+    text_parts = []
+    with pymupdf.open(file_path) as doc:
+        for index in range(start, stop):
+            page_text = doc[index].get_text()
+            if page_text.strip():
+                text_parts.append(f"--- Page {index + 1} ---\n{page_text}")
+    return text_parts
+
+
+def page_ranges(pages: int, workers: int) -> list[tuple[int, int]]:
+    """Split ``pages`` into contiguous ranges, RANGES_PER_WORKER per worker."""
+    chunks = max(1, min(pages, workers * RANGES_PER_WORKER))
+    size, extra = divmod(pages, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        stop = start + size + (1 if i < extra else 0)
+        ranges.append((start, stop))
+        start = stop
+    return ranges
+
+
+def extract_text_parts(file_path: str, workers: int | None = None) -> list[str]:
+    """Extract all non-empty pages of a PDF, in order.
+
+    ``workers`` defaults to the CPU count; 1 (or a small PDF) extracts in-process.
+    """
+    workers = workers or os.cpu_count() or 1
+    pages = page_count(file_path)
+    if workers <= 1 or pages < PARALLEL_MIN_PAGES:
+        return extract_range(file_path, 0, pages)
+
+    ranges = page_ranges(pages, workers)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        results = pool.map(
+            extract_range,
+            [file_path] * len(ranges),
+            [start for start, _ in ranges],
+            [stop for _, stop in ranges],
+        )
+        return [part for parts in results for part in parts]
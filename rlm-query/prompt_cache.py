@@ -0,0 +1,162 @@
+"""
+prompt_cache.py — Anthropic prompt caching for rlm-query's RLM calls.
+
+rlm's AnthropicClient sends plain string content, so nothing is ever marked
+cacheable. install() swaps in a subclass that adds cache_control breakpoints
+(at most 3 of the API's 4 per request):
+
+    1. the system prompt -- identical for every question and iteration
+    2. the "=== DOCUMENT ... === END DOCUMENT ===" block, wherever a message
+       carries it (fallback calls and sub-calls that pass the document along),
+       split from the question that follows so other questions reuse it
+    3. the last message -- each iteration re-sends the previous ones, so the
+       history up to here is read from cache on the next turn
+
+and records cache-write and cache-read tokens next to rlm's per-model usage
+(cache_creation_input_tokens / cache_read_input_tokens; input_tokens stays
+the uncached remainder, as the API reports it).
+"""
+
+from typing import Any
+
+DOCUMENT_END = "=== END DOCUMENT ==="
+CACHE_CONTROL = {"type": "ephemeral"}
+
+
+def _blocks(content: str | list) -> list[dict]:
+    """Message content as a fresh list of content blocks (never mutates the input)."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content}]
+    return [dict(block) for block in content]
+
+
+def _split_document(blocks: list[dict]) -> list[dict] | None:
+    """Split the text block holding the document end marker into a cached prefix + rest."""
+    for i, block in enumerate(blocks):
+        text = block.get("text", "") if block.get("type") == "text" else ""
+        cut = text.find(DOCUMENT_END)
+        if cut < 0:
+            continue
+        cut += len(DOCUMENT_END)
+        head = {"type": "text", "text": text[:cut], "cache_control": CACHE_CONTROL}
+        parts = [head]
+        if text[cut:]:
+            parts.append({"type": "text", "text": text[cut:]})
+        return blocks[:i] + parts + blocks[i + 1:]
+    return None
+
+
+def add_cache_breakpoints(
+    messages: list[dict[str, Any]], system: str | list | None
+) -> tuple[list[dict[str, Any]], list[dict] | None]:
+    """Return copies of ``messages`` and ``system`` with cache_control breakpoints."""
+    if system:
+        system = _blocks(system)
+        system[-1]["cache_control"] = CACHE_CONTROL
+
+    marked = []
+    document_marked = False
+    for message in messages:
+        message = dict(message)
+        if not document_marked and DOCUMENT_END in str(message.get("content", "")):
+            split = _split_document(_blocks(message["content"]))
+            if split:
+                message["content"] = split
+                document_marked = True
+        marked.append(message)
+
+    if marked:
+        last = marked[-1]
+        blocks = _blocks(last.get("content", ""))
+        if blocks:
+            blocks[-1]["cache_control"] = CACHE_CONTROL
+            marked[-1] = {**last, "content": blocks}
+    return marked, system
+
+
+def _make_client_class():
+    from collections import defaultdict
+
+    from rlm.clients.anthropic import AnthropicClient
+    from rlm.core.types import ModelUsageSummary, UsageSummary
+
+    class CachedModelUsageSummary(ModelUsageSummary):
+        """ModelUsageSummary plus prompt-cache token counts."""
+
+        def __init__(self, *args, cache_creation_input_tokens=0, cache_read_input_tokens=0,
+                     **kwargs):
+            super().__init__(*args, **kwargs)
+            self.cache_creation_input_tokens = cache_creation_input_tokens
+            self.cache_read_input_tokens = cache_read_input_tokens
+
+        def to_dict(self):
+            result = super().to_dict()
+            result["cache_creation_input_tokens"] = self.cache_creation_input_tokens
+            result["cache_read_input_tokens"] = self.cache_read_input_tokens
+            return result
+
+    class CachingAnthropicClient(AnthropicClient):
+        """AnthropicClient that marks cache breakpoints and tracks cache usage."""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.model_cache_write_tokens: dict[str, int] = defaultdict(int)
+            self.model_cache_read_tokens: dict[str, int] = defaultdict(int)
+            self.last_cache_write_tokens = 0
+            self.last_cache_read_tokens = 0
+
+        def _prepare_messages(self, prompt):
+            messages, system = super()._prepare_messages(prompt)
+            return add_cache_breakpoints(messages, system)
+
+        def _track_cost(self, response, model: str):
+            super()._track_cost(response, model)
+            usage = response.usage
+            self.last_cache_write_tokens = getattr(usage, "cache_creation_input_tokens", None) or 0
+            self.last_cache_read_tokens = getattr(usage, "cache_read_input_tokens", None) or 0
+            self.model_cache_write_tokens[model] += self.last_cache_write_tokens
+            self.model_cache_read_tokens[model] += self.last_cache_read_tokens
+
+        def get_usage_summary(self) -> UsageSummary:
+            return UsageSummary(model_usage_summaries={
+                model: CachedModelUsageSummary(
+                    total_calls=self.model_call_counts[model],
+                    total_input_tokens=self.model_input_tokens[model],
+                    total_output_tokens=self.model_output_tokens[model],
+                    cache_creation_input_tokens=self.model_cache_write_tokens[model],
+                    cache_read_input_tokens=self.model_cache_read_tokens[model],
+                )
+                for model in self.model_call_counts
+            })
+
+        def get_last_usage(self) -> ModelUsageSummary:
+            return CachedModelUsageSummary(
+                total_calls=1,
+                total_input_tokens=self.last_prompt_tokens,
+                total_output_tokens=self.last_completion_tokens,
+                cache_creation_input_tokens=self.last_cache_write_tokens,
+                cache_read_input_tokens=self.last_cache_read_tokens,
+            )
+
+    return CachingAnthropicClient
+
+
+def install() -> None:
+    """Make rlm's "anthropic" backend use the caching client (idempotent, raises ImportError)."""
+    import rlm.clients.anthropic as anthropic_backend
+
+    if getattr(anthropic_backend.AnthropicClient, "_rlm_query_prompt_cache", False):
+        return
+    client_class = _make_client_class()
+    client_class._rlm_query_prompt_cache = True
+    # rlm.clients.get_client imports AnthropicClient from this module on every call
+    anthropic_backend.AnthropicClient = client_class
+
+
+def cache_tokens(usage_summary) -> tuple[int, int]:
+    """(cache-write, cache-read) input tokens across all models in a UsageSummary."""
+    summaries = usage_summary.model_usage_summaries.values()
+    return (
+        sum(getattr(s, "cache_creation_input_tokens", 0) for s in summaries),
+        sum(getattr(s, "cache_read_input_tokens", 0) for s in summaries),
+    )
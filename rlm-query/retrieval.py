@@ -0,0 +1,194 @@
+"""
+retrieval.py — BM25 pre-filter for rlm-query.
+
+Splits a document into chunks that follow its "--- Page N ---" markers
+(pages longer than the chunk size are split on paragraph breaks; text without
+markers is chunked by paragraphs and labelled by line range), indexes them
+with BM25, and keeps only the top-k chunks for a question. The chunks are
+passed to RLM in document order, each under a "--- Page N ---" style header,
+so answers can still cite pages.
+
+The index is stored in the document cache (kind "bm25-c<chunk chars>") next to the
+extracted text, so each document is tokenised once. It holds chunk offsets
+into the loaded text rather than the text itself.
+"""
+
+import hashlib
+import json
+import math
+import re
+from collections import Counter
+
+INDEX_VERSION = "1"
+DEFAULT_CHUNK_CHARS = 4000
+MIN_CHUNK_CHARS = 100
+CHARS_PER_TOKEN = 4  # rough estimate for reporting; the API reports real usage
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_PAGE_MARKER = re.compile(r"^--- Page (\d+) ---\n", re.MULTILINE)
+_TOKEN = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was "
+    "were what when where which who will with how why do does did".split()
+)
+
+
+def tokenize(text: str) -> list[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+def _split_span(text: str, start: int, end: int, max_chars: int) -> list[tuple[int, int]]:
+    """Split text[start:end] into spans of at most ~max_chars, preferring paragraph breaks."""
+    spans = []
+    while end - start > max_chars:
+        cut = text.rfind("\n\n", start + max_chars // 2, start + max_chars)
+        if cut < 0:
+            cut = text.rfind("\n", start + max_chars // 2, start + max_chars)
+        if cut <= start:
+            # No break in range (or max_chars too small to leave one): hard cut, always forward
+            cut = start + max(1, max_chars)
+        spans.append((start, cut))
+        start = cut
+    if text[start:end].strip():
+        spans.append((start, end))
+    return spans
+
+
+def chunk_document(text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> list[tuple[int, int, str]]:
+    """(start, end, label) chunks covering the text; page markers are not part of a chunk."""
+    markers = list(_PAGE_MARKER.finditer(text))
+    chunks = []
+    if markers:
+        for i, marker in enumerate(markers):
+            end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+            for start, stop in _split_span(text, marker.end(), end, max_chars):
+                chunks.append((start, stop, f"Page {marker.group(1)}"))
+        return chunks
+
+    line, pos = 1, 0
+    for start, stop in _split_span(text, 0, len(text), max_chars):
+        line += text.count("\n", pos, start)
+        pos = start
+        last = line + text.count("\n", start, max(start, stop - 1))
+        chunks.append((start, stop, f"Lines {line}-{last}"))
+    return chunks
+
+
+class BM25Index:
+    """Inverted index over document chunks, scored with Okapi BM25."""
+
+    def __init__(self, chunks, postings, lengths, text_digest):
+        self.chunks = chunks          # [(start, end, label)]
+        self.postings = postings      # term -> [chunk ids..., term frequencies...]
+        self.lengths = lengths        # tokens per chunk
+        self.text_digest = text_digest
+        self.avg_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    @classmethod
+    def build(cls, text: str, max_chars: int = DEFAULT_CHUNK_CHARS) -> "BM25Index":
+        return cls.from_chunks(text, chunk_document(text, max_chars))
+
+    @classmethod
+    def from_chunks(cls, text: str, chunks: list[tuple[int, int, str]]) -> "BM25Index":
+        """Index caller-defined (start, end, label) chunks of ``text``."""
+        postings: dict[str, list[int]] = {}
+        lengths = []
+        for chunk_id, (start, end, _) in enumerate(chunks):
+            counts = Counter(tokenize(text[start:end]))
+            lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((chunk_id, tf))
+        flat = {
+            term: [c for c, _ in hits] + [tf for _, tf in hits] for term, hits in postings.items()
+        }
+        return cls(chunks, flat, lengths, cls.digest(text))
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "version": INDEX_VERSION,
+            "digest": self.text_digest,
+            "chunks": self.chunks,
+            "lengths": self.lengths,
+            "postings": self.postings,
+        }, separators=(",", ":"))
+
+    @classmethod
+    def from_json(cls, data: str) -> "BM25Index":
+        raw = json.loads(data)
+        if raw.get("version") != INDEX_VERSION:
+            raise ValueError("index version mismatch")
+        chunks = [tuple(c) for c in raw["chunks"]]
+        return cls(chunks, raw["postings"], raw["lengths"], raw["digest"])
+
+    def search(self, query: str, k: int) -> list[tuple[int, float]]:
+        """Top-k (chunk id, score), best first; chunks matching no query term are never returned."""
+        n = len(self.chunks)
+        scores: dict[int, float] = {}
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if not posting:
+                continue
+            half = len(posting) // 2
+            ids, tfs = posting[:half], posting[half:]
+            idf = math.log(1 + (n - half + 0.5) / (half + 0.5))
+            for chunk_id, tf in zip(ids, tfs):
+                norm = 1 - BM25_B + BM25_B * self.lengths[chunk_id] / (self.avg_length or 1)
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * tf * (BM25_K1 + 1) / (
+                    tf + BM25_K1 * norm
+                )
+        return sorted(scores.items(), key=lambda item: -item[1])[:k]
+
+
+def load_index(file_path: str, text: str, cache=None,
+               max_chars: int = DEFAULT_CHUNK_CHARS) -> BM25Index:
+    """The document's BM25 index from ``cache`` (a DocCache), building and storing it on a miss."""
+    kind = f"bm25-c{max_chars}"  # INDEX_VERSION is checked inside the stored JSON
+    if cache:
+        data = cache.get(file_path, kind=kind)
+        if data is not None:
+            try:
+                index = BM25Index.from_json(data)
+                if index.text_digest == BM25Index.digest(text):
+                    return index
+            except (ValueError, KeyError):
+                pass
+    index = BM25Index.build(text, max_chars)
+    if cache:
+        cache.put(file_path, index.to_json(), kind=kind)
+    return index
+
+
+def select_chunks(text: str, index: BM25Index, question: str, k: int) -> tuple[str, dict]:
+    """Top-k chunks for ``question`` in document order, with stats for the usage report.
+
+    Falls back to the first k chunks when no chunk shares a term with the question.
+    """
+    hits = index.search(question, k) or [(i, 0.0) for i in range(min(k, len(index.chunks)))]
+    selected = sorted(chunk_id for chunk_id, _ in hits)
+    parts = []
+    for chunk_id in selected:
+        start, end, label = index.chunks[chunk_id]
+        parts.append(f"--- {label} ---\n{text[start:end].strip()}")
+    filtered = "\n\n".join(parts)
+    stats = {
+        "chunks_total": len(index.chunks),
+        "chunks_sent": len(selected),
+        "pages": sorted({index.chunks[i][2] for i in selected}, key=_label_order),
+        "context_chars_full": len(text),
+        "context_chars_sent": len(filtered),
+    }
+    return filtered, stats
+
+
+def _label_order(label: str) -> int:
+    return int(re.search(r"\d+", label).group())
+
+
+def estimate_tokens(chars: int) -> int:
+    return chars // CHARS_PER_TOKEN
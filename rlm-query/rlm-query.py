@@ -8,22 +8,59 @@ through the RLM library for multi-step reasoning.
 Usage:
     python rlm-query.py <file_path> "<question>"
     python rlm-query.py <file_path> "<question>" --verbose
+    python rlm-query.py <file_path> "<question>" --stream      # progress + answer as it arrives
+    python rlm-query.py <file_path> "<question>" --trace run.json  # + run.chrome.json
     python rlm-query.py <file_path> "<question>" --model claude-sonnet-4-20250514
+    python rlm-query.py <file_path> "<question>" --no-cache
+    python rlm-query.py <file_path> "<question>" --retrieve 8
+    python rlm-query.py <file_path> "<question>" --tail 200M     # or --head SIZE / --range A:B
+    python rlm-query.py <file_path> "<question>" --summary-tree  # outline built once, then reused
+    python rlm-query.py <directory or "glob/**/*.pdf"> "<question>" [--concurrency 4]
+    python rlm-query.py <video-pipeline output dir or video dir> "<question>" [--retrieve 8]
+    python rlm-query.py <file_path> --questions questions.txt [--concurrency 4] [--output answers.jsonl]
+    python rlm-query.py --clear-cache
+    python rlm-query.py --serve                  # keep rlm warm; later queries use it
+    python rlm-query.py --stop-server
 
 Examples:
     python rlm-query.py big-document.txt "What are all the Medicare rate changes mentioned?"
     python rlm-query.py report.pdf "Summarize the key findings" --verbose
     python rlm-query.py notes.md "List all action items" --model claude-sonnet-4-20250514
 
+Extracted PDF text is cached on disk (see doc_cache.py), so repeated questions
+against the same document skip re-extraction, and answers are cached too (see
+answer_cache.py): asking the same question again returns without a model run.
+--questions answers a whole file of questions in one run (see batch_query.py).
+While `rlm-query.py --serve` is running, single-file questions are answered by
+that long-lived process instead (see server.py). Processed video-pipeline
+output is queried by time window, citing video ids, timestamps and keyframes
+(see video_query.py).
+
 API Key:
     Set ANTHROPIC_API_KEY environment variable, or point RLM_CONFIG_PATH to a JSON
     file with {"api_keys": {"anthropic": "sk-ant-..."}}
 """
 
 import argparse
+import atexit
 import json
 import os
 import sys
+from contextlib import nullcontext
+from datetime import datetime
+
+import batch_query
+import corpus_query
+import prompt_cache
+import retrieval
+import run_trace
+import server
+import streaming
+import summary_tree
+import video_query
+from answer_cache import AnswerCache, answer_key, context_variant
+from doc_cache import DocCache
+from file_loader import DocumentError, content_hash, parse_range, parse_size, read_document, read_text
 
 DEFAULT_MODEL = "claude-sonnet-4-20250514"
 
@@ -72,66 +109,343 @@ def load_api_key() -> str:
     return key
 
 
-def load_file(file_path: str) -> str:
-    """Load file contents. Supports .txt, .md, and .pdf."""
-    if not os.path.isfile(file_path):
-        print(f"Error: File not found: {file_path}", file=sys.stderr)
+def load_file(file_path: str, use_cache: bool = True, pdf_workers: int | None = None) -> str:
+    """Load file contents (see file_loader.read_document), exiting with a message on failure."""
+    try:
+        return read_document(file_path, use_cache=use_cache, pdf_workers=pdf_workers)
+    except DocumentError as e:
+        print(f"Error: {e}", file=sys.stderr)
         sys.exit(1)
 
-    ext = os.path.splitext(file_path)[1].lower()
 
-    if ext == ".pdf":
-        try:
-            import pymupdf  # PyMuPDF
-        except ImportError:
-            try:
-                import fitz as pymupdf  # older PyMuPDF import name
-            except ImportError:
-                print(
-                    "Error: pymupdf (PyMuPDF) is required for PDF files. "
-                    "Install with: pip install pymupdf",
-                    file=sys.stderr,
-                )
-                sys.exit(1)
+def load_text_range(file_path: str, byte_range: tuple[int, int | None]) -> tuple[str, str]:
+    """Part of a text file, plus a label for the document header; exits on failure."""
+    try:
+        text, (start, end, size) = read_text(file_path, byte_range)
+    except (OSError, ValueError) as e:
+        print(f"Error: Failed to read file: {e}", file=sys.stderr)
+        sys.exit(1)
+    return text, f"bytes {start:,}-{end:,} of {size:,}"
 
-        try:
-            doc = pymupdf.open(file_path)
-            text_parts = []
-            for page_num, page in enumerate(doc, 1):
-                page_text = page.get_text()
-                if page_text.strip():
-                    text_parts.append(f"--- Page {page_num} ---\n{page_text}")
-            doc.close()
-            if not text_parts:
-                print(
-                    f"Warning: PDF appears to contain no extractable text: {file_path}",
-                    file=sys.stderr,
-                )
-                return "(empty PDF)"
-            return "\n\n".join(text_parts)
-        except Exception as e:
-            print(f"Error: Failed to read PDF: {e}", file=sys.stderr)
-            sys.exit(1)
 
-    elif ext in (".txt", ".md", ".json", ".csv", ".log", ".xml", ".html", ".yaml", ".yml"):
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
-        except UnicodeDecodeError:
-            with open(file_path, "r", encoding="latin-1") as f:
-                return f.read()
-        except Exception as e:
-            print(f"Error: Failed to read file: {e}", file=sys.stderr)
-            sys.exit(1)
+def positive_size(text: str) -> int:
+    """argparse type for --head/--tail: a size (see parse_size) of at least one byte."""
+    size = parse_size(text)
+    if size < 1:
+        raise argparse.ArgumentTypeError(f"size must be at least 1 byte: {text!r}")
+    return size
+
 
+def print_usage(record: dict, no_prompt_cache: bool = False) -> None:
+    """The --verbose usage block for an answer record (see batch_query.result_fields)."""
+    cached_at = record.get("cached_at")
+    if cached_at is not None:
+        when = datetime.fromtimestamp(cached_at).strftime("%Y-%m-%d %H:%M")
+        print(f"\n--- Usage (answer cache hit, stored {when}; no model calls) ---", file=sys.stderr)
     else:
-        # Try reading as text anyway
+        print("\n--- Usage ---", file=sys.stderr)
+    print(f"  Input tokens:  {record.get('input_tokens', 0):,}", file=sys.stderr)
+    print(f"  Output tokens: {record.get('output_tokens', 0):,}", file=sys.stderr)
+    if not no_prompt_cache:
+        print(f"  Cache write:   {record.get('cache_write_tokens', 0):,}", file=sys.stderr)
+        print(f"  Cache read:    {record.get('cache_read_tokens', 0):,}", file=sys.stderr)
+    if record.get("cost") is not None:
+        print(f"  Cost:          ${record['cost']:.6f}", file=sys.stderr)
+    stats = record.get("retrieval")
+    if stats:
+        sent = retrieval.estimate_tokens(stats["context_chars_sent"])
+        full = retrieval.estimate_tokens(stats["context_chars_full"])
+        print(f"  Context sent:  ~{sent:,} tokens with retrieval, ~{full:,} without "
+              f"({stats['chunks_sent']} of {stats['chunks_total']} chunks)", file=sys.stderr)
+        print(f"  Excerpts from: {', '.join(stats['pages'])}", file=sys.stderr)
+    stats = record.get("video")
+    if stats:
+        print(f"  Context sent:  ~{retrieval.estimate_tokens(stats['context_chars_sent']):,} "
+              f"tokens ({stats['spans_sent']} of {stats['spans_total']} "
+              f"{video_query.SPAN_SECONDS}s spans, {stats['videos_sent']} of "
+              f"{stats['videos_total']} videos)", file=sys.stderr)
+        print(f"  Spans:         {', '.join(stats['spans'])}", file=sys.stderr)
+    print(f"  Time:          {record['execution_time']:.1f}s", file=sys.stderr)
+
+
+def answer_key_for(args, byte_range=None):
+    """question -> answer-cache key for this document and these settings."""
+    doc_hash = content_hash(args.file_path, byte_range)
+    variant = context_variant(args.retrieve, args.chunk_chars, byte_range, args.summary_tree)
+    return lambda question: answer_key(
+        doc_hash, question, args.model, args.max_iterations, args.max_depth, variant
+    )
+
+
+def video_answer_key_for(args):
+    """question -> answer-cache key for a video corpus and these settings."""
+    try:
+        videos, _, _ = video_query.load_videos(args.file_path)
+    except DocumentError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    doc_hash = video_query.corpus_hash(videos)
+    variant = video_query.answer_variant(args.retrieve or video_query.DEFAULT_SPANS)
+    return lambda question: answer_key(
+        doc_hash, question, args.model, args.max_iterations, args.max_depth, variant
+    )
+
+
+def retrieval_selector(args, file_content: str):
+    """question -> (top-k excerpt text, stats) over the document's persistent BM25 index."""
+    index = retrieval.load_index(
+        args.file_path, file_content,
+        cache=None if args.no_cache else DocCache(),
+        max_chars=args.chunk_chars,
+    )
+    return lambda question: retrieval.select_chunks(file_content, index, question, args.retrieve)
+
+
+def load_summary_tree(args, file_content: str, api_key: str) -> tuple[dict, bool]:
+    """(summary tree, built now): from the document cache, built and reported on a miss."""
+    cache = None if args.no_cache else DocCache()
+    tree = None
+    if cache:
+        tree = summary_tree.load_tree(args.file_path, file_content, args.model, cache)
+    if tree is None:
         try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return f.read()
+            tree = summary_tree.build_and_store(
+                args.file_path, file_content, api_key, args.model, cache,
+                concurrency=args.concurrency,
+            )
+        except ImportError:
+            print("Error: anthropic library not installed. Install with: pip install anthropic",
+                  file=sys.stderr)
+            sys.exit(1)
         except Exception as e:
-            print(f"Error: Cannot read file with extension '{ext}': {e}", file=sys.stderr)
+            print(f"Error: Failed to build the summary tree: {e}", file=sys.stderr)
             sys.exit(1)
+        print(f"Summary tree: {summary_tree.describe(tree)}", file=sys.stderr)
+        return tree, True
+    if args.verbose or not (args.question or args.questions):
+        print(f"Summary tree (stored): {summary_tree.describe(tree)}", file=sys.stderr)
+    return tree, False
+
+
+def run_questions(args, file_name: str, file_content: str, rlm_kwargs: dict,
+                  tree: dict | None = None) -> None:
+    """Batch mode: answer every question in args.questions, exit 1 if any failed."""
+    try:
+        questions = batch_query.read_questions(args.questions)
+    except OSError as e:
+        print(f"Error: Cannot read questions file: {e}", file=sys.stderr)
+        sys.exit(1)
+    if not questions:
+        print(f"Error: No questions in {args.questions}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        import rlm  # noqa: F401  (fail fast, before starting workers)
+    except ImportError:
+        print("Error: rlm library not installed. Install with: pip install rlms", file=sys.stderr)
+        sys.exit(1)
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        records = batch_query.run_batch(
+            file_name, file_content, questions, rlm_kwargs, out,
+            concurrency=args.concurrency, use_prompt_cache=not args.no_prompt_cache,
+            answers=None if args.no_cache else AnswerCache(),
+            answer_key=answer_key_for(args),
+            select=retrieval_selector(args, file_content) if args.retrieve else None,
+            document=summary_tree.tree_prompt(file_name, file_content, tree) if tree else None,
+        )
+    except KeyboardInterrupt:
+        print("\nCancelled.", file=sys.stderr)
+        sys.exit(130)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+    if any(r["error"] for r in records):
+        sys.exit(1)
+
+
+def start_streaming() -> streaming.Progress:
+    """Stream model responses: progress to stderr, answer drafts to stdout."""
+    progress = streaming.Progress(streaming.AnswerStream())
+    streaming.install(progress)
+    return progress
+
+
+def rlm_callbacks(*observers) -> dict:
+    """RLM() child-RLM callbacks that notify each observer (streaming Progress, Tracer)."""
+    observers = [o for o in observers if o]
+    if not observers:
+        return {}
+
+    def started(*args):
+        for observer in observers:
+            observer.subcall_started(*args)
+
+    def finished(*args):
+        for observer in observers:
+            observer.subcall_finished(*args)
+
+    return {"on_subcall_start": started, "on_subcall_complete": finished}
+
+
+def step(tracer: run_trace.Tracer | None, name: str, **args):
+    """A --trace span around a local step (yields a dict for more args), or a no-op."""
+    return tracer.span(name, **args) if tracer else nullcontext({})
+
+
+def write_trace(tracer: run_trace.Tracer, args) -> None:
+    run = {
+        "file": args.file_path,
+        "question": args.question,
+        "model": args.model,
+        "max_iterations": args.max_iterations,
+        "max_depth": args.max_depth,
+        "retrieve": args.retrieve,
+        "prompt_cache": not args.no_prompt_cache,
+        "stream": args.stream,
+    }
+    try:
+        json_path, chrome_path = tracer.write(args.trace, run)
+    except OSError as e:
+        print(f"Warning: Could not write trace: {e}", file=sys.stderr)
+        return
+    print(f"Trace written to {json_path} and {chrome_path} "
+          f"(open the latter in chrome://tracing or ui.perfetto.dev)", file=sys.stderr)
+
+
+def print_answer(answer: str, progress: streaming.Progress | None = None) -> None:
+    if progress:
+        progress.answer.finish(answer)
+        progress.done()
+    else:
+        print(answer)
+
+
+def serve(args) -> None:
+    """--serve: answer questions from thin clients until stopped."""
+    if server.status(args.socket) is not None:
+        print(f"Error: a server is already listening on {args.socket}", file=sys.stderr)
+        sys.exit(1)
+    api_key = load_api_key()
+    os.environ["ANTHROPIC_API_KEY"] = api_key
+    query_server = server.QueryServer(
+        args.socket, api_key, args.model, use_prompt_cache=not args.no_prompt_cache
+    )
+    try:
+        query_server.warm_up()
+    except ImportError:
+        print("Error: rlm library not installed. Install with: pip install rlms", file=sys.stderr)
+        sys.exit(1)
+    print(f"rlm-query server listening on {args.socket} (pid {os.getpid()}); "
+          f"stop with --stop-server or Ctrl-C", file=sys.stderr, flush=True)
+    try:
+        query_server.serve_forever()
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
+    print("rlm-query server stopped.", file=sys.stderr)
+
+
+def ask_server(args, byte_range=None) -> dict | None:
+    """The server's answer record for this question, or None to answer it in-process."""
+    request = {
+        "file_path": os.path.abspath(args.file_path),
+        "question": args.question,
+        "model": args.model,
+        "max_iterations": args.max_iterations,
+        "max_depth": args.max_depth,
+        "timeout": args.timeout,
+        "retrieve": args.retrieve,
+        "chunk_chars": args.chunk_chars,
+        "byte_range": byte_range,
+        "no_cache": args.no_cache,
+        "no_prompt_cache": args.no_prompt_cache,
+        "pdf_workers": args.pdf_workers,
+    }
+    try:
+        record = server.ask(request, args.socket)
+    except server.ServerError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    if record is None or record.get("retry_locally"):
+        return None
+    if record.get("error"):
+        print(f"Error: {record['error']}", file=sys.stderr)
+        sys.exit(1)
+    return record
+
+
+def run_corpus(args, rlm_kwargs: dict) -> None:
+    """Directory/glob mode: per-file answers (map), then one combined answer (reduce)."""
+    files = corpus_query.expand_corpus(args.file_path)
+    if not files:
+        print(f"Error: No supported files found at {args.file_path}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        import rlm  # noqa: F401  (fail fast, before starting workers)
+    except ImportError:
+        print("Error: rlm library not installed. Install with: pip install rlms", file=sys.stderr)
+        sys.exit(1)
+
+    settings = {
+        "use_cache": not args.no_cache,
+        "model": args.model,
+        "max_iterations": args.max_iterations,
+        "max_depth": args.max_depth,
+        "variant": "map" + (f":{context_variant(args.retrieve, args.chunk_chars)}"
+                            if args.retrieve else ""),
+        "retrieve": args.retrieve,
+        "chunk_chars": args.chunk_chars,
+    }
+    out = open(args.output, "w", encoding="utf-8") if args.output else None
+    try:
+        records = corpus_query.run_map(
+            files, args.question, rlm_kwargs, settings, out,
+            concurrency=args.concurrency, use_prompt_cache=not args.no_prompt_cache,
+        )
+        relevant = [r for r in records if corpus_query.is_relevant(r)]
+        failed = sum(1 for r in records if r["error"])
+        print(f"\n{len(records)} files: {len(relevant)} relevant, {failed} failed", file=sys.stderr)
+        if not relevant:
+            print("No file contained information relevant to the question.")
+            sys.exit(1 if failed else 0)
+
+        if not args.no_prompt_cache:
+            prompt_cache.install()
+        progress = start_streaming() if args.stream else None
+        print(f"Combining {len(relevant)} answers...", file=sys.stderr)
+        result = corpus_query.run_reduce(
+            args.question, relevant, rlm_kwargs, args.verbose,
+            **rlm_callbacks(progress),
+        )
+    except KeyboardInterrupt:
+        print("\nCancelled.", file=sys.stderr)
+        sys.exit(130)
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if out:
+            out.close()
+
+    print_answer(result.response, progress)
+    print("\nSources:")
+    for r in relevant:
+        print(f"  {r['file']}")
+
+    if args.verbose:
+        ran = [r for r in records if not r.get("cached")]
+        print("\n--- Map usage ---", file=sys.stderr)
+        print(f"  Files queried: {len(ran)} ({len(records) - len(ran)} from answer cache)",
+              file=sys.stderr)
+        print(f"  Input tokens:  {sum(r.get('input_tokens', 0) for r in ran):,}", file=sys.stderr)
+        print(f"  Output tokens: {sum(r.get('output_tokens', 0) for r in ran):,}", file=sys.stderr)
+        print_usage(batch_query.result_fields(result), args.no_prompt_cache)
 
 
 def main():
@@ -143,10 +457,16 @@ def main():
   python rlm-query.py report.pdf "Summarize the findings" --verbose
   python rlm-query.py data.md "List all action items" --model claude-sonnet-4-20250514
   python rlm-query.py big-file.txt "Extract all dates mentioned" --max-iterations 20
+  python rlm-query.py contract.pdf --questions questions.txt --output answers.jsonl
+  python rlm-query.py reports/ "Which reports mention rate cuts?" --output per-file.jsonl
         """,
     )
-    parser.add_argument("file_path", help="Path to the file to analyze (.txt, .md, .pdf, etc.)")
-    parser.add_argument("question", help="The question to ask about the file contents")
+    parser.add_argument(
+        "file_path", nargs="?",
+        help="File to analyze (.txt, .md, .pdf, etc.), a directory / quoted glob of files, "
+        "or video-pipeline output (its directory or index.json, or one video's directory)",
+    )
+    parser.add_argument("question", nargs="?", help="The question to ask about the file contents")
     parser.add_argument(
         "--model",
         default=DEFAULT_MODEL,
@@ -157,6 +477,17 @@ def main():
         action="store_true",
         help="Show RLM's reasoning steps and iteration details",
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print progress to stderr while RLM runs and the answer as it is written",
+    )
+    parser.add_argument(
+        "--trace",
+        metavar="FILE",
+        help="Record timing, tokens and cost per step, iteration and sub-call to FILE (JSON) "
+        "and a Chrome trace-event file next to it",
+    )
     parser.add_argument(
         "--max-iterations",
         type=int,
@@ -176,56 +507,315 @@ def main():
         help="Maximum execution time in seconds (default: no limit)",
     )
 
+    parser.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=None,
+        help="Processes for PDF text extraction (default: CPU count; 1 = serial)",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Bypass the document and answer caches (re-extract and re-run, store nothing)",
+    )
+    parser.add_argument(
+        "--clear-cache",
+        action="store_true",
+        help="Delete the document and answer caches (runs the query afterwards if one is given)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a long-lived server that answers later queries with rlm, the API client "
+        "and loaded documents kept warm",
+    )
+    parser.add_argument(
+        "--stop-server",
+        action="store_true",
+        help="Stop the running --serve process",
+    )
+    parser.add_argument(
+        "--no-server",
+        action="store_true",
+        help="Answer in this process even if a --serve process is running",
+    )
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        default=server.SOCKET_PATH,
+        help=f"Unix socket of the --serve process (default: {server.SOCKET_PATH})",
+    )
+
+    parser.add_argument(
+        "--no-prompt-cache",
+        action="store_true",
+        help="Don't mark prompt prefixes for Anthropic prompt caching",
+    )
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument(
+        "--head",
+        type=positive_size,
+        metavar="SIZE",
+        help="Only read the first SIZE of a text file (e.g. 500M), cut at a line break",
+    )
+    selection.add_argument(
+        "--tail",
+        type=positive_size,
+        metavar="SIZE",
+        help="Only read the last SIZE of a text file (e.g. 200M), cut at a line break",
+    )
+    selection.add_argument(
+        "--range",
+        type=parse_range,
+        metavar="START:END",
+        help="Only read bytes START:END of a text file (e.g. 1G:1500M, either side optional)",
+    )
+    parser.add_argument(
+        "--retrieve",
+        type=int,
+        metavar="K",
+        help="Send only the K chunks that best match the question (BM25 pre-filter); for "
+        f"video output, the K best one-minute spans (default: {video_query.DEFAULT_SPANS})",
+    )
+    parser.add_argument(
+        "--chunk-chars",
+        type=int,
+        default=retrieval.DEFAULT_CHUNK_CHARS,
+        help=f"Chunk size for --retrieve (default: {retrieval.DEFAULT_CHUNK_CHARS} characters)",
+    )
+    parser.add_argument(
+        "--summary-tree",
+        action="store_true",
+        help="Put a summary tree of the document in front of it (built with the model and "
+        "stored on first use) so the model reads only the relevant parts; without a question, "
+        "just build it",
+    )
+    parser.add_argument(
+        "--questions",
+        metavar="FILE",
+        help="Answer every question in FILE (one per line) and write JSON Lines answers",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=batch_query.DEFAULT_CONCURRENCY,
+        help=f"Questions or files answered at once with --questions or a directory, and "
+        f"parts summarised at once by --summary-tree (default: {batch_query.DEFAULT_CONCURRENCY})",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="Write --questions answers to FILE instead of stdout "
+        "(for a directory: the per-file answers as JSON Lines)",
+    )
+
     args = parser.parse_args()
 
+    if args.clear_cache:
+        freed = DocCache().clear() + AnswerCache().clear()
+        print(f"Cleared document and answer caches ({freed / 1024 / 1024:.1f} MB).", file=sys.stderr)
+        if not args.file_path:
+            return
+
+    if args.stop_server:
+        if server.stop(args.socket):
+            print("rlm-query server stopping.", file=sys.stderr)
+        else:
+            print(f"No rlm-query server is running on {args.socket}.", file=sys.stderr)
+        return
+    if args.serve:
+        if args.file_path or args.questions:
+            parser.error("--serve takes no file_path, question or --questions")
+        serve(args)
+        return
+
+    # Checked before is_corpus_path, which a pipeline output directory also matches
+    video = bool(args.file_path) and video_query.is_video_path(args.file_path)
+    corpus = bool(args.file_path) and not video and corpus_query.is_corpus_path(args.file_path)
+
+    if args.questions:
+        if not args.file_path or args.question:
+            parser.error("--questions takes a file_path and no question")
+        if corpus or video:
+            parser.error("--questions takes a single file, not a directory, glob or video output")
+        if args.stream:
+            parser.error("--stream answers a single question, not --questions")
+        if args.trace:
+            parser.error("--trace traces a single question, not --questions")
+    elif not args.file_path or not (args.question or args.summary_tree):
+        parser.error("file_path and question are required")
+    if args.concurrency < 1:
+        parser.error("--concurrency must be at least 1")
+    if args.retrieve is not None and args.retrieve < 1:
+        parser.error("--retrieve must be at least 1")
+    if args.chunk_chars < retrieval.MIN_CHUNK_CHARS:
+        parser.error(f"--chunk-chars must be at least {retrieval.MIN_CHUNK_CHARS}")
+    if args.summary_tree and (corpus or video):
+        parser.error("--summary-tree applies to a single file, not a directory, glob or "
+                     "video output")
+    if args.summary_tree and args.retrieve:
+        parser.error("--summary-tree and --retrieve are alternatives; use one")
+    if args.trace and corpus:
+        parser.error("--trace traces a single file, not a directory or glob")
+
+    byte_range = None
+    if args.head is not None:
+        byte_range = (0, args.head)
+    elif args.tail is not None:
+        byte_range = (-args.tail, None)
+    elif args.range is not None:
+        byte_range = args.range
+    if byte_range and (
+        args.questions
+        or corpus
+        or video
+        or args.file_path.lower().endswith(".pdf")
+        or args.summary_tree
+    ):
+        parser.error("--head/--tail/--range apply to a single text file, without --summary-tree")
+
+    # Written at exit, so a failed or interrupted run still leaves its trace
+    tracer = None
+    if args.trace:
+        tracer = run_trace.Tracer()
+        atexit.register(write_trace, tracer, args)
+
+    # A repeated question needs neither the file contents nor the API
+    answers = key = None
+    if args.question and not args.no_cache and (video or os.path.isfile(args.file_path)):
+        with step(tracer, "answer cache lookup") as span:
+            answers = AnswerCache()
+            answer_key_of = video_answer_key_for(args) if video else answer_key_for(args, byte_range)
+            key = answer_key_of(args.question)
+            cached = answers.get(key)
+            span["hit"] = cached is not None
+        if cached is not None:
+            print(cached["answer"])
+            if args.verbose:
+                print_usage(cached, args.no_prompt_cache)
+            return
+
+    # A running --serve process answers single-file questions without the
+    # imports, client setup and file load below
+    if not (
+        args.no_server or args.questions or args.verbose or args.stream or args.trace
+        or args.summary_tree or corpus or video
+    ):
+        record = ask_server(args, byte_range)
+        if record is not None:
+            print(record["answer"])
+            return
+
     # Load API key
     api_key = load_api_key()
 
     # Set env var as well (some libraries check it)
     os.environ["ANTHROPIC_API_KEY"] = api_key
 
-    # Load file
-    file_content = load_file(args.file_path)
-    file_name = os.path.basename(args.file_path)
-
-    # Build the prompt: file content as context + question
-    prompt = (
-        f"=== DOCUMENT: {file_name} ===\n"
-        f"{file_content}\n"
-        f"=== END DOCUMENT ===\n\n"
-        f"Question: {args.question}"
-    )
+    rlm_kwargs = {
+        "backend": "anthropic",
+        "backend_kwargs": {
+            "api_key": api_key,
+            "model_name": args.model,
+        },
+        "max_iterations": args.max_iterations,
+        "max_depth": args.max_depth,
+        "max_timeout": args.timeout,
+    }
+
+    if corpus:
+        run_corpus(args, rlm_kwargs)
+        return
+
+    # Load file, or for video output only the time windows that match the question
+    video_stats = None
+    if video:
+        spans = args.retrieve or video_query.DEFAULT_SPANS
+        with step(tracer, "video windows", path=args.file_path, k=spans) as span:
+            try:
+                file_name, file_content, video_stats = video_query.video_context(
+                    args.file_path, args.question, spans, use_cache=not args.no_cache
+                )
+            except (DocumentError, OSError, ValueError) as e:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+            span.update(video_stats)
+    else:
+        file_name = os.path.basename(args.file_path)
+        with step(tracer, "load file", path=args.file_path) as span:
+            if byte_range:
+                file_content, label = load_text_range(args.file_path, byte_range)
+                file_name = f"{file_name} ({label})"
+            else:
+                file_content = load_file(
+                    args.file_path, use_cache=not args.no_cache, pdf_workers=args.pdf_workers
+                )
+            span["chars"] = len(file_content)
+
+    tree = None
+    if args.summary_tree:
+        with step(tracer, "summary tree") as span:
+            tree, span["built"] = load_summary_tree(args, file_content, api_key)
+            if span["built"]:
+                span.update(tree["build"])
+        if not (args.question or args.questions):
+            return
+
+    if args.questions:
+        run_questions(args, file_name, file_content, rlm_kwargs, tree)
+        return
+
+    # Optionally narrow the document to the chunks that match the question
+    retrieval_stats = None
+    if args.retrieve and not video:
+        with step(tracer, "retrieval", k=args.retrieve) as span:
+            file_content, retrieval_stats = retrieval_selector(args, file_content)(args.question)
+            file_name = batch_query.excerpt_name(file_name, retrieval_stats)
+            span.update(retrieval_stats)
+
+    # Build the prompt: file content as context + question. Only the prompt is
+    # kept, so a large file is held in memory once, not twice
+    with step(tracer, "build prompt") as span:
+        if tree:
+            prompt = summary_tree.tree_prompt(file_name, file_content, tree, args.question)
+        else:
+            prompt = batch_query.document_prompt(file_name, file_content, args.question)
+        span["chars"] = len(prompt)
+    del file_content
 
     # Initialize and run RLM
     try:
-        from rlm import RLM
-
-        model = RLM(
-            backend="anthropic",
-            backend_kwargs={
-                "api_key": api_key,
-                "model_name": args.model,
-            },
-            max_iterations=args.max_iterations,
-            max_depth=args.max_depth,
-            max_timeout=args.timeout,
-            verbose=args.verbose,
-        )
-
-        result = model.completion(prompt, root_prompt=args.question)
-
-        # Print the final answer
-        print(result.response)
+        with step(tracer, "rlm setup", cat="rlm"):
+            from rlm import RLM
+
+            if not args.no_prompt_cache:
+                prompt_cache.install()
+            progress = start_streaming() if args.stream else None
+            if tracer:
+                run_trace.install(tracer)  # outermost, so it times streaming and caching too
+
+            model = RLM(**rlm_kwargs, verbose=args.verbose, **rlm_callbacks(progress, tracer))
+
+        with step(tracer, "rlm completion", cat="rlm"):
+            root_prompt = video_query.cited_question(args.question) if video else args.question
+            result = model.completion(prompt, root_prompt=root_prompt)
+            if tracer:
+                tracer.finish()
+
+        # Print the final answer (completing the streamed draft, if any)
+        print_answer(result.response, progress)
+
+        record = batch_query.result_fields(result)
+        if retrieval_stats:
+            record["retrieval"] = retrieval_stats
+        if video_stats:
+            record["video"] = video_stats
+        if answers:
+            answers.put(key, record)
 
         # Print usage stats if verbose
         if args.verbose and result.usage_summary:
-            usage = result.usage_summary
-            print("\n--- Usage ---", file=sys.stderr)
-            print(f"  Input tokens:  {usage.total_input_tokens:,}", file=sys.stderr)
-            print(f"  Output tokens: {usage.total_output_tokens:,}", file=sys.stderr)
-            if usage.total_cost is not None:
-                print(f"  Cost:          ${usage.total_cost:.6f}", file=sys.stderr)
-            print(f"  Time:          {result.execution_time:.1f}s", file=sys.stderr)
+            print_usage(record, args.no_prompt_cache)
 
     except ImportError:
         print("Error: rlm library not installed. Install with: pip install rlms", file=sys.stderr)
@@ -0,0 +1,327 @@
+"""
+run_trace.py — Per-iteration timing trace of an rlm-query run (--trace).
+
+The --verbose usage block only has totals. A Tracer records spans with
+start/end times (seconds since the run started):
+
+    local      answer-cache lookup, file load, retrieval, prompt build
+    rlm        the whole completion, each root iteration, the REPL time
+               between a model response and the next iteration, and every
+               child RLM (max depth > 1)
+    model      every model request, with depth, tokens and estimated cost
+
+and writes them twice: as JSON (spans plus totals per depth and category)
+and as Chrome trace events, which chrome://tracing, https://ui.perfetto.dev
+and speedscope open as a timeline / flame graph.
+
+Model requests are seen through rlm's Anthropic client, which install()
+subclasses like prompt_cache.install() does. A request on the main thread
+outside any child RLM is a root iteration (rlm 0.1.3 never fires its
+on_iteration_* callbacks); llm_query() sub-calls arrive on rlm's LM handler
+threads. Install the tracer after prompt caching and streaming, so that it
+wraps both.
+
+Cost is estimated from list prices per million tokens (PRICES, matched on the
+longest model-name prefix); models not in the table get cost null.
+"""
+
+import contextvars
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+# USD per million tokens: input, output, cache write, cache read
+PRICES = {
+    "claude-opus-4-5": (5.0, 25.0, 6.25, 0.50),
+    "claude-opus-4": (15.0, 75.0, 18.75, 1.50),
+    "claude-sonnet-4": (3.0, 15.0, 3.75, 0.30),
+    "claude-3-7-sonnet": (3.0, 15.0, 3.75, 0.30),
+    "claude-3-5-sonnet": (3.0, 15.0, 3.75, 0.30),
+    "claude-haiku-4": (1.0, 5.0, 1.25, 0.10),
+    "claude-3-5-haiku": (0.80, 4.0, 1.0, 0.08),
+}
+
+_tracer = None  # the Tracer traced clients report to (set by install)
+_current_call = contextvars.ContextVar("rlm_query_trace_call", default=None)
+
+
+def estimate_cost(model: str, input_tokens: int, output_tokens: int,
+                  cache_write_tokens: int = 0, cache_read_tokens: int = 0) -> float | None:
+    matches = [prefix for prefix in PRICES if model.startswith(prefix)]
+    if not matches:
+        return None
+    prices = PRICES[max(matches, key=len)]
+    tokens = (input_tokens, output_tokens, cache_write_tokens, cache_read_tokens)
+    return sum(n * price for n, price in zip(tokens, prices)) / 1_000_000
+
+
+def trace_paths(path: str) -> tuple[str, str]:
+    """(JSON span file, Chrome trace file) for a --trace path: run.json -> run.chrome.json."""
+    stem = path[:-5] if path.endswith(".json") else path
+    return f"{stem}.json", f"{stem}.chrome.json"
+
+
+class Tracer:
+    """Collects the spans of one run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.lock = threading.Lock()
+        self.main_thread = threading.main_thread()
+        self.spans: list[dict] = []
+        self.threads: dict[int, str] = {}   # thread ident -> name, in order of first span
+        self.children: list[dict] = []      # open child RLM spans on the main thread
+        self.iterations: dict[int, int] = {0: 0}
+        self.open_iterations: dict[int, dict] = {}  # depth -> open iteration span
+
+    def now(self) -> float:
+        return time.perf_counter() - self.started
+
+    def _add(self, span: dict) -> None:
+        span["seconds"] = round(span["end"] - span["start"], 6)
+        thread = threading.current_thread()
+        span.setdefault("thread", thread.ident)
+        with self.lock:
+            if span["thread"] not in self.threads:
+                main = span["thread"] == self.main_thread.ident
+                self.threads[span["thread"]] = "main" if main else f"sub-calls ({thread.name})"
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "local", depth: int = 0, **args):
+        """Time a block; the yielded dict can take more args (e.g. sizes known afterwards)."""
+        span = {"name": name, "cat": cat, "depth": depth, "start": self.now(), "args": args}
+        try:
+            yield args
+        finally:
+            span["end"] = self.now()
+            self._add(span)
+
+    # rlm callbacks (on_subcall_start / on_subcall_complete)
+
+    def subcall_started(self, depth: int, model: str, prompt_preview: str) -> None:
+        if threading.current_thread() is not self.main_thread:
+            return
+        with self.lock:
+            self.children.append({"name": f"child RLM (depth {depth})", "cat": "rlm",
+                                  "depth": depth, "start": self.now(), "args": {"model": model}})
+            self.iterations[depth] = 0
+
+    def subcall_finished(self, depth: int, model: str, duration: float, error) -> None:
+        if threading.current_thread() is not self.main_thread:
+            return
+        self._close_iteration(depth)
+        with self.lock:
+            if not self.children:
+                return
+            span = self.children.pop()
+        span["end"] = self.now()
+        if error:
+            span["args"]["error"] = error
+        self._add(span)
+
+    # model requests (from the traced client)
+
+    def call_started(self, model: str) -> dict:
+        main = threading.current_thread() is self.main_thread
+        with self.lock:
+            depth = self.children[-1]["depth"] if self.children else 0
+        if not main:
+            return {"name": "sub-call", "cat": "model", "depth": depth + 1,
+                    "start": self.now(), "args": {"model": model}}
+
+        self._close_iteration(depth)
+        with self.lock:
+            self.iterations[depth] = self.iterations.get(depth, 0) + 1
+            iteration = self.iterations[depth]
+            start = self.now()
+            self.open_iterations[depth] = {
+                "name": f"iteration {iteration}", "cat": "rlm", "depth": depth,
+                "start": start, "args": {"iteration": iteration}, "response_end": None,
+            }
+        return {"name": f"model call (iteration {iteration})", "cat": "model", "depth": depth,
+                "start": start, "args": {"model": model, "iteration": iteration}}
+
+    def call_usage(self, call: dict, usage) -> None:
+        args = call["args"]
+        args["input_tokens"] = usage.input_tokens
+        args["output_tokens"] = usage.output_tokens
+        args["cache_write_tokens"] = getattr(usage, "cache_creation_input_tokens", None) or 0
+        args["cache_read_tokens"] = getattr(usage, "cache_read_input_tokens", None) or 0
+        args["cost"] = estimate_cost(
+            args["model"], args["input_tokens"], args["output_tokens"],
+            args["cache_write_tokens"], args["cache_read_tokens"],
+        )
+
+    def call_finished(self, call: dict, error: BaseException | None = None) -> None:
+        call["end"] = self.now()
+        if error is not None:
+            call["args"]["error"] = f"{type(error).__name__}: {error}"
+        self._add(call)
+        if call["name"] != "sub-call":
+            with self.lock:
+                iteration = self.open_iterations.get(call["depth"])
+                if iteration:
+                    iteration["response_end"] = call["end"]
+                    for key in ("input_tokens", "output_tokens", "cache_write_tokens",
+                                "cache_read_tokens", "cost"):
+                        iteration["args"][key] = call["args"].get(key)
+
+    def _close_iteration(self, depth: int) -> None:
+        """End the open iteration at ``depth``; the time after its response is REPL time."""
+        with self.lock:
+            iteration = self.open_iterations.pop(depth, None)
+        if not iteration:
+            return
+        end = self.now()
+        response_end = iteration.pop("response_end")
+        if response_end is not None:
+            self._add({"name": "repl", "cat": "rlm", "depth": depth, "start": response_end,
+                       "end": end, "args": {"iteration": iteration["args"]["iteration"]}})
+        iteration["end"] = end
+        self._add(iteration)
+
+    def finish(self) -> None:
+        """Close spans still open (the last iteration, or everything after an error)."""
+        for depth in sorted(self.open_iterations, reverse=True):
+            self._close_iteration(depth)
+        while self.children:
+            span = self.children.pop()
+            span["end"] = self.now()
+            self._add(span)
+
+    # export
+
+    def totals(self) -> dict:
+        """Seconds, tokens and cost of model calls per depth, and seconds per category."""
+        by_depth: dict[str, dict] = {}
+        for span in self.spans:
+            if span["cat"] != "model":
+                continue
+            entry = by_depth.setdefault(str(span["depth"]), {
+                "calls": 0, "seconds": 0.0, "input_tokens": 0, "output_tokens": 0,
+                "cache_write_tokens": 0, "cache_read_tokens": 0, "cost": 0.0,
+            })
+            entry["calls"] += 1
+            entry["seconds"] = round(entry["seconds"] + span["seconds"], 6)
+            for key in ("input_tokens", "output_tokens", "cache_write_tokens", "cache_read_tokens"):
+                entry[key] += span["args"].get(key) or 0
+            cost = span["args"].get("cost")
+            entry["cost"] = None if cost is None or entry["cost"] is None else entry["cost"] + cost
+
+        by_name: dict[str, float] = {}
+        for span in self.spans:
+            if span["cat"] == "local" or span["name"] in ("repl", "rlm setup", "rlm completion"):
+                by_name[span["name"]] = round(by_name.get(span["name"], 0.0) + span["seconds"], 6)
+        return {"wall_seconds": round(self.now(), 6), "model_calls_by_depth": by_depth,
+                "seconds_by_step": by_name}
+
+    def to_json(self, run: dict) -> dict:
+        names = self.threads
+        spans = sorted(self.spans, key=lambda s: s["start"])
+        return {
+            "run": {**run, "started_at": self.started_at},
+            "totals": self.totals(),
+            "spans": [
+                {"name": s["name"], "cat": s["cat"], "depth": s["depth"],
+                 "start": round(s["start"], 6), "end": round(s["end"], 6),
+                 "seconds": s["seconds"], "thread": names[s["thread"]], **s["args"]}
+                for s in spans
+            ],
+        }
+
+    def chrome_events(self, run: dict) -> dict:
+        """Chrome trace-event format: complete ("X") events, one track per thread."""
+        tids = {ident: i + 1 for i, ident in enumerate(self.threads)}
+        events = [{"name": "process_name", "ph": "M", "pid": 1, "tid": 0,
+                   "args": {"name": f"rlm-query: {run.get('question', '')}"[:120]}}]
+        for ident, name in self.threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": 1, "tid": tids[ident],
+                           "args": {"name": name}})
+            events.append({"name": "thread_sort_index", "ph": "M", "pid": 1, "tid": tids[ident],
+                           "args": {"sort_index": tids[ident]}})
+        for s in sorted(self.spans, key=lambda s: (s["start"], -s["end"])):
+            events.append({
+                "name": s["name"], "cat": s["cat"], "ph": "X", "pid": 1, "tid": tids[s["thread"]],
+                "ts": round(s["start"] * 1e6), "dur": max(1, round(s["seconds"] * 1e6)),
+                "args": {"depth": s["depth"], **s["args"]},
+            })
+        return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": run}
+
+    def write(self, path: str, run: dict) -> tuple[str, str]:
+        """Write the JSON and Chrome trace files for ``path`` (see trace_paths) once."""
+        self.finish()
+        json_path, chrome_path = trace_paths(path)
+        for target, data in ((json_path, self.to_json(run)), (chrome_path, self.chrome_events(run))):
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1, ensure_ascii=False)
+        return json_path, chrome_path
+
+
+def _make_client_class():
+    import rlm.clients.anthropic as anthropic_backend
+
+    class TracedAnthropicClient(anthropic_backend.AnthropicClient):
+        """AnthropicClient that records every request as a span of the installed Tracer."""
+
+        def completion(self, prompt, model: str | None = None) -> str:
+            tracer = _tracer
+            if tracer is None:
+                return super().completion(prompt, model)
+            call = tracer.call_started(model or self.model_name or "")
+            token = _current_call.set(call)
+            try:
+                response = super().completion(prompt, model)
+            except BaseException as e:
+                tracer.call_finished(call, e)
+                raise
+            finally:
+                _current_call.reset(token)
+            tracer.call_finished(call)
+            return response
+
+        async def acompletion(self, prompt, model: str | None = None) -> str:
+            tracer = _tracer
+            if tracer is None:
+                return await super().acompletion(prompt, model)
+            call = tracer.call_started(model or self.model_name or "")
+            token = _current_call.set(call)
+            try:
+                response = await super().acompletion(prompt, model)
+            except BaseException as e:
+                tracer.call_finished(call, e)
+                raise
+            finally:
+                _current_call.reset(token)
+            tracer.call_finished(call)
+            return response
+
+        def _track_cost(self, response, model: str):
+            super()._track_cost(response, model)
+            call = _current_call.get()
+            if _tracer is not None and call is not None:
+                _tracer.call_usage(call, response.usage)
+
+    return TracedAnthropicClient
+
+
+def install(tracer: Tracer) -> None:
+    """Record rlm's "anthropic" backend requests in ``tracer`` (raises ImportError).
+
+    Call after prompt_cache.install() and streaming.install(), so the traced
+    client is the outermost subclass and times the whole request.
+    """
+    global _tracer
+    import rlm.clients.anthropic as anthropic_backend
+
+    _tracer = tracer
+    if getattr(anthropic_backend.AnthropicClient, "_rlm_query_trace", False):
+        return
+    client_class = _make_client_class()
+    client_class._rlm_query_trace = True
+    anthropic_backend.AnthropicClient = client_class
@@ -0,0 +1,489 @@
+"""
+server.py — Long-lived rlm-query server (--serve) and its thin client.
+
+A one-shot CLI run spends over a second before any real work: Python
+startup, importing rlm and the Anthropic SDK, reading the API key, building
+SDK clients (TLS context, connection pool) and loading the document. The
+server pays that once and then answers questions over HTTP on a Unix socket,
+created owner-only so other local users cannot spend the API key:
+
+    * rlm and the SDK stay imported, with prompt caching installed
+    * every RLM completion shares one Anthropic SDK client (see
+      install_pooled_client), so requests reuse its keep-alive connections
+      instead of opening new ones
+    * loaded documents and their BM25 indexes stay in memory (DocumentStore,
+      least recently used evicted past RLM_SERVER_CACHE_MB, default 512)
+
+rlm-query.py sends single-file questions to the server when its socket
+answers; everything else runs in-process as before. The RLM REPL redirects
+sys.stdout and changes directory while it runs model code, so the server
+answers one question at a time, on its main thread; concurrent requests
+wait their turn.
+
+Socket:    ~/.cache/rlm-query/server.sock (RLM_QUERY_SOCKET overrides; the
+           directory follows RLM_CACHE_DIR)
+Endpoints: GET /health, POST /query (JSON request -> JSON record), POST /shutdown
+"""
+
+import http.client
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler
+from pathlib import Path
+
+import batch_query
+import retrieval
+from answer_cache import AnswerCache, answer_key, context_variant
+from doc_cache import DocCache
+from file_loader import DocumentError, content_hash, read_document, read_text
+
+SOCKET_PATH = os.environ.get("RLM_QUERY_SOCKET") or str(
+    Path(os.environ.get("RLM_CACHE_DIR", Path.home() / ".cache" / "rlm-query")) / "server.sock"
+)
+MAX_DOCUMENT_BYTES = int(float(os.environ.get("RLM_SERVER_CACHE_MB", "512")) * 1024 * 1024)
+CONNECT_TIMEOUT = 1.0
+
+# Request fields and their defaults; file_path and question are required
+REQUEST_DEFAULTS = {
+    "model": None,  # the server's --model
+    "max_iterations": 30,
+    "max_depth": 1,
+    "timeout": None,
+    "retrieve": None,
+    "chunk_chars": retrieval.DEFAULT_CHUNK_CHARS,
+    "byte_range": None,
+    "no_cache": False,
+    "no_prompt_cache": False,
+    "pdf_workers": None,
+}
+# Sent for questions that arrive or are still queued once /shutdown is received
+STOPPING_REPLY = {"error": "server is shutting down", "retry_locally": True}
+
+
+class ServerError(Exception):
+    """The server accepted a connection but the request failed in transport."""
+
+
+class DocumentStore:
+    """Loaded document text and BM25 indexes, kept in memory up to ``max_bytes`` (LRU)."""
+
+    def __init__(self, max_bytes: int = MAX_DOCUMENT_BYTES):
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict = OrderedDict()  # key -> (text, label, bytes)
+        self.indexes: dict = {}                     # (key, chunk chars) -> BM25Index
+        self.bytes = 0
+
+    @staticmethod
+    def _key(file_path: str, byte_range) -> tuple:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            raise DocumentError(f"File not found: {file_path}") from None
+        return (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size,
+                tuple(byte_range) if byte_range else None)
+
+    def load(self, file_path: str, byte_range=None, use_cache: bool = True,
+             pdf_workers: int | None = None) -> tuple[str, str | None, tuple, bool]:
+        """(text, byte-range label or None, key, served from memory); raises DocumentError."""
+        key = self._key(file_path, byte_range)
+        if use_cache and key in self.entries:
+            self.entries.move_to_end(key)
+            text, label, _ = self.entries[key]
+            return text, label, key, True
+
+        label = None
+        if byte_range:
+            try:
+                text, (start, end, size) = read_text(file_path, tuple(byte_range))
+            except (OSError, ValueError) as e:
+                raise DocumentError(f"Failed to read file: {e}") from e
+            label = f"bytes {start:,}-{end:,} of {size:,}"
+        else:
+            text = read_document(file_path, use_cache=use_cache, pdf_workers=pdf_workers)
+
+        if use_cache:
+            self._store(key, text, label)
+        return text, label, key, False
+
+    def _store(self, key: tuple, text: str, label: str | None) -> None:
+        size = sys.getsizeof(text)
+        if size > self.max_bytes:
+            return
+        self.entries[key] = (text, label, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes:
+            old, (_, _, old_size) = self.entries.popitem(last=False)
+            self.bytes -= old_size
+            for index_key in [k for k in self.indexes if k[0] == old]:
+                del self.indexes[index_key]
+
+    def index(self, key: tuple, file_path: str, text: str, chunk_chars: int,
+              use_cache: bool = True) -> retrieval.BM25Index:
+        """The document's BM25 index, from memory, the document cache, or built."""
+        if use_cache and (key, chunk_chars) in self.indexes:
+            return self.indexes[(key, chunk_chars)]
+        index = retrieval.load_index(
+            file_path, text, cache=DocCache() if use_cache else None, max_chars=chunk_chars
+        )
+        if use_cache and key in self.entries:
+            self.indexes[(key, chunk_chars)] = index
+        return index
+
+
+def install_pooled_client() -> None:
+    """Make every rlm AnthropicClient share one SDK client per (API key, timeout).
+
+    rlm builds a new client for each completion, and with it a new connection
+    pool, so every question would open fresh TLS connections. Install before
+    prompt_cache.install(), which subclasses whatever client is current.
+    """
+    import rlm.clients.anthropic as anthropic_backend
+
+    if getattr(anthropic_backend.AnthropicClient, "_rlm_query_pooled", False):
+        return
+
+    from collections import defaultdict
+
+    import anthropic
+    from rlm.clients.base_lm import BaseLM
+
+    shared: dict = {}
+    lock = threading.Lock()
+
+    class PooledAnthropicClient(anthropic_backend.AnthropicClient):
+        """AnthropicClient that reuses a shared anthropic.Anthropic (and its connections)."""
+
+        def __init__(self, api_key: str, model_name: str | None = None, max_tokens: int = 32768,
+                     **kwargs):
+            # The state AnthropicClient.__init__ sets up, without building new SDK clients
+            BaseLM.__init__(self, model_name=model_name, **kwargs)
+            with lock:
+                key = (api_key, self.timeout)
+                if key not in shared:
+                    shared[key] = anthropic.Anthropic(api_key=api_key, timeout=self.timeout)
+            self.client = shared[key]
+            self._api_key = api_key
+            self._async_client = None
+            self.model_name = model_name
+            self.max_tokens = max_tokens
+            self.model_call_counts: dict[str, int] = defaultdict(int)
+            self.model_input_tokens: dict[str, int] = defaultdict(int)
+            self.model_output_tokens: dict[str, int] = defaultdict(int)
+            self.model_total_tokens: dict[str, int] = defaultdict(int)
+
+        @property
+        def async_client(self):
+            # Batched llm_query() runs each batch in a new event loop, and an async
+            # connection pool cannot outlive its loop, so this one stays per instance
+            if self._async_client is None:
+                self._async_client = anthropic.AsyncAnthropic(
+                    api_key=self._api_key, timeout=self.timeout
+                )
+            return self._async_client
+
+    PooledAnthropicClient._rlm_query_pooled = True
+    anthropic_backend.AnthropicClient = PooledAnthropicClient
+
+
+class _Job:
+    def __init__(self, request: dict):
+        self.request = request
+        self.received = time.perf_counter()
+        self.reply: dict | None = None
+        self.done = threading.Event()
+
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    query_server = None  # set per server
+
+    def _send(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send(200, self.query_server.health())
+        else:
+            self._send(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path == "/shutdown":
+            self.query_server.stop()
+            self._send(200, {"stopping": True})
+            return
+        if self.path != "/query":
+            self._send(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(body)
+            if not request.get("file_path") or not request.get("question"):
+                raise ValueError("file_path and question are required")
+        except (ValueError, TypeError) as e:
+            self._send(400, {"error": f"bad request: {e}"})
+            return
+        job = _Job(request)
+        if not self.query_server.submit(job):
+            self._send(200, STOPPING_REPLY)
+            return
+        job.done.wait()
+        self._send(200, job.reply)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class QueryServer:
+    """Answers /query requests one at a time on the calling (main) thread."""
+
+    def __init__(self, socket_path: str, api_key: str, default_model: str,
+                 use_prompt_cache: bool = True, documents: DocumentStore | None = None):
+        self.socket_path = socket_path
+        self.api_key = api_key
+        self.default_model = default_model
+        self.use_prompt_cache = use_prompt_cache
+        self.documents = documents or DocumentStore()
+        self.jobs: queue.Queue = queue.Queue()
+        self.jobs_lock = threading.Lock()
+        self.stopping = False
+        self.started = time.time()
+        self.queries = 0
+
+    def health(self) -> dict:
+        return {
+            "pid": os.getpid(),
+            "uptime": round(time.time() - self.started, 1),
+            "queries": self.queries,
+            "queued": self.jobs.qsize(),
+            "documents": len(self.documents.entries),
+            "document_mb": round(self.documents.bytes / 1024 / 1024, 1),
+            "prompt_cache": self.use_prompt_cache,
+            "model": self.default_model,
+        }
+
+    def submit(self, job: _Job) -> bool:
+        """Queue a job for the main thread; False once the server is stopping."""
+        with self.jobs_lock:
+            if self.stopping:
+                return False
+            self.jobs.put(job)
+            return True
+
+    def stop(self) -> None:
+        """Finish the question in progress, send the queued ones back, then stop."""
+        with self.jobs_lock:
+            self._turn_away_queued()
+            self.jobs.put(None)
+
+    def _turn_away_queued(self) -> None:
+        """Answer every queued job with STOPPING_REPLY, so its client runs it locally.
+
+        Callers hold jobs_lock; no job is queued after this.
+        """
+        self.stopping = True
+        while True:
+            try:
+                job = self.jobs.get_nowait()
+            except queue.Empty:
+                return
+            if job is not None:
+                job.reply = dict(STOPPING_REPLY)
+                job.done.set()
+
+    def warm_up(self) -> None:
+        """Import rlm and install the client patches before the first question."""
+        import rlm  # noqa: F401
+
+        import prompt_cache
+
+        install_pooled_client()
+        if self.use_prompt_cache:
+            prompt_cache.install()
+
+    def answer(self, request: dict) -> dict:
+        """Answer one request: {"answer": ..., usage fields} or {"error": ...}."""
+        from rlm import RLM
+
+        settings = {**REQUEST_DEFAULTS, **request}
+        if settings["no_prompt_cache"] == self.use_prompt_cache:
+            # Prompt caching is installed process-wide when the server starts
+            return {"error": "prompt cache setting differs from the server's", "retry_locally": True}
+        model = settings["model"] or self.default_model
+        byte_range = tuple(settings["byte_range"]) if settings["byte_range"] else None
+        use_cache = not settings["no_cache"]
+        file_path, question = settings["file_path"], settings["question"]
+        if not os.path.isfile(file_path):
+            raise DocumentError(f"File not found: {file_path}")
+
+        answers = key = None
+        if use_cache:
+            answers = AnswerCache()
+            key = answer_key(
+                content_hash(file_path, byte_range), question, model, settings["max_iterations"],
+                settings["max_depth"],
+                context_variant(settings["retrieve"], settings["chunk_chars"], byte_range),
+            )
+            cached = answers.get(key)
+            if cached is not None:
+                return cached
+
+        started = time.perf_counter()
+        text, label, doc_key, warm = self.documents.load(
+            file_path, byte_range, use_cache=use_cache, pdf_workers=settings["pdf_workers"]
+        )
+        file_name = os.path.basename(file_path) + (f" ({label})" if label else "")
+        retrieval_stats = None
+        if settings["retrieve"]:
+            index = self.documents.index(
+                doc_key, file_path, text, settings["chunk_chars"], use_cache=use_cache
+            )
+            text, retrieval_stats = retrieval.select_chunks(
+                text, index, question, settings["retrieve"]
+            )
+            file_name = batch_query.excerpt_name(file_name, retrieval_stats)
+        prompt = batch_query.document_prompt(file_name, text, question)
+        del text
+        load_seconds = time.perf_counter() - started
+
+        rlm_model = RLM(
+            backend="anthropic",
+            backend_kwargs={"api_key": self.api_key, "model_name": model},
+            max_iterations=settings["max_iterations"],
+            max_depth=settings["max_depth"],
+            max_timeout=settings["timeout"],
+        )
+        result = rlm_model.completion(prompt, root_prompt=question)
+        record = batch_query.result_fields(result)
+        if retrieval_stats:
+            record["retrieval"] = retrieval_stats
+        if answers:
+            answers.put(key, record)
+        record["server"] = {"document_in_memory": warm, "load_seconds": round(load_seconds, 4)}
+        return record
+
+    def _run(self, job: _Job) -> None:
+        started = time.perf_counter()
+        try:
+            job.reply = self.answer(job.request)
+        except DocumentError as e:
+            job.reply = {"error": str(e)}
+        except Exception as e:
+            job.reply = {"error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.queries += 1
+            if job.reply is None:
+                job.reply = {"error": "query interrupted"}
+            job.reply.setdefault("server", {})["queue_seconds"] = round(
+                started - job.received, 4)
+            job.done.set()
+        if job.reply.get("retry_locally"):
+            status = "sent back to run locally"
+        elif job.reply.get("error"):
+            status = "error"
+        else:
+            status = f"{time.perf_counter() - started:.1f}s"
+        print(f"[{time.strftime('%H:%M:%S')}] {job.request.get('file_path')}: "
+              f"{job.request.get('question')!r} ({status})", file=sys.stderr, flush=True)
+
+    def serve_forever(self) -> None:
+        """Listen on the socket and answer questions until /shutdown or Ctrl-C."""
+        if status(self.socket_path) is not None:
+            raise OSError(f"a server is already listening on {self.socket_path}")
+        Path(self.socket_path).parent.mkdir(parents=True, exist_ok=True)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)  # left behind by a server that died
+
+        handler = type("Handler", (_Handler,), {"query_server": self})
+        old_umask = os.umask(0o177)  # owner-only socket from the start
+        try:
+            http_server = _UnixHTTPServer(self.socket_path, handler)
+        finally:
+            os.umask(old_umask)
+        threading.Thread(target=http_server.serve_forever, daemon=True).start()
+        try:
+            while True:
+                try:
+                    job = self.jobs.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if job is None:
+                    break
+                self._run(job)
+        finally:
+            with self.jobs_lock:
+                self._turn_away_queued()
+            http_server.shutdown()
+            http_server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float | None = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+def _call(socket_path: str, method: str, path: str, payload: dict | None = None,
+          timeout: float | None = None) -> dict | None:
+    """JSON reply from the server, or None when nothing is listening on the socket."""
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    conn = _UnixHTTPConnection(socket_path, timeout=CONNECT_TIMEOUT)
+    try:
+        conn.connect()
+    except OSError:
+        return None
+    try:
+        conn.sock.settimeout(timeout)
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        conn.request(method, path, body=body, headers={"Content-Type": "application/json"})
+        response = conn.getresponse()
+        return json.loads(response.read())
+    except (OSError, http.client.HTTPException, ValueError) as e:
+        raise ServerError(f"rlm-query server on {socket_path} failed: {e}") from e
+    finally:
+        conn.close()
+
+
+def status(socket_path: str = SOCKET_PATH) -> dict | None:
+    """The server's /health reply, or None if it is not running."""
+    try:
+        return _call(socket_path, "GET", "/health", timeout=CONNECT_TIMEOUT)
+    except ServerError:
+        return None
+
+
+def ask(request: dict, socket_path: str = SOCKET_PATH) -> dict | None:
+    """Send a question to the server; None if no server is running (raises ServerError)."""
+    return _call(socket_path, "POST", "/query", request)
+
+
+def stop(socket_path: str = SOCKET_PATH) -> bool:
+    """Ask a running server to exit after its current question."""
+    try:
+        return _call(socket_path, "POST", "/shutdown", {}, timeout=CONNECT_TIMEOUT) is not None
+    except ServerError:
+        return False
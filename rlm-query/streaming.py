@@ -0,0 +1,346 @@
+"""
+streaming.py — Live progress and answer streaming for rlm-query (--stream).
+
+rlm returns nothing until the whole run is over. install() swaps rlm's
+Anthropic client for one that streams every response (messages.stream) and
+reports it to a Progress:
+
+    * each root iteration (number, depth, elapsed time, tokens so far) and
+      every sub-call are printed to stderr as they happen; on a terminal a
+      status line counts tokens while a response is arriving
+    * the string literal a root response assigns to answer["content"] inside
+      a ```repl``` block is decoded as it arrives and written to stdout by an
+      AnswerStream, before the REPL has even run the block
+
+What streams is a draft: an answer is only final once the REPL sets
+answer["ready"]. AnswerStream.finish() reconciles the draft with rlm's
+final answer -- completing it, or, if they differ, printing the final answer
+in full after a notice on stderr -- so stdout always ends with the answer.
+
+rlm 0.1.3 declares its on_iteration_* callbacks but never fires them, so a
+root iteration is recognised as a model call on the main thread outside any
+child RLM (tracked with on_subcall_start / on_subcall_complete, which do
+fire). llm_query() sub-calls arrive on rlm's LM handler threads.
+"""
+
+import ast
+import re
+import sys
+import threading
+import time
+
+_ASSIGNMENT = re.compile(r"""answer\[\s*(["'])content\1\s*\]\s*=\s*([rRuU]?)("{3}|'{3}|"|')""")
+STATUS_INTERVAL = 0.1  # seconds between terminal status line updates
+
+_progress = None  # the Progress streaming clients report to (set by install)
+
+
+class LiteralStream:
+    """Decodes the answer["content"] string literal out of response text as it arrives."""
+
+    def __init__(self):
+        self.text = ""
+        self.scan_from = 0   # where to look for the next assignment
+        self.pos = None      # first undecoded character of the literal body, or None
+        self.fresh = False   # no piece of the current literal reported yet
+        self.quote = ""
+        self.raw = False
+
+    def feed(self, delta: str) -> list[tuple[bool, str]]:
+        """Append ``delta``; returns (starts a new draft, decoded text) pieces."""
+        self.text += delta
+        pieces = []
+        while True:
+            if self.pos is None and not self._find_assignment():
+                return pieces
+            decoded, closed = self._advance()
+            if decoded or (closed and self.fresh):
+                pieces.append((self.fresh, decoded))
+                self.fresh = False
+            if not closed:
+                return pieces
+
+    def _find_assignment(self) -> bool:
+        while True:
+            match = _ASSIGNMENT.search(self.text, self.scan_from)
+            if match is None:
+                # An assignment may be split across deltas
+                self.scan_from = max(self.scan_from, len(self.text) - 40)
+                return False
+            if len(match.group(3)) == 1 and len(self.text) - match.end() < 2:
+                # Could still turn out to be a triple quote
+                self.scan_from = match.start()
+                return False
+            if self.text.count("```", 0, match.start()) % 2 == 0:
+                self.scan_from = match.end()  # prose, not code
+                continue
+            self.quote = match.group(3)
+            self.raw = match.group(2) in ("r", "R")
+            self.pos = match.end()
+            self.fresh = True
+            return True
+
+    def _advance(self) -> tuple[str, bool]:
+        """Decode what is safe to decode so far; (text, literal closed)."""
+        text, quote = self.text, self.quote
+        i = self.pos
+        escape = -1
+        while i < len(text):
+            if text[i] == "\\":
+                escape = i
+                i += 2
+                continue
+            if text.startswith(quote, i):
+                decoded = self._decode(text[self.pos:i])
+                self.scan_from = i + len(quote)
+                self.pos = None
+                return decoded, True
+            if len(quote) == 3 and text[i] == quote[0] and len(text) - i < 3:
+                break  # possibly the start of the closing quote
+            i += 1
+        safe = min(i, len(text))
+        if escape >= 0 and safe - escape < 12:
+            safe = escape  # an escape sequence may be incomplete
+        while len(quote) == 3 and safe > self.pos and text[safe - 1] == quote[0]:
+            safe -= 1  # a segment ending in a quote would close the wrapped literal early
+        decoded = self._decode(text[self.pos:safe])
+        if self.pos is not None:
+            self.pos = safe
+        return decoded, False
+
+    def _decode(self, segment: str) -> str:
+        if self.raw or not segment:
+            return segment
+        try:
+            return ast.literal_eval(self.quote + segment + self.quote)
+        except (SyntaxError, ValueError):
+            # Not a plain literal after all: stop streaming this one
+            self.scan_from = len(self.text)
+            self.pos = None
+            return ""
+
+
+class AnswerStream:
+    """Writes answer drafts to stdout as they arrive and reconciles them with the final answer."""
+
+    def __init__(self, out=None, notices=None):
+        self.out = out or sys.stdout
+        self.notices = notices or sys.stderr
+        self.draft = ""  # the current draft, as written to out
+
+    def write(self, text: str, new_draft: bool = False) -> None:
+        if new_draft:
+            self.supersede()
+        self.draft += text
+        self.out.write(text)
+        self.out.flush()
+
+    def supersede(self) -> None:
+        """The model kept working after the current draft; later output replaces it."""
+        if self.draft:
+            self.out.write("\n")
+            self.out.flush()
+            print("(draft above superseded; the model is still working)", file=self.notices)
+            self.draft = ""
+
+    def finish(self, answer) -> None:
+        """Complete stdout with the final answer."""
+        answer = str(answer)
+        if self.draft and answer.startswith(self.draft):
+            rest = answer[len(self.draft):]
+        else:
+            if self.draft:
+                self.out.write("\n")
+                print("(final answer differs from the streamed draft; final answer follows)",
+                      file=self.notices)
+            rest = answer
+        self.out.write(rest + "\n")
+        self.out.flush()
+        self.draft = ""
+
+
+class Call:
+    """One model request, as reported by the streaming client."""
+
+    def __init__(self, progress: "Progress", label: str, depth: int, root: bool):
+        self.progress = progress
+        self.label = label
+        self.depth = depth
+        self.root = root
+        self.chars = 0
+        self.drafted = False
+        self.literal = LiteralStream() if root and depth == 0 and progress.answer else None
+
+    def text(self, delta: str) -> None:
+        self.chars += len(delta)
+        if self.literal:
+            for new_draft, decoded in self.literal.feed(delta):
+                if not self.drafted:
+                    self.progress.clear_status()
+                    self.drafted = True
+                self.progress.answer.write(decoded, new_draft)
+        if self.root and not self.drafted:
+            self.progress.status(f"{self.label} · receiving ~{self.chars // 4:,} tokens")
+
+    def finished(self) -> None:
+        if not self.drafted:
+            self.progress.line(f"{self.label} · response ~{self.chars // 4:,} tokens",
+                               with_totals=True)
+
+    def failed(self) -> None:
+        self.progress.clear_status()
+
+
+class Progress:
+    """Progress report on stderr for a streaming run; ``answer`` (an AnswerStream) gets drafts."""
+
+    def __init__(self, answer: AnswerStream | None = None, err=None):
+        self.answer = answer
+        self.err = err or sys.stderr
+        self.live = self.err.isatty()
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.main_thread = threading.main_thread()
+        self.depths = []       # depths of the child RLMs running on the main thread
+        self.iterations = {0: 0}
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.calls = 0
+        self.status_shown = False
+        self.status_at = 0.0
+
+    # rlm callbacks (on_subcall_start / on_subcall_complete)
+
+    def subcall_started(self, depth: int, model: str, prompt_preview: str) -> None:
+        if threading.current_thread() is self.main_thread:
+            with self.lock:
+                self.depths.append(depth)
+                self.iterations[depth] = 0
+
+    def subcall_finished(self, depth: int, model: str, duration: float, error) -> None:
+        if threading.current_thread() is self.main_thread:
+            with self.lock:
+                if self.depths:
+                    self.depths.pop()
+
+    def call_started(self) -> Call:
+        main = threading.current_thread() is self.main_thread
+        with self.lock:
+            depth = self.depths[-1] if self.depths else 0
+            if not main:
+                return Call(self, f"{'  ' * (depth + 1)}sub-call · depth {depth + 1}",
+                            depth + 1, root=False)
+            self.iterations[depth] = self.iterations.get(depth, 0) + 1
+            label = f"{'  ' * depth}iteration {self.iterations[depth]} · depth {depth}"
+        if depth == 0 and self.answer:
+            self.answer.supersede()
+        self.line(f"{label} · waiting for model")
+        return Call(self, label, depth, root=True)
+
+    def usage(self, usage) -> None:
+        with self.lock:
+            self.calls += 1
+            self.input_tokens += (
+                usage.input_tokens
+                + (getattr(usage, "cache_creation_input_tokens", None) or 0)
+                + (getattr(usage, "cache_read_input_tokens", None) or 0)
+            )
+            self.output_tokens += usage.output_tokens
+
+    def _stamp(self) -> str:
+        return f"[{time.perf_counter() - self.started:6.1f}s]"
+
+    def line(self, message: str, with_totals: bool = False) -> None:
+        with self.lock:
+            if with_totals:
+                message += (f" · {self.input_tokens:,} in / {self.output_tokens:,} out "
+                            f"tokens so far")
+            self._clear()
+            print(f"{self._stamp()} {message}", file=self.err, flush=True)
+
+    def status(self, message: str) -> None:
+        """Overwrite the terminal status line (throttled; nothing when stderr is not a terminal)."""
+        if not self.live:
+            return
+        now = time.perf_counter()
+        with self.lock:
+            if now - self.status_at < STATUS_INTERVAL:
+                return
+            self.status_at = now
+            self.err.write(f"\r\033[K{self._stamp()} {message}")
+            self.err.flush()
+            self.status_shown = True
+
+    def clear_status(self) -> None:
+        with self.lock:
+            self._clear()
+
+    def _clear(self) -> None:
+        if self.status_shown:
+            self.err.write("\r\033[K")
+            self.err.flush()
+            self.status_shown = False
+
+    def done(self) -> None:
+        with self.lock:
+            iterations = self.iterations[0]
+            calls = self.calls
+        self.line(f"done · {iterations} iterations · {calls} model calls · "
+                  f"{self.input_tokens:,} in / {self.output_tokens:,} out tokens")
+
+
+def _make_client_class():
+    import rlm.clients.anthropic as anthropic_backend
+
+    class StreamingAnthropicClient(anthropic_backend.AnthropicClient):
+        """AnthropicClient that streams responses and reports them to the installed Progress."""
+
+        def completion(self, prompt, model: str | None = None) -> str:
+            progress = _progress
+            if progress is None:
+                return super().completion(prompt, model)
+
+            messages, system = self._prepare_messages(prompt)
+            model = model or self.model_name
+            if not model:
+                raise ValueError("Model name is required for Anthropic client.")
+            kwargs = {"model": model, "max_tokens": self.max_tokens, "messages": messages}
+            if system:
+                kwargs["system"] = system
+
+            call = progress.call_started()
+            try:
+                with self.client.messages.stream(**kwargs) as stream:
+                    for text in stream.text_stream:
+                        call.text(text)
+                    response = stream.get_final_message()
+            except BaseException:
+                call.failed()
+                raise
+            self._track_cost(response, model)
+            call.finished()
+            return response.content[0].text
+
+        def _track_cost(self, response, model: str):
+            super()._track_cost(response, model)
+            if _progress is not None:
+                _progress.usage(response.usage)
+
+    return StreamingAnthropicClient
+
+
+def install(progress: Progress) -> None:
+    """Stream rlm's "anthropic" backend and report to ``progress`` (raises ImportError).
+
+    Call after prompt_cache.install() when both are wanted: the streaming
+    client subclasses whichever client is installed at that point.
+    """
+    global _progress
+    import rlm.clients.anthropic as anthropic_backend
+
+    _progress = progress
+    if getattr(anthropic_backend.AnthropicClient, "_rlm_query_streaming", False):
+        return
+    client_class = _make_client_class()
+    client_class._rlm_query_streaming = True
+    anthropic_backend.AnthropicClient = client_class
@@ -0,0 +1,255 @@
+"""
+summary_tree.py — Persistent hierarchical summary of a document (--summary-tree).
+
+Without help, RLM starts every question by reading and decomposing the whole
+document. For a document that gets many questions, build_tree() pays for
+that once: the text is split into parts of at most about LEAF_CHARS (whole
+pages where it has "--- Page N ---" markers, see retrieval.chunk_document),
+the model summarises each part, and every FANOUT consecutive summaries are
+summarised again, level by level, up to a single summary of the whole
+document.
+
+The tree is stored in the document cache (kind
+"summary-tree-c<leaf chars>-<model>"), keyed by the document's content hash
+like the BM25 index, together with what building it cost. It holds node
+offsets into the loaded text, not the text itself. A question asked with
+--summary-tree gets the tree as an outline in front of the document, each
+entry giving the context[start:end] range it summarises, so the model can
+pick the relevant branches and read only those ranges of raw text.
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import retrieval
+import run_trace
+
+TREE_VERSION = "1"
+LEAF_CHARS = 24_000  # ~6k tokens per summarised part
+FANOUT = 8           # summaries combined into each parent
+SUMMARY_TOKENS = 400
+SUMMARY_WORDS = 120
+DEFAULT_CONCURRENCY = 4
+
+SYSTEM_PROMPT = (
+    "You write one entry of an index that a reader uses to decide which parts of a long "
+    f"document to read. In at most {SUMMARY_WORDS} words, say what the text covers and its "
+    "key facts: names, numbers, dates, defined terms, decisions. Plain prose, no preamble."
+)
+COMBINED_NOTE = "These are the index entries of consecutive parts of the document, in order:"
+
+_WHITESPACE = re.compile(r"\s+")
+_LABEL = re.compile(r"(\w+?)s? (\d+)")
+_LAST_NUMBER = re.compile(r"(\d+)\D*$")
+
+
+class Summarizer:
+    """Summarises text with one Messages API call each, totalling the usage (thread-safe)."""
+
+    def __init__(self, api_key: str, model: str, max_tokens: int = SUMMARY_TOKENS):
+        import anthropic
+
+        self.client = anthropic.Anthropic(api_key=api_key)
+        self.model = model
+        self.max_tokens = max_tokens
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def __call__(self, text: str, combined: bool = False) -> str:
+        content = f"{COMBINED_NOTE}\n\n{text}" if combined else text
+        response = self.client.messages.create(
+            model=self.model,
+            max_tokens=self.max_tokens,
+            system=SYSTEM_PROMPT,
+            messages=[{"role": "user", "content": content}],
+        )
+        with self.lock:
+            self.calls += 1
+            self.input_tokens += response.usage.input_tokens
+            self.output_tokens += response.usage.output_tokens
+        return "".join(block.text for block in response.content if block.type == "text").strip()
+
+    def usage(self) -> dict:
+        return {
+            "calls": self.calls,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cost": run_trace.estimate_cost(self.model, self.input_tokens, self.output_tokens),
+        }
+
+
+def _group_label(nodes: list[dict]) -> str:
+    """"Pages 1-8" / "Lines 1-2340" style label for consecutive nodes."""
+    first, last = nodes[0]["label"], nodes[-1]["label"]
+    match, end = _LABEL.match(first), _LAST_NUMBER.search(last)
+    if not match or not end:
+        return f"{first} to {last}"
+    return f"{match.group(1)}s {match.group(2)}-{end.group(1)}"
+
+
+def _leaves(text: str, leaf_chars: int) -> list[dict]:
+    """Consecutive retrieval chunks packed into parts of at most ~``leaf_chars``."""
+    leaves, group = [], []
+    for start, end, label in retrieval.chunk_document(text, leaf_chars):
+        if group and end - group[0]["start"] > leaf_chars:
+            leaves.append(group)
+            group = []
+        group.append({"label": label, "start": start, "end": end})
+    if group:
+        leaves.append(group)
+    return [
+        {"label": group[0]["label"] if len(group) == 1 else _group_label(group),
+         "start": group[0]["start"], "end": group[-1]["end"]}
+        for group in leaves
+    ]
+
+
+def build_tree(text: str, summarize, leaf_chars: int = LEAF_CHARS, fanout: int = FANOUT,
+               concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """The root node of the summary tree of ``text``; ``summarize(text, combined)`` -> summary.
+
+    Nodes are {"label", "start", "end", "summary"} plus "children" above the leaves.
+    Raises ValueError for a document with no text, which has nothing to summarise.
+    """
+    if not text.strip():
+        raise ValueError("the document has no text to summarise")
+    nodes = _leaves(text, leaf_chars)
+    if not nodes:
+        nodes = [{"label": "Document", "start": 0, "end": len(text)}]
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        print(f"Summary tree: summarising {len(nodes):,} parts...", file=sys.stderr)
+        summaries = pool.map(lambda node: summarize(text[node["start"]:node["end"]]), nodes)
+        for node, summary in zip(nodes, summaries):
+            node["summary"] = summary
+
+        while len(nodes) > 1:
+            nodes = [
+                {"label": _group_label(group), "start": group[0]["start"],
+                 "end": group[-1]["end"], "children": group}
+                for group in (nodes[i:i + fanout] for i in range(0, len(nodes), fanout))
+            ]
+            print(f"Summary tree: combining into {len(nodes):,} "
+                  f"{'summary' if len(nodes) == 1 else 'sections'}...", file=sys.stderr)
+            summaries = pool.map(
+                lambda node: summarize(
+                    "\n\n".join(f"[{child['label']}] {child['summary']}"
+                                for child in node["children"]),
+                    combined=True,
+                ),
+                nodes,
+            )
+            for node, summary in zip(nodes, summaries):
+                node["summary"] = summary
+
+    root = nodes[0]
+    root["label"] = "Document"
+    return root
+
+
+def _kind(model: str, leaf_chars: int) -> str:
+    return f"summary-tree-c{leaf_chars}-{model}"
+
+
+def load_tree(file_path: str, text: str, model: str, cache,
+              leaf_chars: int = LEAF_CHARS) -> dict | None:
+    """The stored tree for this document text, or None if there is none (or it is stale)."""
+    data = cache.get(file_path, kind=_kind(model, leaf_chars))
+    if data is None:
+        return None
+    try:
+        tree = json.loads(data)
+    except ValueError:
+        return None
+    if tree.get("version") != TREE_VERSION:
+        return None
+    if tree.get("digest") != retrieval.BM25Index.digest(text):
+        return None  # the text changed, e.g. a new PDF extractor version
+    return tree
+
+
+def build_and_store(file_path: str, text: str, api_key: str, model: str, cache=None,
+                    leaf_chars: int = LEAF_CHARS, fanout: int = FANOUT,
+                    concurrency: int = DEFAULT_CONCURRENCY) -> dict:
+    """Build the document's tree (see build_tree), recording its cost, and store it in ``cache``."""
+    summarizer = Summarizer(api_key, model)
+    started = time.perf_counter()
+    root = build_tree(text, summarizer, leaf_chars, fanout, concurrency)
+    tree = {
+        "version": TREE_VERSION,
+        "digest": retrieval.BM25Index.digest(text),
+        "model": model,
+        "leaf_chars": leaf_chars,
+        "fanout": fanout,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+        "build": {"seconds": round(time.perf_counter() - started, 3), **summarizer.usage()},
+        "root": root,
+    }
+    if cache:
+        cache.put(file_path, json.dumps(tree, ensure_ascii=False), kind=_kind(model, leaf_chars))
+    return tree
+
+
+def describe(tree: dict) -> str:
+    """One line on the tree's shape and what it cost to build."""
+    leaves, depth, node = 0, 1, tree["root"]
+    while node.get("children"):
+        depth += 1
+        node = node["children"][0]
+    stack = [tree["root"]]
+    while stack:
+        node = stack.pop()
+        if node.get("children"):
+            stack.extend(node["children"])
+        else:
+            leaves += 1
+    build = tree["build"]
+    cost = f", ${build['cost']:.4f}" if build.get("cost") is not None else ""
+    return (f"{leaves:,} parts in {depth} levels, built {tree['built_at']} in "
+            f"{build['seconds']:.1f}s with {build['calls']:,} model calls "
+            f"({build['input_tokens']:,} in / {build['output_tokens']:,} out tokens{cost})")
+
+
+def _outline(file_name: str, root: dict, base: int) -> str:
+    lines = [
+        f"=== SUMMARY TREE: {file_name} ===",
+        "An index of the document that follows. Each entry summarises context[start:end];",
+        "read the summaries first, then only the ranges of the branches the question needs.",
+        "",
+    ]
+    stack = [(root, 0)]
+    while stack:
+        node, depth = stack.pop()
+        summary = _WHITESPACE.sub(" ", node["summary"]).strip()
+        lines.append(f"{'  ' * depth}[{base + node['start']}:{base + node['end']}] "
+                     f"{node['label']}: {summary}")
+        stack.extend((child, depth + 1) for child in reversed(node.get("children", ())))
+    lines.append("=== END SUMMARY TREE ===\n\n")
+    return "\n".join(lines)
+
+
+def tree_prompt(file_name: str, file_content: str, tree: dict, question: str | None = None) -> str:
+    """batch_query.document_prompt() with the tree's outline in front.
+
+    The outline's ranges are offsets into the returned string; without
+    ``question`` the result is a document block for batch_query.with_question().
+    """
+    header = f"=== DOCUMENT: {file_name} ===\n"
+    base, outline = 0, ""
+    for _ in range(10):
+        # The outline's length depends on the offsets it prints, which depend on its length
+        outline = _outline(file_name, tree["root"], base)
+        if len(outline) + len(header) == base:
+            break
+        base = len(outline) + len(header)
+    tail = "\n=== END DOCUMENT ==="
+    if question is not None:
+        tail += f"\n\nQuestion: {question}"
+    return "".join((outline, header, file_content, tail))
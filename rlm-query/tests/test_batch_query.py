@@ -0,0 +1,102 @@
+"""
+End-to-end runs of rlm-query.py --questions against benchmarks/fake_anthropic.py.
+
+No API key or network needed: the CLI runs as a subprocess with
+ANTHROPIC_BASE_URL pointing at a fake backend on a free local port and a
+fresh RLM_CACHE_DIR per test.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+pytest.importorskip("rlm", reason="rlms is not installed")
+
+QUESTIONS = [f"Question {i}: what does clause {i} say?" for i in range(8)]
+DOCUMENT = "".join(f"Clause {i}. The tenant pays rent on day {i + 1}.\n\n" for i in range(8))
+
+
+@pytest.fixture
+def backend():
+    # Latency makes concurrent questions overlap, so finishing order can differ from input order
+    server = serve_in_thread(latency=0.05)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def workdir(tmp_path):
+    (tmp_path / "contract.txt").write_text(DOCUMENT, encoding="utf-8")
+    (tmp_path / "questions.txt").write_text(
+        "\n".join(QUESTIONS[:3] + ["", "# a comment"] + QUESTIONS[3:]) + "\n", encoding="utf-8"
+    )
+    return tmp_path
+
+
+def run_questions(workdir: Path, backend, *extra: str) -> subprocess.CompletedProcess:
+    env = {
+        **os.environ,
+        "ANTHROPIC_BASE_URL": backend.url,
+        "ANTHROPIC_API_KEY": "fake",
+        "RLM_CACHE_DIR": str(workdir / "cache"),
+    }
+    return subprocess.run(
+        [sys.executable, str(ROOT / "rlm-query.py"), str(workdir / "contract.txt"),
+         "--questions", str(workdir / "questions.txt"), *extra],
+        env=env, capture_output=True, text=True, timeout=300,
+    )
+
+
+def read_jsonl(path: Path) -> list[dict]:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_answers_in_input_order_with_usage(workdir, backend):
+    output = workdir / "answers.jsonl"
+    result = run_questions(workdir, backend, "--concurrency", "4", "--output", str(output))
+    assert result.returncode == 0, result.stderr
+
+    records = read_jsonl(output)
+    assert [r["index"] for r in records] == list(range(len(QUESTIONS)))
+    assert [r["question"] for r in records] == QUESTIONS
+    for record in records:
+        assert record["error"] is None
+        assert record["answer"].startswith(f"Answer to: {record['question']}")
+        assert record["input_tokens"] > 0
+        assert record["output_tokens"] > 0
+        assert record["execution_time"] > 0
+        assert record["seconds"] > 0
+    # Two model turns per question with the fake backend
+    assert len(backend.requests) == 2 * len(QUESTIONS)
+
+
+def test_jsonl_to_stdout(workdir, backend):
+    result = run_questions(workdir, backend, "--concurrency", "2", "--no-cache")
+    assert result.returncode == 0, result.stderr
+
+    records = [json.loads(line) for line in result.stdout.splitlines() if line.strip()]
+    assert [r["question"] for r in records] == QUESTIONS
+
+
+def test_repeated_batch_is_served_from_answer_cache(workdir, backend):
+    first = run_questions(workdir, backend, "--output", str(workdir / "first.jsonl"))
+    assert first.returncode == 0, first.stderr
+    sent = len(backend.requests)
+
+    second = run_questions(workdir, backend, "--output", str(workdir / "second.jsonl"))
+    assert second.returncode == 0, second.stderr
+    assert len(backend.requests) == sent
+    answers = [r["answer"] for r in read_jsonl(workdir / "second.jsonl")]
+    assert answers == [r["answer"] for r in read_jsonl(workdir / "first.jsonl")]
@@ -0,0 +1,51 @@
+"""
+DocCache unit tests: the stat -> hash memo outlives the cached entries.
+
+    python -m pytest tests
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import doc_cache  # noqa: E402
+from doc_cache import DocCache  # noqa: E402
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Small enough that every put evicts everything but the new entry
+    return DocCache(cache_dir=tmp_path / "cache", max_bytes=64)
+
+
+def test_text_file_hash_survives_put_of_another_document(tmp_path, cache, monkeypatch):
+    log = tmp_path / "big.log"
+    log.write_text("line\n" * 100, encoding="utf-8")
+    digest = cache.content_hash(str(log))
+
+    report = tmp_path / "report.pdf"
+    report.write_bytes(b"%PDF-1.4 not really")
+    cache.put(str(report), "extracted text " * 20)
+
+    def no_rehash(path):
+        raise AssertionError(f"{path} was hashed again")
+
+    monkeypatch.setattr(doc_cache, "file_hash", no_rehash)
+    assert cache.content_hash(str(log)) == digest
+
+
+def test_memo_is_bounded(tmp_path, cache, monkeypatch):
+    monkeypatch.setattr(doc_cache, "MAX_MEMO_FILES", 3)
+    paths = []
+    for i in range(5):
+        path = tmp_path / f"doc{i}.txt"
+        path.write_text(f"document {i}", encoding="utf-8")
+        cache.content_hash(str(path))
+        paths.append(str(path.resolve()))
+
+    memo = cache._load_manifest()["files"]
+    assert [k.split("|")[0] for k in memo] == paths[2:]
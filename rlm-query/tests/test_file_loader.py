@@ -0,0 +1,62 @@
+"""
+file_loader unit tests: byte ranges and the hashes answer keys are built on.
+
+    python -m pytest tests
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import file_loader  # noqa: E402
+from file_loader import content_hash, parse_range, read_text  # noqa: E402
+
+LINES = "".join(f"line {i:05d} of the log\n" for i in range(2000))
+
+
+@pytest.fixture
+def log(tmp_path):
+    path = tmp_path / "app.log"
+    path.write_text(LINES, encoding="utf-8")
+    return path
+
+
+def test_range_hash_reads_only_the_range(log, monkeypatch):
+    monkeypatch.setattr(file_loader.DocCache, "content_hash", None)  # whole-file path unused
+    tail = content_hash(str(log), (-1000, None))
+    head = content_hash(str(log), (0, 1000))
+    assert tail != head
+
+    # Rewriting the start of the file leaves the tail, and its key, unchanged
+    data = bytearray(log.read_bytes())
+    data[:4] = b"LINE"
+    log.write_bytes(bytes(data))
+    assert content_hash(str(log), (-1000, None)) == tail
+    assert content_hash(str(log), (0, 1000)) != head
+
+
+def test_range_hash_covers_the_text_read(log):
+    text, (start, end, _) = read_text(str(log), (1000, 5000))
+    assert text == log.read_bytes()[start:end].decode("utf-8")
+    assert content_hash(str(log), (1000, 5000)) == content_hash(str(log), (start, end))
+
+
+def test_parse_range():
+    assert parse_range("1K:2K") == (1024, 2048)
+    assert parse_range(":2K") == (0, 2048)
+    assert parse_range("1K:") == (1024, None)
+    for bad in ("100:50", "100:100"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_range(bad)
+
+
+def test_short_range_is_not_inverted_by_alignment(log):
+    # No line break inside the range: the cuts stay where they were asked for
+    text, (start, end, _) = read_text(str(log), (3, 10))
+    assert (start, end) == (3, 10)
+    assert text == LINES[3:10]
@@ -0,0 +1,126 @@
+"""
+Prompt caching against benchmarks/fake_anthropic.py: where the cache_control
+breakpoints land in the payload, and that cache tokens reach the usage summary.
+
+    python -m pytest tests
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import prompt_cache  # noqa: E402
+from batch_query import document_prompt  # noqa: E402
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+pytest.importorskip("rlm", reason="rlms is not installed")
+
+DOCUMENT = "".join(f"Clause {i}. The tenant pays rent on day {i + 1}.\n\n" for i in range(40))
+
+
+@pytest.fixture
+def backend():
+    server = serve_in_thread()
+    yield server
+    server.shutdown()
+
+
+def base_url(backend) -> str:
+    return f"http://127.0.0.1:{backend.server_address[1]}"
+
+
+def marked(request: dict) -> list[str]:
+    """Text of every block carrying cache_control, in prompt order."""
+    system = request.get("system") or []
+    blocks = [] if isinstance(system, str) else list(system)
+    for message in request["messages"]:
+        if isinstance(message["content"], list):
+            blocks += message["content"]
+    return [b["text"] for b in blocks if b.get("cache_control")]
+
+
+def test_payload_marks_system_document_and_last_message(backend, monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_BASE_URL", base_url(backend))
+    prompt_cache.install()
+    from rlm.clients.anthropic import AnthropicClient
+
+    client = AnthropicClient(api_key="fake", model_name="fake-model", max_tokens=256)
+    prompt = [
+        {"role": "system", "content": "You answer questions about documents."},
+        {"role": "user", "content": document_prompt("lease.txt", DOCUMENT, "When is rent due?")},
+        {"role": "assistant", "content": "Checking the clauses."},
+        {"role": "user", "content": "Which clause says so?"},
+    ]
+    client.completion(prompt)
+    client.completion(prompt)
+
+    request = backend.requests[-1]
+    assert request["system"][-1]["cache_control"] == prompt_cache.CACHE_CONTROL
+    document, question = request["messages"][0]["content"]
+    assert document["text"].endswith(prompt_cache.DOCUMENT_END)
+    assert document["cache_control"] == prompt_cache.CACHE_CONTROL
+    assert question == {"type": "text", "text": "\n\nQuestion: When is rent due?"}
+    assert request["messages"][-1]["content"][-1]["cache_control"] == prompt_cache.CACHE_CONTROL
+    assert marked(request) == [
+        "You answer questions about documents.", document["text"], "Which clause says so?",
+    ]
+
+    # The second call reads what the first one wrote
+    write, read = prompt_cache.cache_tokens(client.get_usage_summary())
+    assert write > 0
+    assert read == write
+
+
+def run_cli(tmp_path, backend, *extra):
+    env = {
+        **os.environ,
+        "ANTHROPIC_BASE_URL": base_url(backend),
+        "ANTHROPIC_API_KEY": "fake",
+        "RLM_CACHE_DIR": str(tmp_path / "cache"),
+    }
+    result = subprocess.run(
+        [sys.executable, str(ROOT / "rlm-query.py"), str(tmp_path / "lease.txt"),
+         "When is rent due?", "--verbose", "--no-cache", *extra],
+        capture_output=True, text=True, env=env, timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    return result
+
+
+def usage(result, field: str) -> int:
+    match = re.search(rf"{field}:\s+([\d,]+)", result.stderr)
+    assert match, result.stderr
+    return int(match.group(1).replace(",", ""))
+
+
+def test_cli_breakpoints_and_usage_summary(tmp_path, backend):
+    (tmp_path / "lease.txt").write_text(DOCUMENT, encoding="utf-8")
+    first = run_cli(tmp_path, backend)
+    second = run_cli(tmp_path, backend)
+
+    for request in backend.requests:
+        breakpoints = marked(request)
+        assert 1 <= len(breakpoints) <= 3
+        assert request["system"][-1].get("cache_control")
+        assert request["messages"][-1]["content"][-1].get("cache_control")
+
+    assert usage(first, "Cache write") > 0
+    # The same question again: its prompts are already cached
+    assert usage(second, "Cache read") >= usage(first, "Cache write")
+    assert usage(second, "Cache write") == 0
+
+
+def test_no_prompt_cache_sends_no_breakpoints(tmp_path, backend):
+    (tmp_path / "lease.txt").write_text(DOCUMENT, encoding="utf-8")
+    result = run_cli(tmp_path, backend, "--no-prompt-cache")
+
+    assert all(not marked(request) for request in backend.requests)
+    assert "Cache read" not in result.stderr
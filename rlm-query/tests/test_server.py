@@ -0,0 +1,68 @@
+"""
+server.QueryServer shutdown: the question in progress finishes, queued ones
+are sent back to run locally.
+
+    python -m pytest tests
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import server  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not hasattr(server.socket, "AF_UNIX"), reason="needs Unix sockets")
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_shutdown_sends_queued_questions_back(tmp_path):
+    socket_path = str(tmp_path / "server.sock")
+    query_server = server.QueryServer(socket_path, api_key="fake", default_model="fake-model")
+    started, release = threading.Event(), threading.Event()
+
+    def answer(request):
+        started.set()
+        release.wait(10)
+        return {"answer": f"answer to {request['question']}"}
+
+    query_server.answer = answer
+    serving = threading.Thread(target=query_server.serve_forever)
+    serving.start()
+    wait_for(lambda: server.status(socket_path) is not None)
+
+    replies = {}
+
+    def ask(question):
+        replies[question] = server.ask({"file_path": "doc.txt", "question": question}, socket_path)
+
+    askers = [threading.Thread(target=ask, args=("first",))]
+    askers[0].start()
+    assert started.wait(10)
+    for question in ("second", "third"):
+        askers.append(threading.Thread(target=ask, args=(question,)))
+        askers[-1].start()
+    wait_for(lambda: query_server.jobs.qsize() == 2)
+
+    assert server.stop(socket_path)
+    release.set()
+    for asker in askers:
+        asker.join(10)
+    serving.join(10)
+
+    assert not serving.is_alive()
+    assert replies["first"]["answer"] == "answer to first"
+    for question in ("second", "third"):
+        assert replies[question]["retry_locally"], replies[question]
+    assert server.status(socket_path) is None
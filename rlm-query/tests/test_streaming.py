@@ -0,0 +1,84 @@
+"""
+End-to-end runs of rlm-query.py --stream against benchmarks/fake_anthropic.py
+answering with server-sent events.
+
+    python -m pytest tests
+"""
+
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+pytest.importorskip("rlm", reason="rlms is not installed")
+
+TOKEN_DELAY = 0.05
+DOCUMENT = "".join(f"Clause {i}. The tenant pays rent on day {i + 1}.\n\n" for i in range(8))
+
+
+@pytest.fixture
+def backend():
+    server = serve_in_thread(token_delay=TOKEN_DELAY)
+    yield server
+    server.shutdown()
+
+
+def run_stream(tmp_path, backend, question):
+    """Run --stream; returns (stdout chunks as (seconds, text), stdout, stderr, exit seconds)."""
+    (tmp_path / "lease.txt").write_text(DOCUMENT, encoding="utf-8")
+    env = {
+        **os.environ,
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{backend.server_address[1]}",
+        "ANTHROPIC_API_KEY": "fake",
+        "RLM_CACHE_DIR": str(tmp_path / "cache"),
+    }
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "rlm-query.py"), str(tmp_path / "lease.txt"), question,
+         "--stream", "--no-cache"],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env, bufsize=0,
+    )
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(proc.stderr.read()))
+    reader.start()
+    chunks = []
+    while chunk := proc.stdout.read(4096):
+        chunks.append((time.perf_counter() - started, chunk.decode("utf-8")))
+    proc.wait(timeout=120)
+    finished = time.perf_counter() - started
+    reader.join()
+    assert proc.returncode == 0, stderr[0].decode("utf-8")
+    stdout = "".join(text for _, text in chunks)
+    return chunks, stdout, stderr[0].decode("utf-8"), finished
+
+
+def test_draft_reaches_stdout_before_the_run_completes(tmp_path, backend):
+    question = "When is rent due?"
+    chunks, stdout, stderr, finished = run_stream(tmp_path, backend, question)
+
+    first_draft = next(t for t, text in chunks if "Answer" in text)
+    # The answer streams a word per TOKEN_DELAY, so its first words arrive well before the end
+    assert finished - first_draft > 5 * TOKEN_DELAY
+    assert len(chunks) > 1
+    assert re.search(rf"Answer to: {re.escape(question)} \[context chars: \d+\]\n$", stdout)
+    assert "final answer differs" not in stderr
+
+
+def test_changed_final_answer_is_printed_after_a_notice(tmp_path, backend):
+    question = "When is rent due? (revise)"
+    _, stdout, stderr, _ = run_stream(tmp_path, backend, question)
+
+    assert "(final answer differs from the streamed draft; final answer follows)" in stderr
+    draft, final = stdout.rstrip("\n").split("\n")
+    assert draft.startswith(f"Answer to: {question}")
+    assert final == "Revised answer" + draft[len("Answer"):]
@@ -0,0 +1,100 @@
+"""
+--summary-tree: building the tree once, reading it back from the document
+cache, and the outline offsets the model is told to read.
+
+    python -m pytest tests
+"""
+
+import os
+import re
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import summary_tree  # noqa: E402
+from fake_anthropic import serve_in_thread  # noqa: E402
+
+DOCUMENT = "".join(f"Clause {i}. The tenant pays rent on day {i + 1}.\n\n" for i in range(400))
+
+
+def fake_summarize(text, combined=False):
+    return f"{'combined' if combined else 'part'} of {len(text)} chars"
+
+
+def test_empty_document_is_not_summarised():
+    calls = []
+    for text in ("", " \n\n\t "):
+        with pytest.raises(ValueError):
+            summary_tree.build_tree(text, lambda *args: calls.append(args))
+    assert calls == []
+
+
+def test_tree_prompt_offsets_match_the_text():
+    tree = {"root": summary_tree.build_tree(DOCUMENT, fake_summarize, leaf_chars=2000, fanout=3)}
+    assert tree["root"]["children"][0].get("children"), "expected more than two levels"
+
+    prompt = summary_tree.tree_prompt("lease.txt", DOCUMENT, tree, "When is rent due?")
+    outline = prompt[:prompt.index("=== END SUMMARY TREE ===")]
+    ranges = re.findall(r"^\s*\[(\d+):(\d+)\] ", outline, re.MULTILINE)
+    body = prompt.index("=== DOCUMENT: lease.txt ===\n") + len("=== DOCUMENT: lease.txt ===\n")
+
+    stack, nodes = [tree["root"]], []
+    while stack:
+        node = stack.pop()
+        nodes.append(node)
+        stack.extend(reversed(node.get("children", ())))
+    assert len(ranges) == len(nodes)
+    for (start, end), node in zip(ranges, nodes):
+        assert prompt[int(start):int(end)] == DOCUMENT[node["start"]:node["end"]]
+        assert int(start) == body + node["start"]
+
+
+@pytest.fixture
+def backend():
+    server = serve_in_thread()
+    yield server
+    server.shutdown()
+
+
+def run_tree(tmp_path, backend, file_name):
+    pytest.importorskip("anthropic", reason="anthropic is not installed")
+    env = {
+        **os.environ,
+        "ANTHROPIC_BASE_URL": f"http://127.0.0.1:{backend.server_address[1]}",
+        "ANTHROPIC_API_KEY": "fake",
+        "RLM_CACHE_DIR": str(tmp_path / "cache"),
+    }
+    return subprocess.run(
+        [sys.executable, str(ROOT / "rlm-query.py"), str(tmp_path / file_name), "--summary-tree"],
+        capture_output=True, text=True, env=env, timeout=120,
+    )
+
+
+def test_tree_is_built_once_then_read_from_the_cache(tmp_path, backend):
+    (tmp_path / "lease.txt").write_text(DOCUMENT, encoding="utf-8")
+
+    first = run_tree(tmp_path, backend, "lease.txt")
+    assert first.returncode == 0, first.stderr
+    assert "Summary tree: " in first.stderr
+    built = len(backend.requests)
+    assert built > 0
+
+    second = run_tree(tmp_path, backend, "lease.txt")
+    assert second.returncode == 0, second.stderr
+    assert "Summary tree (stored): " in second.stderr
+    assert len(backend.requests) == built
+
+
+def test_empty_document_sends_no_requests(tmp_path, backend):
+    (tmp_path / "empty.txt").write_text("\n \n", encoding="utf-8")
+
+    result = run_tree(tmp_path, backend, "empty.txt")
+    assert result.returncode == 1
+    assert "no text to summarise" in result.stderr
+    assert backend.requests == []
@@ -0,0 +1,57 @@
+"""
+video_query span indexes: cached per video digest and title.
+
+    python -m pytest tests
+"""
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import video_query  # noqa: E402
+from doc_cache import DocCache  # noqa: E402
+
+DIGEST = "".join(
+    f"[frame_{s:03d}s.png] {s}s-{s + 15}s\n  The presenter explains step {s // 15}.\n\n"
+    for s in range(0, 300, 15)
+)
+
+
+def make_video(tmp_path, title):
+    video_dir = tmp_path / "abcdefghijk"
+    video_dir.mkdir(exist_ok=True)
+    (video_dir / video_query.DIGEST_TXT).write_text(DIGEST, encoding="utf-8")
+    (video_dir / video_query.METADATA_NAME).write_text(
+        json.dumps({"video_id": "abcdefghijk", "title": title}), encoding="utf-8"
+    )
+    videos, _, _ = video_query.load_videos(str(video_dir))
+    return videos[0]
+
+
+def test_span_index_is_cached_per_title(tmp_path, monkeypatch):
+    cache = DocCache(cache_dir=tmp_path / "cache")
+    first = video_query.load_span_index(make_video(tmp_path, "Sourdough basics"), cache)
+    assert "sourdough" in first.postings
+
+    built = []
+    build = video_query.build_span_index
+    monkeypatch.setattr(video_query, "build_span_index", lambda v: built.append(v) or build(v))
+
+    # Same digest and title: read back from the cache
+    video_query.load_span_index(make_video(tmp_path, "Sourdough basics"), cache)
+    assert built == []
+
+    # Same digest, new title: rebuilt, so the title's terms match
+    renamed = video_query.load_span_index(make_video(tmp_path, "Rye bread basics"), cache)
+    assert len(built) == 1
+    assert "rye" in renamed.postings and "sourdough" not in renamed.postings
+
+
+def test_corpus_hash_follows_the_title(tmp_path, monkeypatch):
+    monkeypatch.setattr(video_query, "DocCache", lambda: DocCache(cache_dir=tmp_path / "cache"))
+    before = video_query.corpus_hash([make_video(tmp_path, "Sourdough basics")])
+    after = video_query.corpus_hash([make_video(tmp_path, "Rye bread basics")])
+    assert before != after
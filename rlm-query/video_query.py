@@ -0,0 +1,370 @@
+"""
+video_query.py — Time-aligned questions over video-pipeline output.
+
+Accepts a processed video directory (digest.jsonl / digest.txt +
+metadata.json), a pipeline output directory holding index.json, or that
+index.json itself. Instead of putting whole digests in the prompt:
+
+    1. each video's digest windows (one per keyframe, with the transcript
+       text spoken during it) are read one at a time through the
+       video-pipeline's DigestReader, or parsed from digest.txt for videos
+       processed before digest.jsonl existed
+    2. consecutive windows are grouped into SPAN_SECONDS spans and indexed
+       with BM25 (see retrieval.py); each video's index is stored in the
+       document cache, keyed by its digest's content hash, so only new or
+       changed videos have their digests read in full
+    3. the per-video indexes are merged and ranked against the question; only
+       the windows of the top-k spans are read back, in time order
+    4. each window sent is headed by its keyframe path and time range, with
+       the transcript at segment-level timestamps where segments.bin exists
+
+So the tokens sent grow with the number of spans asked for, not with the
+hours of video in the corpus, and the model is asked to cite video_id,
+timestamps and keyframe paths, which the context gives it verbatim.
+"""
+
+import bisect
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+import retrieval
+from doc_cache import DocCache
+from file_loader import DocumentError
+
+PIPELINE_DIR = Path(__file__).resolve().parent.parent / "video-pipeline"
+
+# Output file names, as written by video-pipeline (digest_index.py, segment_store.py)
+INDEX_NAME = "index.json"
+DIGEST_TXT = "digest.txt"
+DIGEST_JSONL = "digest.jsonl"
+DIGEST_IDX = "digest.idx"
+SEGMENTS_FILE = "segments.bin"
+METADATA_NAME = "metadata.json"
+SPAN_SECONDS = 60
+DEFAULT_SPANS = 8
+
+CITE_INSTRUCTION = (
+    "Cite every point with its video_id, timestamp (MM:SS or H:MM:SS) and keyframe path "
+    "as given in the context, e.g. (abc123 @ 01:15, abc123/keyframes/frame_075s.png)."
+)
+
+_DIGEST_WINDOW = re.compile(r"^\[(frame_\d+s\.png)\] (\d+)s-(\d+)s$")
+
+
+def _pipeline_modules():
+    """video-pipeline's digest_index and segment_store, imported on first use.
+
+    The pipeline directory goes at the end of sys.path, so it never shadows
+    rlm-query's own modules.
+    """
+    if str(PIPELINE_DIR) not in sys.path:
+        sys.path.append(str(PIPELINE_DIR))
+    import digest_index
+    import segment_store
+
+    return digest_index, segment_store
+
+
+def clock(seconds: float) -> str:
+    """MM:SS, or H:MM:SS from an hour on."""
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{secs:02d}" if hours else f"{minutes:02d}:{secs:02d}"
+
+
+def _has_digest_index(path: Path) -> bool:
+    return (path / DIGEST_JSONL).is_file() and (path / DIGEST_IDX).is_file()
+
+
+def _is_video_dir(path: Path) -> bool:
+    return _has_digest_index(path) or (
+        (path / DIGEST_TXT).is_file() and (path / METADATA_NAME).is_file()
+    )
+
+
+def _read_index(path: Path) -> dict | None:
+    try:
+        with open(path, encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return index if isinstance(index, dict) and isinstance(index.get("videos"), list) else None
+
+
+def is_video_path(path: str) -> bool:
+    """True for a processed video directory, or a pipeline output directory / its index.json."""
+    p = Path(path)
+    if p.is_file():
+        return p.name == INDEX_NAME and _read_index(p) is not None
+    if p.is_dir():
+        return _is_video_dir(p) or _read_index(p / INDEX_NAME) is not None
+    return False
+
+
+class Video:
+    """One processed video; its digest and segments are only opened when read."""
+
+    def __init__(self, path: Path, ref: str, info: dict):
+        self.path = path
+        self.ref = ref  # the video directory as cited, e.g. "abc123"
+        self.video_id = info.get("video_id") or path.name
+        self.title = info.get("title") or ""
+        self.platform = info.get("platform") or ""
+        self.duration = info.get("duration_seconds") or 0
+
+    @property
+    def digest_path(self) -> Path:
+        return self.path / (DIGEST_JSONL if _has_digest_index(self.path) else DIGEST_TXT)
+
+    def windows(self, start: float = 0, end: float | None = None):
+        """Yield the digest windows (frame, start, end, text) starting in [start, end), in order."""
+        for window in self._windows(start, end):
+            if window["start"] >= start and (end is None or window["start"] < end):
+                yield window
+
+    def _windows(self, start: float, end: float | None):
+        if _has_digest_index(self.path):
+            digest_index, _ = _pipeline_modules()
+            with digest_index.DigestReader(self.path) as digest:
+                yield from digest if end is None else digest.windows_between(start, end)
+            return
+        window = None
+        with open(self.path / DIGEST_TXT, encoding="utf-8") as f:
+            for line in f:
+                match = _DIGEST_WINDOW.match(line.rstrip("\n"))
+                if match:
+                    if window:
+                        yield window
+                    window = {"frame": f"keyframes/{match.group(1)}",
+                              "start": int(match.group(2)), "end": int(match.group(3)),
+                              "text": ""}
+                elif window and line.startswith("  "):
+                    window["text"] = f"{window['text']} {line.strip()}".strip()
+        if window:
+            yield window
+
+    def segments(self):
+        """The memory-mapped SegmentStore of segments.bin, or None without one."""
+        path = self.path / SEGMENTS_FILE
+        if not path.is_file():
+            return None
+        _, segment_store = _pipeline_modules()
+        try:
+            return segment_store.SegmentStore.load(path)
+        except (OSError, ValueError):
+            return None
+
+
+def load_videos(path: str) -> tuple[list[Video], str, list[str]]:
+    """The videos under ``path``, a name for the corpus and the ids of indexed videos
+    without a digest; raises DocumentError."""
+    p = Path(path).resolve()
+    if p.is_dir() and _is_video_dir(p):
+        info = {}
+        try:
+            with open(p / METADATA_NAME, encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            pass
+        return [Video(p, p.name, info)], p.name, []
+
+    index_path = p if p.is_file() else p / INDEX_NAME
+    index = _read_index(index_path)
+    if index is None:
+        raise DocumentError(f"Not a video pipeline index: {index_path}")
+    base = index_path.parent
+    videos, missing = [], []
+    for entry in index["videos"]:
+        video_dir = base / (entry.get("path") or entry["video_id"])
+        if _is_video_dir(video_dir):
+            videos.append(Video(video_dir, video_dir.relative_to(base).as_posix(), entry))
+        else:
+            missing.append(entry.get("video_id", str(video_dir)))
+    if not videos:
+        raise DocumentError(f"No processed videos listed in {index_path}")
+    return videos, base.name, missing
+
+
+def _title_hash(video: Video) -> str:
+    return hashlib.sha256(video.title.encode("utf-8")).hexdigest()[:16]
+
+
+def corpus_hash(videos: list[Video]) -> str:
+    """Answer-cache document hash: changes when any video's digest or title does."""
+    cache = DocCache()
+    h = hashlib.sha256()
+    for video in videos:
+        digest = cache.content_hash(str(video.digest_path))
+        h.update(f"{video.ref}\0{digest}\0{_title_hash(video)}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def answer_variant(k: int) -> str:
+    """The answer-key variant for questions answered from the top-k spans."""
+    return f"video:k{k}:s{SPAN_SECONDS}"
+
+
+def build_span_index(video: Video) -> retrieval.BM25Index:
+    """BM25 index of the video's SPAN_SECONDS spans; chunks are (start, end, "") in seconds."""
+    buckets, parts = [], []
+    for window in video.windows():
+        bucket = int(window["start"] // SPAN_SECONDS)
+        if not buckets or buckets[-1] != bucket:
+            buckets.append(bucket)
+            parts.append([video.title])
+        parts[-1].append(window["text"])
+
+    texts = [" ".join(part) for part in parts]
+    chunks, pos = [], 0
+    for text in texts:
+        chunks.append((pos, pos + len(text), ""))
+        pos += len(text) + 1
+    index = retrieval.BM25Index.from_chunks("\n".join(texts), chunks)
+    times = [(b * SPAN_SECONDS, (b + 1) * SPAN_SECONDS, "") for b in buckets]
+    return retrieval.BM25Index(times, index.postings, index.lengths, index.text_digest)
+
+
+def load_span_index(video: Video, cache: DocCache | None = None) -> retrieval.BM25Index:
+    """The video's span index from ``cache``, building and storing it on a miss.
+
+    The digest is the cache key, and span text includes the title (from
+    metadata.json or index.json), so the title's hash goes in the kind.
+    """
+    # INDEX_VERSION is checked inside the stored JSON
+    kind = f"video-spans-s{SPAN_SECONDS}-t{_title_hash(video)}"
+    digest_path = str(video.digest_path)
+    if cache:
+        data = cache.get(digest_path, kind=kind)
+        if data is not None:
+            try:
+                return retrieval.BM25Index.from_json(data)
+            except (ValueError, KeyError):
+                pass
+    index = build_span_index(video)
+    if cache:
+        cache.put(digest_path, index.to_json(), kind=kind)
+    return index
+
+
+def _merge(indexes: list[retrieval.BM25Index]) -> tuple[retrieval.BM25Index, list[tuple]]:
+    """One index over all videos' spans, and (video number, start, end) per merged chunk."""
+    spans, lengths, postings = [], [], {}
+    for i, index in enumerate(indexes):
+        offset = len(spans)
+        spans.extend((i, start, end) for start, end, _ in index.chunks)
+        lengths.extend(index.lengths)
+        for term, posting in index.postings.items():
+            half = len(posting) // 2
+            ids, tfs = postings.setdefault(term, ([], []))
+            ids.extend(chunk_id + offset for chunk_id in posting[:half])
+            tfs.extend(posting[half:])
+    merged = {term: ids + tfs for term, (ids, tfs) in postings.items()}
+    chunks = [(start, end, "") for _, start, end in spans]
+    return retrieval.BM25Index(chunks, merged, lengths, ""), spans
+
+
+def select_spans(videos: list[Video], question: str, k: int,
+                 use_cache: bool = True) -> tuple[list[dict], int]:
+    """Top-k spans for ``question`` in video and time order, and the number of spans in all.
+
+    Falls back to the first k spans when no span shares a term with the question.
+    """
+    cache = DocCache() if use_cache else None
+    index, spans = _merge([load_span_index(video, cache) for video in videos])
+    if not spans:
+        return [], 0
+    hits = index.search(question, k) or [(i, 0.0) for i in range(min(k, len(spans)))]
+    selected = []
+    for i in sorted(i for i, _ in hits):
+        video, start, end = spans[i]
+        windows = list(videos[video].windows(start, end))
+        if windows:
+            selected.append({"video": video, "bucket": start // SPAN_SECONDS, "windows": windows})
+    return selected, len(spans)
+
+
+def _window_lines(video: Video, window: dict, segments) -> list[str]:
+    frame = f"{video.ref}/{window['frame']}"
+    lines = [f"[{frame}] {clock(window['start'])}-{clock(window['end'])}"]
+    if segments is not None:
+        # Segments whose midpoint falls in the window, as the digest buckets them
+        i = max(bisect.bisect_left(segments.starts, window["start"]) - 1, 0)
+        while i < len(segments) and segments.starts[i] < window["end"]:
+            middle = (segments.starts[i] + segments.ends[i]) / 2
+            if window["start"] <= middle < window["end"]:
+                lines.append(f"  [{clock(segments.starts[i])}] {segments.text_at(i)}")
+            i += 1
+        if len(lines) > 1:
+            return lines
+    if window["text"]:
+        lines.append(f"  {window['text']}")
+    return lines
+
+
+def build_context(videos: list[Video], spans: list[dict]) -> tuple[str, list[str]]:
+    """The selected spans as text under per-video headers, and a label per merged span."""
+    lines, labels = [], []
+    for i, video in enumerate(videos):
+        selected = [span for span in spans if span["video"] == i]
+        if not selected:
+            continue
+        header = f"=== VIDEO: {video.video_id}"
+        if video.title:
+            header += f" · {video.title}"
+        if video.platform:
+            header += f" · {video.platform}"
+        if video.duration:
+            header += f" · {clock(video.duration)}"
+        lines.append(f"{header} ===")
+        segments = video.segments()
+        try:
+            previous, run_start = None, ""
+            for span in selected:
+                windows = span["windows"]
+                if previous is None or span["bucket"] != previous + 1:
+                    run_start = clock(windows[0]["start"])
+                    labels.append("")
+                    lines.append(f"--- {video.video_id} from {run_start} ---")
+                labels[-1] = f"{video.video_id} {run_start}-{clock(windows[-1]['end'])}"
+                previous = span["bucket"]
+                for window in windows:
+                    lines.extend(_window_lines(video, window, segments))
+            lines.append("")
+        finally:
+            if segments is not None:
+                segments.close()
+    return "\n".join(lines), labels
+
+
+def video_context(path: str, question: str, k: int = DEFAULT_SPANS,
+                  use_cache: bool = True) -> tuple[str, str, dict]:
+    """(document name, context text, stats) for the top-k spans; raises DocumentError."""
+    videos, name, missing = load_videos(path)
+    if missing:
+        print(f"Skipping {len(missing)} indexed videos without a digest: {', '.join(missing)}",
+              file=sys.stderr)
+    spans, total = select_spans(videos, question, k, use_cache)
+    if not spans:
+        raise DocumentError(f"No digest windows found under {path}")
+    text, labels = build_context(videos, spans)
+    sent_videos = len({span["video"] for span in spans})
+    document_name = (f"{name} (video corpus: {len(spans)} of {total} "
+                     f"{SPAN_SECONDS}s spans from {sent_videos} of {len(videos)} videos)")
+    stats = {
+        "videos_total": len(videos),
+        "videos_sent": sent_videos,
+        "spans_total": total,
+        "spans_sent": len(spans),
+        "spans": labels,
+        "context_chars_sent": len(text),
+    }
+    return document_name, f"{CITE_INSTRUCTION}\n\n{text}", stats
+
+
+def cited_question(question: str) -> str:
+    """The question as the root prompt: with the citation instruction."""
+    return f"{question}\n\n{CITE_INSTRUCTION}"
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+bench_stream_overlap.py — --stream against download-then-transcribe on a slow link.
+
+Generates a test video (and its audio-only track) with FFmpeg, serves both from
+a local HTTP server throttled to a fixed rate per connection, and points
+YTDLP_PATH at benchmarks/fake_ytdlp.py. Whisper is replaced by a stand-in that
+takes --rtf seconds per second of audio (--whisper uses the real model), so
+transcription time is known in advance. Three runs:
+
+    sequential  process_video(): download, extract audio, then transcribe
+    streaming   process_video_streaming(): transcribe the audio stream as it arrives
+    fallback    process_video_streaming() when yt-dlp -J gives no direct URL
+
+Streaming should take about max(download, transcribe), sequential about their
+sum, and the fallback should match the sequential transcript. Exits 1 if not.
+
+Needs ffmpeg and numpy.
+
+Usage:
+    python benchmarks/bench_stream_overlap.py
+    python benchmarks/bench_stream_overlap.py --duration 300 --download-seconds 20 --rtf 0.05
+    python benchmarks/bench_stream_overlap.py --json results/stream_overlap.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import wave
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+sys.path.insert(0, str(BENCH_DIR.parent))
+
+URL = "https://www.youtube.com/watch?v=benchstream"
+VIDEO_ID = URL[-11:]
+SEGMENT_SECONDS = 5
+
+
+def generate_media(tmp: Path, duration: int) -> tuple[Path, Path]:
+    """A test-pattern MP4 with a tone, and the same tone as an audio-only M4A."""
+    video = tmp / "media.mp4"
+    audio = tmp / "media.m4a"
+    common = ["ffmpeg", "-y", "-loglevel", "error"]
+    subprocess.run(common + [
+        "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:duration={duration}",
+        "-c:v", "mpeg4", "-q:v", "5", "-c:a", "aac", "-shortest",
+        "-movflags", "+faststart", str(video),
+    ], check=True)
+    subprocess.run(common + [
+        "-i", str(video), "-vn", "-c:a", "copy", "-movflags", "+faststart", str(audio),
+    ], check=True)
+    return video, audio
+
+
+class ThrottledServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, files: dict, rate: float):
+        super().__init__(("127.0.0.1", 0), ThrottledHandler)
+        self.files = files  # url path -> Path
+        self.rate = rate    # bytes per second per connection
+
+
+class ThrottledHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    chunk_seconds = 0.05
+
+    def do_GET(self):
+        path = self.server.files.get(self.path)
+        if path is None:
+            self.send_error(404)
+            return
+        size = path.stat().st_size
+        start, end = 0, size
+        byte_range = self.headers.get("Range", "")
+        if byte_range.startswith("bytes="):
+            first, _, last = byte_range[6:].partition("-")
+            start = int(first or 0)
+            end = min(size, int(last) + 1) if last else size
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end - 1}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(end - start))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        chunk = max(1, int(self.server.rate * self.chunk_seconds))
+        started = time.perf_counter()
+        sent = 0
+        with open(path, "rb") as f:
+            f.seek(start)
+            while sent < end - start:
+                data = f.read(min(chunk, end - start - sent))
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                sent += len(data)
+                ahead = sent / self.server.rate - (time.perf_counter() - started)
+                if ahead > 0:
+                    time.sleep(ahead)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class SimulatedWhisper:
+    """Whisper stand-in: ``rtf`` seconds per audio second, a segment every 5s."""
+
+    def __init__(self, rtf: float):
+        self.rtf = rtf
+        self.busy_seconds = 0.0
+
+    def transcribe(self, audio, language=None, initial_prompt=None):
+        if isinstance(audio, str):
+            with wave.open(audio, "rb") as wav:
+                seconds = wav.getnframes() / wav.getframerate()
+        else:
+            seconds = len(audio) / 16000
+        started = time.perf_counter()
+        time.sleep(seconds * self.rtf)
+        self.busy_seconds += time.perf_counter() - started
+        segments = []
+        at = 0.0
+        while at < seconds:
+            end = min(seconds, at + SEGMENT_SECONDS)
+            segments.append({"start": at, "end": end, "text": f" tone for {end - at:.0f} seconds"})
+            at = end
+        return {"segments": segments}
+
+
+def run(pipeline_core, mode: str, out_dir: Path, whisper) -> dict:
+    """One pipeline run; returns its timing and where it wrote the transcript."""
+    os.environ["YOUTUBE_OUTPUT_DIR"] = str(out_dir)
+    if mode == "fallback":
+        os.environ["FAKE_YTDLP_NO_DIRECT_URL"] = "1"
+    else:
+        os.environ.pop("FAKE_YTDLP_NO_DIRECT_URL", None)
+    if whisper is not None:
+        whisper.busy_seconds = 0.0
+
+    log = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(log):
+        if mode == "sequential":
+            pipeline_core.process_video(URL)
+        else:
+            pipeline_core.process_video_streaming(URL)
+    elapsed = time.perf_counter() - started
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "whisper_seconds": None if whisper is None else round(whisper.busy_seconds, 2),
+        "streamed": "Streaming audio with ffmpeg" in log.getvalue(),
+        "transcript": out_dir / VIDEO_ID / "transcript.txt",
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark --stream on a throttled download.")
+    parser.add_argument("--duration", type=int, default=120, help="Video length in seconds (default: 120)")
+    parser.add_argument("--download-seconds", type=float, default=10.0,
+                        help="Throttle so the full video takes this long to download (default: 10)")
+    parser.add_argument("--rtf", type=float, default=0.1,
+                        help="Simulated Whisper seconds per audio second (default: 0.1)")
+    parser.add_argument("--whisper", action="store_true",
+                        help="Transcribe with the real Whisper model instead of the stand-in")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        print(f"Generating {args.duration}s test video...", file=sys.stderr)
+        video, audio = generate_media(tmp, args.duration)
+        video_mb = video.stat().st_size / 1024 / 1024
+        rate = video.stat().st_size / args.download_seconds
+
+        server = ThrottledServer({"/video.mp4": video, "/audio.m4a": audio}, rate)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        os.environ["YTDLP_PATH"] = str(BENCH_DIR / "fake_ytdlp.py")
+        os.environ["FAKE_YTDLP_VIDEO_URL"] = f"{base_url}/video.mp4"
+        os.environ["FAKE_YTDLP_AUDIO_URL"] = f"{base_url}/audio.m4a"
+        os.environ["FAKE_YTDLP_DURATION"] = str(args.duration)
+        os.environ["WHISPER_RTF_CACHE"] = str(tmp / "whisper_rtf.json")
+        import pipeline_core  # reads YTDLP_PATH and WHISPER_RTF_CACHE on import
+
+        whisper = None
+        if not args.whisper:
+            whisper = SimulatedWhisper(args.rtf)
+            pipeline_core._whisper_models[pipeline_core.WHISPER_MODEL] = whisper
+
+        started = time.perf_counter()
+        with urllib.request.urlopen(f"{base_url}/video.mp4") as response:
+            response.read()
+        download = time.perf_counter() - started
+
+        rows = [run(pipeline_core, mode, tmp / mode, whisper)
+                for mode in ("sequential", "streaming", "fallback")]
+        server.shutdown()
+
+        transcribe = rows[0]["whisper_seconds"] or args.duration * args.rtf
+        bound, total = max(download, transcribe), download + transcribe
+        sequential, streaming, fallback = rows
+        same_transcript = fallback["transcript"].read_text() == sequential["transcript"].read_text()
+
+    whisper_label = "real Whisper" if args.whisper else f"simulated RTF {args.rtf}"
+    print(f"\n{args.duration}s video, {video_mb:.1f} MB at {rate / 1024:.0f} KB/s, {whisper_label}")
+    print(f"  download alone   {download:7.2f}s")
+    print(f"  transcribe alone {transcribe:7.2f}s")
+    print(f"  max / sum        {bound:7.2f}s / {total:.2f}s")
+    print(f"{'mode':>12} {'seconds':>9} {'/ max':>7} {'/ sum':>7} {'streamed':>9}")
+    for row in rows:
+        row["vs_max"] = round(row["seconds"] / bound, 2)
+        row["vs_sum"] = round(row["seconds"] / total, 2)
+        print(f"{row['mode']:>12} {row['seconds']:>9.2f} {row['vs_max']:>7.2f} "
+              f"{row['vs_sum']:>7.2f} {'yes' if row['streamed'] else 'no':>9}")
+
+    failures = []
+    if not streaming["streamed"]:
+        failures.append("streaming run did not stream the audio")
+    if streaming["seconds"] >= (bound + total) / 2:
+        failures.append(f"streaming took {streaming['seconds']:.2f}s, closer to the sum than the max")
+    if fallback["streamed"]:
+        failures.append("fallback run streamed despite no direct URL")
+    if not same_transcript:
+        failures.append("fallback transcript differs from the sequential one")
+
+    if args.json:
+        Path(args.json).parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({
+                "benchmark": "stream_overlap",
+                "duration_seconds": args.duration,
+                "rate_bytes_per_second": round(rate),
+                "rtf": None if args.whisper else args.rtf,
+                "download_seconds": round(download, 2),
+                "transcribe_seconds": round(transcribe, 2),
+                "results": [{k: v for k, v in row.items() if k != "transcript"} for row in rows],
+            }, f, indent=2)
+
+    for failure in failures:
+        print(f"Error: {failure}", file=sys.stderr)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+fake_ytdlp.py — Stand-in for yt-dlp that serves media from a local URL.
+
+Point YTDLP_PATH at this script to run the pipeline without the network.
+It understands the two calls pipeline_core makes:
+
+    fake_ytdlp.py -f FORMAT -J --no-playlist URL
+        prints stream info whose "url" is FAKE_YTDLP_AUDIO_URL (omitted when
+        FAKE_YTDLP_NO_DIRECT_URL is set, like a merged or fragmented format)
+    fake_ytdlp.py -f FORMAT --merge-output-format mp4 --write-info-json -o PATH URL
+        downloads FAKE_YTDLP_VIDEO_URL to PATH and writes video.info.json next to it
+
+FAKE_YTDLP_DURATION (seconds) and FAKE_YTDLP_TITLE fill in the info JSON.
+"""
+
+import json
+import os
+import shutil
+import sys
+import urllib.request
+from pathlib import Path
+
+
+def info(url: str) -> dict:
+    return {
+        "id": url.rsplit("=", 1)[-1][-11:],
+        "title": os.environ.get("FAKE_YTDLP_TITLE", "Throttled benchmark video"),
+        "duration": float(os.environ.get("FAKE_YTDLP_DURATION", "0")),
+        "channel": "benchmarks",
+        "webpage_url": url,
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    url = args[-1]
+
+    if "-J" in args:
+        record = info(url)
+        if not os.environ.get("FAKE_YTDLP_NO_DIRECT_URL"):
+            record["url"] = os.environ["FAKE_YTDLP_AUDIO_URL"]
+        print(json.dumps(record))
+        return
+
+    output = Path(args[args.index("-o") + 1])
+    with urllib.request.urlopen(os.environ["FAKE_YTDLP_VIDEO_URL"]) as response, \
+            open(output, "wb") as f:
+        shutil.copyfileobj(response, f)
+    if "--write-info-json" in args:
+        with open(output.with_suffix(".info.json"), "w", encoding="utf-8") as f:
+            json.dump(info(url), f)
+
+
+if __name__ == "__main__":
+    main()
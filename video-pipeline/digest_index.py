@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Structured, timestamp-indexed digest.
+
+Written next to digest.txt by the pipeline so downstream tools don't have to
+regex-parse the human-readable files.
+
+    digest.jsonl  one JSON object per keyframe window, in time order:
+                  {"frame": "keyframes/frame_015s.png", "start": 15, "end": 30, "text": "..."}
+    digest.idx    fixed-size binary records (start, end, byte offset into digest.jsonl)
+
+Usage:
+    python digest_index.py <video_dir> <seconds>   # print the window covering a timestamp
+
+Library:
+    from digest_index import DigestReader
+    with DigestReader(video_dir) as digest:
+        window = digest.window_at(42.0)
+"""
+
+import bisect
+import json
+import mmap
+import struct
+import sys
+from pathlib import Path
+
+DIGEST_JSONL = "digest.jsonl"
+DIGEST_IDX = "digest.idx"
+
+INDEX_MAGIC = b"DIGIDX01"
+INDEX_RECORD = struct.Struct("<ddQ")  # start, end, offset
+
+
+class DigestWriter:
+    """Stream digest windows to digest.jsonl + digest.idx as they are built."""
+
+    def __init__(self, video_dir):
+        video_dir = Path(video_dir)
+        self.jsonl_path = video_dir / DIGEST_JSONL
+        self.idx_path = video_dir / DIGEST_IDX
+        self._jsonl = open(self.jsonl_path, "wb")
+        self._idx = open(self.idx_path, "wb")
+        self._idx.write(INDEX_MAGIC)
+        self._last_start = float("-inf")
+        self.count = 0
+
+    def add(self, frame, start, end, text):
+        """Append one window. Windows must be added in ascending start order."""
+        if start < self._last_start:
+            raise ValueError(f"Digest windows out of order: {start} after {self._last_start}")
+        self._last_start = start
+
+        offset = self._jsonl.tell()
+        record = {"frame": frame, "start": start, "end": end, "text": text}
+        self._jsonl.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._idx.write(INDEX_RECORD.pack(float(start), float(end), offset))
+        self.count += 1
+
+    def close(self):
+        self._jsonl.close()
+        self._idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+class _IndexStarts:
+    """Sequence view over the start times in the mmapped index (for bisect)."""
+
+    def __init__(self, buf, count):
+        self._buf = buf
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, i):
+        return INDEX_RECORD.unpack_from(self._buf, len(INDEX_MAGIC) + i * INDEX_RECORD.size)[0]
+
+
+class DigestReader:
+    """Random access to a structured digest without loading the whole file.
+
+    Lookups bisect the memory-mapped index (O(log n)) and then read a single
+    line from digest.jsonl.
+    """
+
+    def __init__(self, video_dir):
+        video_dir = Path(video_dir)
+        self._jsonl = open(video_dir / DIGEST_JSONL, "rb")
+        self._idx_file = open(video_dir / DIGEST_IDX, "rb")
+        size = self._idx_file.seek(0, 2)
+        if size < len(INDEX_MAGIC):
+            raise ValueError(f"Truncated digest index: {video_dir / DIGEST_IDX}")
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._idx[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"Not a digest index: {video_dir / DIGEST_IDX}")
+        self._count = (size - len(INDEX_MAGIC)) // INDEX_RECORD.size
+        self._starts = _IndexStarts(self._idx, self._count)
+
+    def __len__(self):
+        return self._count
+
+    def _record(self, i):
+        return INDEX_RECORD.unpack_from(self._idx, len(INDEX_MAGIC) + i * INDEX_RECORD.size)
+
+    def window(self, i):
+        """Return window ``i`` as a dict (frame, start, end, text)."""
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        _, _, offset = self._record(i)
+        self._jsonl.seek(offset)
+        return json.loads(self._jsonl.readline())
+
+    def window_at(self, seconds):
+        """Return the window covering ``seconds``, or None if outside the video."""
+        i = bisect.bisect_right(self._starts, seconds) - 1
+        if i < 0:
+            return None
+        _, end, _ = self._record(i)
+        # The final window may be clipped to the duration; anything past it is outside
+        if seconds >= end and i == self._count - 1:
+            return None
+        return self.window(i)
+
+    def windows_between(self, start, end):
+        """Yield windows overlapping [start, end)."""
+        i = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        while i < self._count:
+            w_start, w_end, _ = self._record(i)
+            if w_start >= end:
+                break
+            if w_end > start:
+                yield self.window(i)
+            i += 1
+
+    def __iter__(self):
+        for i in range(self._count):
+            yield self.window(i)
+
+    def close(self):
+        self._idx.close()
+        self._idx_file.close()
+        self._jsonl.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python digest_index.py <video_dir> <seconds>")
+        sys.exit(1)
+
+    with DigestReader(sys.argv[1]) as digest:
+        window = digest.window_at(float(sys.argv[2]))
+    if window is None:
+        print("No window at that timestamp.")
+        sys.exit(1)
+    print(json.dumps(window, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
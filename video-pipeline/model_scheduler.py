@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Adaptive Whisper model selection.
+
+Picks the largest Whisper model whose predicted transcription time fits a
+per-job deadline, from the real-time factor (RTF = seconds of compute per
+second of audio) measured on this host. Whisper pads audio to whole 30s
+windows, so RTFs are per padded second: a 10s clip costs as much as 30s.
+RTFs are calibrated with a quick self-benchmark the first time a deadline
+is used, cached per host, and refined with every real transcription.
+
+Cache: ~/.cache/video-pipeline/whisper_rtf.json (override with WHISPER_RTF_CACHE)
+
+Usage:
+    python model_scheduler.py                    # show cached RTFs for this host
+    python model_scheduler.py --calibrate [models...]
+    python model_scheduler.py --plan <audio_seconds> <deadline_seconds>
+"""
+
+import json
+import math
+import os
+import platform
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Smallest -> largest; the scheduler never looks outside this list
+MODEL_LADDER = ("tiny", "base", "small", "medium", "large")
+DEFAULT_CANDIDATES = ("tiny", "base", "small")
+
+# Approximate speed relative to "large" (from the Whisper README), used to
+# extrapolate models that have not been benchmarked on this host yet
+RELATIVE_SPEED = {"tiny": 32, "base": 16, "small": 6, "medium": 2, "large": 1}
+
+CALIBRATION_MODEL = "base"
+CALIBRATION_SECONDS = 30
+SAFETY_MARGIN = 0.85  # plan to finish within 85% of the deadline
+RTF_SMOOTHING = 0.3   # weight of each new measurement in the cached RTF
+SAMPLE_RATE = 16000
+WHISPER_WINDOW_SECONDS = 30  # Whisper pads every window of audio to this length
+
+CACHE_PATH = Path(os.environ.get(
+    "WHISPER_RTF_CACHE",
+    Path.home() / ".cache" / "video-pipeline" / "whisper_rtf.json",
+))
+
+
+def host_key():
+    """Identify this host + compute device, since RTF differs between them."""
+    device = "cpu"
+    try:
+        import torch
+        if torch.cuda.is_available():
+            device = torch.cuda.get_device_name(0)
+    except ImportError:
+        pass
+    return f"{platform.node()}|{platform.machine()}|{os.cpu_count()}cpu|{device}"
+
+
+def padded_seconds(audio_seconds):
+    """Audio length as Whisper processes it: rounded up to whole 30s windows."""
+    return math.ceil(audio_seconds / WHISPER_WINDOW_SECONDS) * WHISPER_WINDOW_SECONDS
+
+
+def synthetic_sample(seconds=CALIBRATION_SECONDS):
+    """Low-level noise; only used when no real audio is available to calibrate on."""
+    import numpy as np
+    rng = np.random.default_rng(0)
+    return (rng.standard_normal(int(seconds * SAMPLE_RATE)) * 0.05).astype(np.float32)
+
+
+def read_wav_sample(path, seconds=CALIBRATION_SECONDS):
+    """First ``seconds`` of a 16kHz mono s16le WAV as float32."""
+    import wave
+
+    import numpy as np
+    with wave.open(str(path), "rb") as wav:
+        frames = wav.readframes(int(seconds * wav.getframerate()))
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+class ModelScheduler:
+    """Chooses Whisper models against a deadline using cached per-host RTFs."""
+
+    def __init__(self, load_model, transcribe_lock=None, candidates=DEFAULT_CANDIDATES,
+                 cache_path=CACHE_PATH):
+        self.load_model = load_model
+        self.transcribe_lock = transcribe_lock or threading.Lock()
+        self.candidates = [m for m in MODEL_LADDER if m in candidates]
+        self.cache_path = Path(cache_path)
+        self.host = host_key()
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+
+    # --- cache ---
+
+    def _load_cache(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_cache(self):
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.cache_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._cache, f, indent=2)
+        tmp_path.replace(self.cache_path)
+
+    def measured(self):
+        """{model: rtf} measured on this host."""
+        host = self._cache.get(self.host, {})
+        return {model: entry["rtf"] for model, entry in host.items()}
+
+    def record(self, model, audio_seconds, elapsed):
+        """Fold a real transcription timing into the cached RTF for ``model``."""
+        if audio_seconds <= 0:
+            return
+        rtf = elapsed / padded_seconds(audio_seconds)
+        with self._lock:
+            host = self._cache.setdefault(self.host, {})
+            previous = host.get(model)
+            if previous:
+                rtf = (1 - RTF_SMOOTHING) * previous["rtf"] + RTF_SMOOTHING * rtf
+            host[model] = {
+                "rtf": rtf,
+                "samples": (previous or {}).get("samples", 0) + 1,
+                "updated": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            }
+            self._save_cache()
+
+    # --- calibration ---
+
+    def calibrate(self, model=CALIBRATION_MODEL, sample=None):
+        """Time ``model`` on a short sample (loading is excluded) and cache the RTF."""
+        if sample is None:
+            sample = synthetic_sample()
+        whisper_model = self.load_model(model)
+        with self.transcribe_lock:
+            started = time.perf_counter()
+            whisper_model.transcribe(sample, language="en")
+            elapsed = time.perf_counter() - started
+        self.record(model, len(sample) / SAMPLE_RATE, elapsed)
+        return self.measured()[model]
+
+    def ensure_calibrated(self, sample=None):
+        """Benchmark once per host so there is at least one measured RTF."""
+        if not self.measured():
+            print(f"  > Calibrating Whisper speed on this host ({CALIBRATION_MODEL}, "
+                  f"{CALIBRATION_SECONDS}s sample)...")
+            rtf = self.calibrate(CALIBRATION_MODEL, sample)
+            print(f"  [OK] RTF {CALIBRATION_MODEL}: {rtf:.3f} (cached in {self.cache_path})")
+
+    # --- planning ---
+
+    def rtf(self, model):
+        """Measured RTF, or one extrapolated from the nearest measured model."""
+        measured = self.measured()
+        if model in measured:
+            return measured[model]
+        if not measured:
+            return None
+        ref = min(measured, key=lambda m: abs(MODEL_LADDER.index(m) - MODEL_LADDER.index(model)))
+        return measured[ref] * RELATIVE_SPEED[ref] / RELATIVE_SPEED[model]
+
+    def predict(self, model, audio_seconds):
+        rtf = self.rtf(model)
+        return None if rtf is None else rtf * padded_seconds(audio_seconds)
+
+    def choose(self, audio_seconds, deadline):
+        """Largest candidate predicted to finish within the deadline, else the smallest."""
+        budget = deadline * SAFETY_MARGIN
+        for model in reversed(self.candidates):
+            predicted = self.predict(model, audio_seconds)
+            if predicted is not None and predicted <= budget:
+                return model, predicted
+        model = self.candidates[0]
+        return model, self.predict(model, audio_seconds)
+
+    def smaller(self, model):
+        """Next smaller candidate, or None if ``model`` is already the smallest."""
+        if model not in self.candidates:
+            return None
+        i = self.candidates.index(model)
+        return self.candidates[i - 1] if i > 0 else None
+
+    def behind_schedule(self, model, elapsed, remaining_audio, deadline):
+        """True if finishing the remaining audio with ``model`` would miss the deadline."""
+        predicted = self.predict(model, remaining_audio)
+        return predicted is not None and elapsed + predicted > deadline * SAFETY_MARGIN
+
+
+def main():
+    sys.path.insert(0, str(Path(__file__).resolve().parent))
+    from pipeline_core import _whisper_lock, load_whisper_model
+
+    scheduler = ModelScheduler(load_whisper_model, _whisper_lock, candidates=MODEL_LADDER)
+
+    if len(sys.argv) >= 2 and sys.argv[1] == "--calibrate":
+        for model in sys.argv[2:] or [CALIBRATION_MODEL]:
+            if model not in MODEL_LADDER:
+                print(f"Unknown model: {model} (choose from {', '.join(MODEL_LADDER)})")
+                sys.exit(1)
+            print(f"Calibrating {model}...")
+            print(f"  [OK] RTF {model}: {scheduler.calibrate(model):.3f}")
+    elif len(sys.argv) == 4 and sys.argv[1] == "--plan":
+        try:
+            audio_seconds, deadline = float(sys.argv[2]), float(sys.argv[3])
+        except ValueError:
+            print(f"Not a number of seconds: {sys.argv[2]!r} / {sys.argv[3]!r}")
+            sys.exit(1)
+        if audio_seconds <= 0 or deadline <= 0:
+            print("Audio length and deadline must be positive")
+            sys.exit(1)
+        scheduler.ensure_calibrated()
+        model, predicted = scheduler.choose(audio_seconds, deadline)
+        print(f"Model: {model} (predicted {predicted:.0f}s for {audio_seconds:.0f}s audio, "
+              f"deadline {deadline:.0f}s)")
+        return
+    elif len(sys.argv) != 1:
+        print("Usage:")
+        print("  python model_scheduler.py")
+        print("  python model_scheduler.py --calibrate [models...]")
+        print("  python model_scheduler.py --plan <audio_seconds> <deadline_seconds>")
+        sys.exit(1)
+
+    print(f"Host: {scheduler.host}")
+    for model in MODEL_LADDER:
+        rtf = scheduler.rtf(model)
+        source = "measured" if model in scheduler.measured() else "extrapolated"
+        print(f"  {model:<7} {'-' if rtf is None else f'{rtf:.3f}':>7}  {source if rtf else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1017 @@
+#!/usr/bin/env python3
+"""
+Shared Video Analysis Pipeline Engine
+
+One engine for every supported platform. Platform differences (keyframe
+interval, video ID format, digest header, metadata fields) live in
+PlatformProfile entries; the profile is picked automatically from the URL.
+
+Used by:
+    youtube-pipeline/process-video.py   (thin wrapper, YouTube profile)
+    tiktok-pipeline/process-video.py    (thin wrapper, TikTok profile)
+    video-pipeline/process-batch.py     (mixed-platform batch runs)
+
+Pipeline steps:
+    1. yt-dlp downloads video + metadata JSON
+    2. FFmpeg extracts audio.wav (16kHz mono)
+    3. FFmpeg extracts keyframes at the profile's interval
+    4. Whisper transcribes audio -> transcript.txt
+    5. Digest.txt (+ digest.jsonl) syncs keyframes to transcript segments
+    6. metadata.json captures URL, creator, stats, processing info
+    7. index.json updated at root
+"""
+
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable
+
+from digest_index import DigestWriter
+from model_scheduler import ModelScheduler, read_wav_sample
+from segment_store import SEGMENTS_FILE, SegmentStore
+
+# Fix Windows console encoding for emoji/Unicode in video titles
+if sys.platform == "win32":
+    sys.stdout.reconfigure(encoding="utf-8", errors="replace")
+    sys.stderr.reconfigure(encoding="utf-8", errors="replace")
+
+# === CONFIGURATION ===
+# Override these with environment variables or edit directly
+YTDLP = os.environ.get("YTDLP_PATH", "yt-dlp")
+WHISPER_MODEL = "base"
+PIPELINE_VERSION = "1.1"
+STREAM_WINDOW_SECONDS = 30  # Whisper's native context length
+AUDIO_SAMPLE_RATE = 16000
+
+
+@dataclass(frozen=True)
+class PlatformProfile:
+    """Everything that differs between platforms."""
+    name: str                     # "youtube", "tiktok"
+    label: str                    # Banner / digest heading, e.g. "YOUTUBE"
+    hosts: tuple                  # URL host suffixes that select this profile
+    output_env: str               # Env var overriding the output directory
+    keyframe_interval: int        # Seconds between keyframes
+    extract_video_id: Callable    # url -> video_id
+    digest_byline: Callable       # info -> second header line of digest.txt
+    metadata_fields: Callable     # info -> platform-specific metadata.json fields
+
+    @property
+    def base_dir(self):
+        return Path(os.environ.get(self.output_env, "./output"))
+
+
+def run_cmd(cmd, desc="", check=True, capture=True):
+    """Run a shell command with error handling."""
+    print(f"  > {desc}" if desc else f"  > {cmd[0]}")
+    result = subprocess.run(
+        cmd, capture_output=capture, text=True,
+        check=False, encoding="utf-8", errors="replace"
+    )
+    if check and result.returncode != 0:
+        print(f"  [FAIL] (exit {result.returncode})")
+        if result.stderr:
+            print(f"    stderr: {result.stderr[:500]}")
+        raise RuntimeError(f"Command failed: {' '.join(cmd[:3])}...")
+    return result
+
+
+def format_duration(seconds):
+    """Format seconds into H:MM:SS or M:SS string."""
+    seconds = int(seconds)
+    if seconds >= 3600:
+        h = seconds // 3600
+        m = (seconds % 3600) // 60
+        s = seconds % 60
+        return f"{h}:{m:02d}:{s:02d}"
+    else:
+        m = seconds // 60
+        s = seconds % 60
+        return f"{m}:{s:02d}"
+
+
+# === PLATFORM PROFILES ===
+
+def _youtube_video_id(url):
+    """Extract YouTube video ID from various URL formats."""
+    patterns = [
+        r'(?:v=|/v/|youtu\.be/)([a-zA-Z0-9_-]{11})',
+        r'(?:embed/)([a-zA-Z0-9_-]{11})',
+        r'(?:shorts/)([a-zA-Z0-9_-]{11})',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    raise ValueError(f"Cannot extract video ID from URL: {url}")
+
+
+def _youtube_byline(info):
+    channel = info.get("channel", info.get("uploader", "Unknown"))
+    duration = info.get("duration", 0)
+    language = info.get("language", "en") or "en"
+    lang_display = "English" if language.startswith("en") else language
+    return f"Channel: {channel} | Duration: {format_duration(duration)} | Language: {lang_display}"
+
+
+def _youtube_metadata(info):
+    upload_date_raw = info.get("upload_date", "")
+    if upload_date_raw and len(upload_date_raw) == 8:
+        upload_date = f"{upload_date_raw[:4]}-{upload_date_raw[4:6]}-{upload_date_raw[6:8]}"
+    else:
+        upload_date = upload_date_raw
+
+    return {
+        "channel_name": info.get("channel", info.get("uploader", "")),
+        "channel_id": info.get("channel_id", ""),
+        "channel_url": info.get("channel_url", info.get("uploader_url", "")),
+        "upload_date": upload_date,
+        "language": info.get("language", "en") or "en",
+        "subscriber_count": info.get("channel_follower_count", 0),
+        "tags": info.get("tags", [])[:20],
+        "categories": info.get("categories", []),
+    }
+
+
+def _tiktok_video_id(url):
+    """Extract TikTok video ID from URL."""
+    match = re.search(r'/video/(\d+)', url)
+    if match:
+        return match.group(1)
+    # Short URL or other format -- try trailing digits
+    match = re.search(r'(\d{15,25})', url)
+    if match:
+        return match.group(1)
+    raise ValueError(f"Cannot extract video ID from URL: {url}")
+
+
+def _tiktok_creator(info, default=""):
+    return info.get("creator", info.get("uploader", info.get("channel", default)))
+
+
+def _tiktok_byline(info):
+    return f"Creator: {_tiktok_creator(info, 'Unknown')} | Duration: {format_duration(info.get('duration', 0))}"
+
+
+def _tiktok_metadata(info):
+    return {"creator": _tiktok_creator(info)}
+
+
+YOUTUBE = PlatformProfile(
+    name="youtube",
+    label="YOUTUBE",
+    hosts=("youtube.com", "youtu.be", "youtube-nocookie.com"),
+    output_env="YOUTUBE_OUTPUT_DIR",
+    keyframe_interval=15,  # YouTube videos are longer than TikTok
+    extract_video_id=_youtube_video_id,
+    digest_byline=_youtube_byline,
+    metadata_fields=_youtube_metadata,
+)
+
+TIKTOK = PlatformProfile(
+    name="tiktok",
+    label="TIKTOK",
+    hosts=("tiktok.com",),
+    output_env="TIKTOK_OUTPUT_DIR",
+    keyframe_interval=3,  # TikTok videos are short
+    extract_video_id=_tiktok_video_id,
+    digest_byline=_tiktok_byline,
+    metadata_fields=_tiktok_metadata,
+)
+
+PROFILES = (YOUTUBE, TIKTOK)
+
+
+def profile_for_url(url):
+    """Pick the platform profile for a URL from its host."""
+    match = re.match(r'^(?:[a-z]+://)?([^/?#]+)', url.strip(), re.IGNORECASE)
+    host = (match.group(1) if match else "").lower().split(":")[0]
+    for profile in PROFILES:
+        for suffix in profile.hosts:
+            if host == suffix or host.endswith("." + suffix):
+                return profile
+    raise ValueError(f"No platform profile for URL: {url}")
+
+
+# === PIPELINE STEPS ===
+
+def step_download(url, video_dir, video_id):
+    """Step 1: Download video and metadata with yt-dlp."""
+    print("\n[1/5] Downloading video...")
+    video_path = video_dir / "video.mp4"
+    info_path = video_dir / "info.json"
+
+    run_cmd([
+        YTDLP,
+        "-f", "bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best",
+        "--merge-output-format", "mp4",
+        "--write-info-json",
+        "-o", str(video_path),
+        url
+    ], desc="Downloading with yt-dlp")
+
+    # yt-dlp writes info as video.info.json
+    ytdlp_info_path = video_dir / "video.info.json"
+    if ytdlp_info_path.exists():
+        ytdlp_info_path.replace(info_path)
+
+    if not video_path.exists():
+        raise FileNotFoundError(f"Video not downloaded to {video_path}")
+
+    # Parse info JSON
+    info = {}
+    if info_path.exists():
+        with open(info_path, "r", encoding="utf-8") as f:
+            info = json.load(f)
+
+    print(f"  [OK] Downloaded: {video_path.name} ({video_path.stat().st_size / 1024 / 1024:.1f} MB)")
+    return info
+
+
+def step_extract_audio(video_dir):
+    """Step 2: Extract audio as 16kHz mono WAV."""
+    print("\n[2/5] Extracting audio...")
+    video_path = video_dir / "video.mp4"
+    audio_path = video_dir / "audio.wav"
+
+    run_cmd([
+        "ffmpeg", "-y", "-i", str(video_path),
+        "-vn", "-acodec", "pcm_s16le", "-ar", "16000", "-ac", "1",
+        str(audio_path)
+    ], desc="Extracting audio (16kHz mono WAV)")
+
+    print(f"  [OK] Audio: {audio_path.name} ({audio_path.stat().st_size / 1024 / 1024:.1f} MB)")
+    return audio_path
+
+
+def step_extract_keyframes(video_dir, duration, interval):
+    """Step 3: Extract keyframes every ``interval`` seconds."""
+    print(f"\n[3/5] Extracting keyframes (every {interval}s)...")
+    video_path = video_dir / "video.mp4"
+    keyframes_dir = video_dir / "keyframes"
+    keyframes_dir.mkdir(exist_ok=True)
+
+    run_cmd([
+        "ffmpeg", "-y", "-i", str(video_path),
+        "-vf", f"fps=1/{interval}",
+        str(keyframes_dir / "frame_%03ds.png")
+    ], desc=f"Extracting keyframes at 1/{interval} fps")
+
+    # Rename frames: ffmpeg numbers sequentially (001, 002, ...), we want timestamps
+    frames = sorted(keyframes_dir.glob("frame_*.png"))
+    renamed = []
+    for i, frame in enumerate(frames):
+        timestamp = i * interval
+        new_name = f"frame_{timestamp:03d}s.png"
+        new_path = keyframes_dir / new_name
+        if frame.name != new_name:
+            frame.replace(new_path)
+        renamed.append(new_path)
+
+    print(f"  [OK] Keyframes: {len(renamed)} frames extracted")
+    return renamed
+
+
+_whisper_models = {}
+_whisper_lock = threading.Lock()
+
+
+def load_whisper_model(name=WHISPER_MODEL):
+    """Load a Whisper model once per process and keep it warm for later videos."""
+    with _whisper_lock:
+        if name not in _whisper_models:
+            import whisper
+            _whisper_models[name] = whisper.load_model(name)
+        return _whisper_models[name]
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Process-wide ModelScheduler sharing the warm models and transcription lock."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = ModelScheduler(load_whisper_model, _whisper_lock)
+        return _scheduler
+
+
+def plan_transcription(audio_seconds, deadline=None, sample=None):
+    """Pick the Whisper model for a job.
+
+    Without a deadline this is always WHISPER_MODEL. With one, the scheduler
+    calibrates this host's real-time factor if it has never been measured
+    (on ``sample`` when given) and picks the largest model predicted to fit.
+    Returns (model_name, predicted_seconds or None).
+    """
+    scheduler = get_scheduler()
+    if deadline is not None and audio_seconds <= 0:
+        print("  > Audio duration unknown -- ignoring deadline")
+        deadline = None
+    if deadline is None:
+        model = WHISPER_MODEL
+        predicted = scheduler.predict(model, audio_seconds)
+    else:
+        scheduler.ensure_calibrated(sample)
+        model, predicted = scheduler.choose(audio_seconds, deadline)
+
+    line = f"  > Model: {model}"
+    if predicted is not None:
+        line += f" (predicted {predicted:.0f}s for {format_duration(audio_seconds)} of audio"
+        line += f", deadline {deadline:.0f}s)" if deadline is not None else ")"
+    print(line)
+    return model, predicted
+
+
+def _transcription_record(models_used, deadline, predicted, actual):
+    """Transcription facts recorded in metadata.json."""
+    return {
+        "model": models_used[-1],
+        "models_used": models_used,
+        "deadline_seconds": deadline,
+        "predicted_seconds": None if predicted is None else round(predicted, 1),
+        "actual_seconds": round(actual, 1),
+    }
+
+
+def step_transcribe(video_dir, deadline=None):
+    """Step 4: Transcribe audio with Whisper.
+
+    Returns (segments, transcription) where ``transcription`` records the
+    model used and predicted vs actual time.
+    """
+    print("\n[4/5] Transcribing with Whisper...")
+    audio_path = video_dir / "audio.wav"
+    transcript_path = video_dir / "transcript.txt"
+
+    with wave.open(str(audio_path), "rb") as wav:
+        audio_seconds = wav.getnframes() / wav.getframerate()
+    sample = read_wav_sample(audio_path) if deadline is not None else None
+    model_name, predicted = plan_transcription(audio_seconds, deadline, sample)
+
+    model = load_whisper_model(model_name)
+    # One shared model instance: transcriptions run one at a time
+    with _whisper_lock:
+        started = time.perf_counter()
+        result = model.transcribe(str(audio_path), language="en")
+        actual = time.perf_counter() - started
+    get_scheduler().record(model_name, audio_seconds, actual)
+
+    # Keep only start/end/text in flat arrays; drop Whisper's per-segment dicts
+    segments = SegmentStore.from_whisper(result.get("segments", []))
+    del result
+    _write_transcript(transcript_path, segments)
+    segments.save(video_dir / SEGMENTS_FILE)
+
+    print(f"  [OK] Transcript: {len(segments)} segments -> {transcript_path.name} "
+          f"({actual:.0f}s with {model_name})")
+    return segments, _transcription_record([model_name], deadline, predicted, actual)
+
+
+def _write_transcript(transcript_path, segments):
+    lines = []
+    for start, end, text in segments:
+        lines.append(f"[{start:.1f}s - {end:.1f}s] {text}")
+
+    with open(transcript_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+
+
+def _read_exact(stream, size):
+    """Read up to ``size`` bytes, only returning short at EOF."""
+    chunks = []
+    remaining = size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def step_stream_transcribe(url, video_dir, deadline=None):
+    """Steps 2+4 (streaming): transcribe the audio stream while it downloads.
+
+    yt-dlp resolves the audio-only stream, then FFmpeg reads it straight from
+    the server (HTTP range requests cope with MP4s whose index is at the end)
+    and decodes it to 16kHz mono PCM on stdout. Every STREAM_WINDOW_SECONDS of
+    PCM is handed to Whisper as soon as it arrives, and appended to audio.wav.
+
+    With a deadline, the model is planned on the first window and, whenever
+    the remaining audio is projected to overrun, later windows fall back to
+    the next smaller model. Returns (segments, transcription) like
+    step_transcribe(), or None when yt-dlp resolves no direct audio URL (only
+    a merged or fragmented format) and the caller must transcribe the download.
+    """
+    print(f"\n[4/5] Streaming transcription with Whisper ({STREAM_WINDOW_SECONDS}s windows)...")
+    import numpy as np
+
+    audio_path = video_dir / "audio.wav"
+    transcript_path = video_dir / "transcript.txt"
+    scheduler = get_scheduler()
+    window_bytes = STREAM_WINDOW_SECONDS * AUDIO_SAMPLE_RATE * 2  # s16le mono
+
+    r = run_cmd([YTDLP, "-f", "bestaudio/best", "-J", "--no-playlist", url],
+                desc="Resolving audio stream")
+    stream_info = json.loads(r.stdout)
+    media_url = stream_info.get("url")
+    if not media_url:
+        print("  > No direct audio URL -- transcribing after the download instead")
+        return None
+    audio_seconds = stream_info.get("duration") or 0
+    headers = "".join(f"{k}: {v}\r\n" for k, v in (stream_info.get("http_headers") or {}).items())
+
+    cmd = ["ffmpeg", "-loglevel", "error"]
+    if headers:
+        cmd += ["-headers", headers]
+    cmd += ["-i", media_url, "-vn", "-f", "s16le", "-acodec", "pcm_s16le",
+            "-ar", str(AUDIO_SAMPLE_RATE), "-ac", "1", "pipe:1"]
+    ffmpeg_err = tempfile.TemporaryFile()
+    print("  > Streaming audio with ffmpeg")
+    ffmpeg = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=ffmpeg_err)
+
+    segments = SegmentStore()
+    offset = 0.0
+    window_num = 0
+    model_name = None
+    models_used = []
+    predicted = None
+    compute_seconds = 0.0  # Whisper time only; waiting on the download isn't the model's fault
+    try:
+        with wave.open(str(audio_path), "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(AUDIO_SAMPLE_RATE)
+            while True:
+                chunk = _read_exact(ffmpeg.stdout, window_bytes)
+                if not chunk:
+                    break
+                wav.writeframes(chunk)
+                window_num += 1
+                samples = np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0
+                window_seconds = len(samples) / AUDIO_SAMPLE_RATE
+
+                if model_name is None:
+                    model_name, predicted = plan_transcription(audio_seconds, deadline, samples)
+                    models_used.append(model_name)
+                elif deadline is not None and audio_seconds > 0 and scheduler.behind_schedule(
+                        model_name, compute_seconds, max(audio_seconds - offset, 0), deadline):
+                    fallback = scheduler.smaller(model_name)
+                    if fallback:
+                        print(f"  > Behind schedule at {offset:.0f}s -- falling back to {fallback}")
+                        model_name = fallback
+                        models_used.append(model_name)
+                model = load_whisper_model(model_name)
+
+                # Carry the previous window's text as a prompt so sentences
+                # split across a window boundary still decode coherently
+                prompt = segments[-1].text if segments else None
+                with _whisper_lock:
+                    window_started = time.perf_counter()
+                    result = model.transcribe(samples, language="en", initial_prompt=prompt)
+                    window_elapsed = time.perf_counter() - window_started
+                compute_seconds += window_elapsed
+                # record() counts a short final window as the 30s Whisper pads it to
+                scheduler.record(model_name, window_seconds, window_elapsed)
+                window_segments = result.get("segments", [])
+                for seg in window_segments:
+                    segments.append(
+                        offset + seg["start"],
+                        min(offset + seg["end"], offset + window_seconds),
+                        seg["text"],
+                    )
+                print(f"  > Window {window_num} ({offset:.0f}s-{offset + window_seconds:.0f}s): "
+                      f"{len(window_segments)} segments")
+                offset += window_seconds
+    finally:
+        ffmpeg.stdout.close()
+        ffmpeg.wait()
+
+    ffmpeg_err.seek(0)
+    stderr = ffmpeg_err.read().decode("utf-8", errors="replace")
+    ffmpeg_err.close()
+    # FFmpeg can exit 0 after a demux error, so no audio at all is also a failure
+    if ffmpeg.returncode != 0 or window_num == 0:
+        print(f"  [FAIL] ffmpeg (exit {ffmpeg.returncode}, {offset:.0f}s decoded)")
+        if stderr:
+            print(f"    stderr: {stderr[:500]}")
+        raise RuntimeError(f"Streaming audio failed for {url}")
+
+    _write_transcript(transcript_path, segments)
+    segments.save(video_dir / SEGMENTS_FILE)
+    print(f"  [OK] Audio: {audio_path.name} ({offset:.0f}s streamed)")
+    print(f"  [OK] Transcript: {len(segments)} segments -> {transcript_path.name} "
+          f"({compute_seconds:.0f}s with {', '.join(models_used)})")
+    return segments, _transcription_record(models_used, deadline, predicted, compute_seconds)
+
+
+def step_build_digest(video_dir, video_id, info, segments, keyframes, profile):
+    """Step 5: Build digest.txt syncing keyframes to transcript."""
+    print("\n[5/5] Building digest...")
+    digest_path = video_dir / "digest.txt"
+    interval = profile.keyframe_interval
+
+    title = info.get("title", "Unknown")
+    duration = info.get("duration", 0)
+
+    lines = []
+    lines.append(f"{profile.label} VIDEO DIGEST -- {video_id}")
+    lines.append(f"Title: {title}")
+    lines.append(profile.digest_byline(info))
+    lines.append("=" * 80)
+    lines.append("")
+
+    # Map transcript segments to keyframe windows by midpoint (one pass)
+    windows = [[] for _ in keyframes]
+    for j in range(len(segments)):
+        seg_mid = (segments.starts[j] + segments.ends[j]) / 2
+        i = int(seg_mid // interval)
+        if 0 <= i < len(windows) and seg_mid < min((i + 1) * interval, int(duration)):
+            windows[i].append(j)
+
+    with DigestWriter(video_dir) as structured:
+        for i in range(len(keyframes)):
+            ts_start = i * interval
+            ts_end = min((i + 1) * interval, int(duration))
+            frame_name = f"frame_{ts_start:03d}s"
+
+            # Gather transcript text that falls within this keyframe window
+            frame_text_parts = [segments.text_at(j) for j in windows[i]]
+
+            combined = " ".join(frame_text_parts)
+            structured.add(f"keyframes/{frame_name}.png", ts_start, ts_end, combined)
+
+            lines.append(f"[{frame_name}.png] {ts_start}s-{ts_end}s")
+            if frame_text_parts:
+                # Word-wrap at ~76 chars with 2-space indent
+                wrapped = _wrap_text(combined, width=76, indent="  ")
+                lines.append(wrapped)
+            lines.append("")
+
+    with open(digest_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines))
+
+    print(f"  [OK] Digest: {digest_path.name} (+ {structured.jsonl_path.name}, {structured.count} windows)")
+    return digest_path
+
+
+def _wrap_text(text, width=76, indent="  "):
+    """Simple word-wrap with indent."""
+    words = text.split()
+    lines = []
+    current = indent
+    for word in words:
+        if len(current) + len(word) + 1 > width + len(indent):
+            lines.append(current)
+            current = indent + word
+        else:
+            if current == indent:
+                current += word
+            else:
+                current += " " + word
+    if current.strip():
+        lines.append(current)
+    return "\n".join(lines)
+
+
+def build_metadata(video_dir, video_id, alias, info, keyframes, segments, profile,
+                   transcription=None):
+    """Build metadata.json for the video."""
+    duration = info.get("duration", 0)
+
+    metadata = {
+        "video_id": video_id,
+        "platform": profile.name,
+        "alias": alias,
+        "url": info.get("webpage_url", info.get("original_url", "")),
+        "title": info.get("title", ""),
+        "description": (info.get("description", "") or "")[:500],
+        "duration_seconds": int(duration),
+        "duration_string": format_duration(duration),
+        "resolution": f"{info.get('width', '?')}x{info.get('height', '?')}",
+        "view_count": info.get("view_count", 0),
+        "like_count": info.get("like_count", 0),
+        "comment_count": info.get("comment_count", 0),
+    }
+    metadata.update(profile.metadata_fields(info))
+    metadata.update({
+        "keyframe_count": len(keyframes),
+        "keyframe_interval_seconds": profile.keyframe_interval,
+        "transcript_segments": len(segments),
+        "date_processed": datetime.now().strftime("%Y-%m-%d"),
+        "whisper_model": transcription["model"] if transcription else WHISPER_MODEL,
+    })
+    if transcription:
+        metadata.update({
+            "whisper_models_used": transcription["models_used"],
+            "transcription_deadline_seconds": transcription["deadline_seconds"],
+            "transcription_predicted_seconds": transcription["predicted_seconds"],
+            "transcription_actual_seconds": transcription["actual_seconds"],
+        })
+    metadata["pipeline_version"] = PIPELINE_VERSION
+
+    meta_path = video_dir / "metadata.json"
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(metadata, f, indent=2, ensure_ascii=False)
+
+    print(f"  [OK] Metadata: {meta_path.name}")
+    return metadata
+
+
+_index_lock = threading.Lock()
+
+
+def update_index(base_dir, video_id, metadata):
+    """Update root index.json with new video entry."""
+    index_path = base_dir / "index.json"
+
+    # Batch runs finish videos concurrently; serialise the read-modify-write
+    with _index_lock:
+        if index_path.exists():
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        else:
+            index = {
+                "manifest_version": "1.0",
+                "last_updated": "",
+                "total_videos": 0,
+                "videos": []
+            }
+
+        # Remove existing entry for this video_id if re-processing
+        index["videos"] = [v for v in index["videos"] if v["video_id"] != video_id]
+
+        index["videos"].append({
+            "video_id": video_id,
+            "platform": metadata["platform"],
+            "alias": metadata["alias"],
+            "url": metadata["url"],
+            "creator": metadata.get("creator", metadata.get("channel_name", "")),
+            "title": metadata["title"],
+            "duration_seconds": metadata["duration_seconds"],
+            "date_processed": metadata["date_processed"],
+            "path": f"{video_id}/"
+        })
+
+        index["total_videos"] = len(index["videos"])
+        index["last_updated"] = datetime.now().strftime("%Y-%m-%d")
+
+        with open(index_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+
+    print(f"  [OK] Index updated: {index['total_videos']} videos total")
+
+
+def cleanup_info_json(video_dir):
+    """Remove the large yt-dlp info.json after metadata is extracted."""
+    info_path = video_dir / "info.json"
+    if info_path.exists():
+        info_path.unlink()
+        print("  [OK] Cleaned up info.json")
+
+
+# === ORCHESTRATION ===
+
+def prepare_video(url, alias=None, profile=None):
+    """Download-bound half of the pipeline: download, audio and keyframes.
+
+    Returns a job dict consumed by finish_video().
+    """
+    profile = profile or profile_for_url(url)
+    print(f"\n{'='*60}")
+    print(f"{profile.label} VIDEO ANALYSIS PIPELINE v{PIPELINE_VERSION}")
+    print(f"{'='*60}")
+    print(f"URL: {url}")
+
+    # Extract video ID
+    video_id = profile.extract_video_id(url)
+    print(f"Video ID: {video_id}")
+
+    # Create video directory
+    base_dir = profile.base_dir
+    video_dir = base_dir / video_id
+    video_dir.mkdir(parents=True, exist_ok=True)
+    (video_dir / "keyframes").mkdir(exist_ok=True)
+
+    # Step 1: Download
+    info = step_download(url, video_dir, video_id)
+    duration = info.get("duration", 0)
+    title = info.get("title", "Unknown")
+    print(f"  Title: {title}")
+    print(f"  Duration: {format_duration(duration)}")
+
+    # Auto-generate alias if not provided
+    if not alias:
+        alias = re.sub(r'[^a-z0-9]+', '-', title.lower())[:50].strip('-')
+    print(f"  Alias: {alias}")
+
+    # Step 2: Extract audio
+    step_extract_audio(video_dir)
+
+    # Step 3: Extract keyframes
+    keyframes = step_extract_keyframes(video_dir, duration, profile.keyframe_interval)
+
+    return {
+        "profile": profile,
+        "base_dir": base_dir,
+        "video_dir": video_dir,
+        "video_id": video_id,
+        "alias": alias,
+        "info": info,
+        "keyframes": keyframes,
+    }
+
+
+def finish_video(job, deadline=None):
+    """Whisper-bound half of the pipeline: transcribe, digest, metadata, index.
+
+    ``deadline`` (seconds) lets the scheduler pick a smaller Whisper model to
+    finish the transcription in time.
+    """
+    profile = job["profile"]
+    video_dir = job["video_dir"]
+    video_id = job["video_id"]
+
+    # Step 4: Transcribe
+    segments, transcription = step_transcribe(video_dir, deadline)
+
+    # Step 5: Build digest
+    step_build_digest(video_dir, video_id, job["info"], segments, job["keyframes"], profile)
+
+    # Build metadata
+    metadata = build_metadata(
+        video_dir, video_id, job["alias"], job["info"], job["keyframes"], segments, profile,
+        transcription,
+    )
+
+    # Update index
+    update_index(job["base_dir"], video_id, metadata)
+
+    # Cleanup
+    cleanup_info_json(video_dir)
+
+    print(f"\n{'='*60}")
+    print(f"COMPLETE -- {video_id} ({job['alias']})")
+    print(f"Output: {video_dir}")
+    print(f"{'='*60}")
+
+    return video_id, metadata
+
+
+def process_video(url, alias=None, profile=None, deadline=None):
+    """Full pipeline: download -> extract -> transcribe -> digest -> index."""
+    return finish_video(prepare_video(url, alias, profile), deadline)
+
+
+def process_video_streaming(url, alias=None, profile=None, deadline=None):
+    """Full pipeline with download and transcription overlapped.
+
+    The audio stream is transcribed window-by-window as it downloads while the
+    full video is fetched (and its keyframes extracted) on a second thread, so
+    end-to-end time approaches max(download, transcribe) instead of the sum.
+    """
+    profile = profile or profile_for_url(url)
+    print(f"\n{'='*60}")
+    print(f"{profile.label} VIDEO ANALYSIS PIPELINE v{PIPELINE_VERSION} (streaming)")
+    print(f"{'='*60}")
+    print(f"URL: {url}")
+    started = time.perf_counter()
+
+    # Extract video ID
+    video_id = profile.extract_video_id(url)
+    print(f"Video ID: {video_id}")
+
+    # Create video directory
+    base_dir = profile.base_dir
+    video_dir = base_dir / video_id
+    video_dir.mkdir(parents=True, exist_ok=True)
+    (video_dir / "keyframes").mkdir(exist_ok=True)
+
+    # Steps 1+3 in the background: full video download, then keyframes
+    video_side = {}
+
+    def fetch_video():
+        try:
+            info = step_download(url, video_dir, video_id)
+            video_side["info"] = info
+            video_side["keyframes"] = step_extract_keyframes(
+                video_dir, info.get("duration", 0), profile.keyframe_interval
+            )
+        except Exception as e:
+            video_side["error"] = e
+
+    video_thread = threading.Thread(target=fetch_video, name=f"video-{video_id}")
+    video_thread.start()
+
+    # Steps 2+4 in the foreground: audio stream -> Whisper
+    try:
+        streamed = step_stream_transcribe(url, video_dir, deadline)
+    finally:
+        video_thread.join()
+    if "error" in video_side:
+        raise video_side["error"]
+    if streamed is None:
+        # Nothing to stream: fall back to the download, as process_video() does
+        step_extract_audio(video_dir)
+        streamed = step_transcribe(video_dir, deadline)
+    segments, transcription = streamed
+
+    info = video_side["info"]
+    title = info.get("title", "Unknown")
+    print(f"  Title: {title}")
+    print(f"  Duration: {format_duration(info.get('duration', 0))}")
+
+    # Auto-generate alias if not provided
+    if not alias:
+        alias = re.sub(r'[^a-z0-9]+', '-', title.lower())[:50].strip('-')
+    print(f"  Alias: {alias}")
+
+    keyframes = video_side["keyframes"]
+
+    # Step 5: Build digest
+    step_build_digest(video_dir, video_id, info, segments, keyframes, profile)
+
+    # Build metadata
+    metadata = build_metadata(
+        video_dir, video_id, alias, info, keyframes, segments, profile, transcription
+    )
+
+    # Update index
+    update_index(base_dir, video_id, metadata)
+
+    # Cleanup
+    cleanup_info_json(video_dir)
+
+    print(f"\n{'='*60}")
+    print(f"COMPLETE -- {video_id} ({alias}) in {time.perf_counter() - started:.0f}s")
+    print(f"Output: {video_dir}")
+    print(f"{'='*60}")
+
+    return video_id, metadata
+
+
+def process_batch(urls, workers=3, stream=False, deadline=None):
+    """Process a (possibly mixed-platform) list of URLs in one run.
+
+    Downloads and FFmpeg extraction run on a pool of ``workers`` threads;
+    transcription runs on a single worker that reuses one warm Whisper model,
+    so the GPU/CPU is never shared between two transcriptions.
+
+    With ``stream=True`` each worker runs process_video_streaming(); the warm
+    model is still shared, one Whisper window at a time. ``deadline`` is a
+    per-video transcription time budget in seconds.
+
+    ``urls`` is a list of URLs or (url, alias) pairs. Returns a list of
+    (url, video_id, error) tuples in input order.
+    """
+    entries = [(u, None) if isinstance(u, str) else tuple(u) for u in urls]
+    results = [None] * len(entries)
+
+    if stream:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+            for i, (url, alias) in enumerate(entries):
+                try:
+                    profile = profile_for_url(url)
+                except ValueError as e:
+                    results[i] = (url, None, str(e))
+                    continue
+                futures[pool.submit(process_video_streaming, url, alias, profile, deadline)] = i
+            for fut in as_completed(futures):
+                i = futures[fut]
+                try:
+                    video_id, _ = fut.result()
+                    results[i] = (entries[i][0], video_id, None)
+                except Exception as e:
+                    results[i] = (entries[i][0], None, str(e))
+        return results
+
+    with ThreadPoolExecutor(max_workers=workers) as prep_pool, \
+            ThreadPoolExecutor(max_workers=1) as whisper_pool:
+        prep_futures = {}
+        for i, (url, alias) in enumerate(entries):
+            try:
+                profile = profile_for_url(url)
+            except ValueError as e:
+                results[i] = (url, None, str(e))
+                continue
+            prep_futures[prep_pool.submit(prepare_video, url, alias, profile)] = i
+
+        finish_futures = {}
+        for fut in as_completed(prep_futures):
+            i = prep_futures[fut]
+            try:
+                job = fut.result()
+            except Exception as e:
+                results[i] = (entries[i][0], None, str(e))
+                continue
+            finish_futures[whisper_pool.submit(finish_video, job, deadline)] = i
+
+        for fut in as_completed(finish_futures):
+            i = finish_futures[fut]
+            try:
+                video_id, _ = fut.result()
+                results[i] = (entries[i][0], video_id, None)
+            except Exception as e:
+                results[i] = (entries[i][0], None, str(e))
+
+    return results
+
+
+def test_tools(label="VIDEO"):
+    """Verify all pipeline tools are available and working."""
+    print(f"\n{'='*60}")
+    print(f"{label} PIPELINE -- TOOL VERIFICATION")
+    print(f"{'='*60}")
+
+    all_ok = True
+
+    # 1. yt-dlp
+    print("\n[1/3] yt-dlp...")
+    try:
+        r = run_cmd([YTDLP, "--version"], desc="Checking version")
+        ver = r.stdout.strip()
+        print(f"  [OK] yt-dlp {ver}")
+    except Exception as e:
+        print(f"  [FAIL] yt-dlp FAILED: {e}")
+        all_ok = False
+
+    # 2. ffmpeg
+    print("\n[2/3] ffmpeg...")
+    try:
+        r = run_cmd(["ffmpeg", "-version"], desc="Checking version")
+        ver_line = r.stdout.split("\n")[0] if r.stdout else "unknown"
+        print(f"  [OK] {ver_line}")
+    except Exception as e:
+        print(f"  [FAIL] ffmpeg FAILED: {e}")
+        all_ok = False
+
+    # 3. whisper
+    print("\n[3/3] Whisper...")
+    try:
+        import whisper  # noqa: F401
+        print(f"  [OK] whisper module loaded (model: {WHISPER_MODEL})")
+    except ImportError as e:
+        print(f"  [FAIL] whisper FAILED: {e}")
+        all_ok = False
+
+    # Summary
+    print(f"\n{'='*60}")
+    if all_ok:
+        print("ALL TOOLS VERIFIED -- Pipeline ready.")
+    else:
+        print("SOME TOOLS FAILED -- Fix issues above before processing.")
+    print(f"{'='*60}")
+
+    return all_ok
+
+
+def single_video_main(profile):
+    """CLI entry point shared by the per-platform process-video.py wrappers."""
+    url_hint = f"<{profile.name}_url>"
+    if len(sys.argv) < 2:
+        print("Usage:")
+        print(f"  python process-video.py {url_hint} [--alias <name>] [--stream] [--deadline <seconds>]")
+        print("  python process-video.py --test")
+        sys.exit(1)
+
+    if sys.argv[1] == "--test":
+        ok = test_tools(profile.label)
+        sys.exit(0 if ok else 1)
+
+    url = sys.argv[1]
+    alias = None
+    if "--alias" in sys.argv:
+        idx = sys.argv.index("--alias")
+        if idx + 1 < len(sys.argv):
+            alias = sys.argv[idx + 1]
+
+    deadline = None
+    if "--deadline" in sys.argv:
+        idx = sys.argv.index("--deadline")
+        value = sys.argv[idx + 1] if idx + 1 < len(sys.argv) else ""
+        try:
+            deadline = float(value)
+        except ValueError:
+            deadline = 0
+        if not deadline > 0:
+            print(f"--deadline takes a positive number of seconds, not {value!r}")
+            sys.exit(1)
+
+    if "--stream" in sys.argv:
+        process_video_streaming(url, alias, profile, deadline)
+    else:
+        process_video(url, alias, profile, deadline)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Mixed-Platform Video Batch Runner
+
+Processes a list of TikTok and YouTube URLs in one run. Each URL's platform
+profile (keyframe interval, ID format, metadata fields) is picked from its
+host; downloads/extraction share one worker pool and every transcription
+reuses the same warm Whisper model.
+
+Usage:
+    python process-batch.py <url> [<url> ...] [--workers N] [--stream] [--deadline S]
+    python process-batch.py --file urls.txt [--workers N] [--stream] [--deadline S]
+    python process-batch.py --test
+
+URL file format: one URL per line, optionally followed by an alias.
+Blank lines and lines starting with # are ignored.
+
+    https://www.youtube.com/watch?v=dQw4w9WgXcQ  conference-keynote
+    https://www.tiktok.com/@user/video/1234567890123456789
+"""
+
+import argparse
+import sys
+
+import pipeline_core
+
+
+def read_url_file(path):
+    """Parse a URL list file into (url, alias) pairs."""
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.split(None, 1)
+            entries.append((parts[0], parts[1].strip() if len(parts) > 1 else None))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a mixed TikTok/YouTube URL list.")
+    parser.add_argument("urls", nargs="*", help="Video URLs")
+    parser.add_argument("--file", help="Text file with one URL (and optional alias) per line")
+    parser.add_argument(
+        "--workers", type=int, default=3,
+        help="Concurrent download/extraction workers (default: 3)",
+    )
+    parser.add_argument(
+        "--stream", action="store_true",
+        help="Transcribe each video's audio while it is still downloading",
+    )
+    parser.add_argument(
+        "--deadline", type=float, default=None,
+        help="Per-video transcription budget in seconds; picks the Whisper model to fit",
+    )
+    parser.add_argument("--test", action="store_true", help="Verify all tools and exit")
+    args = parser.parse_args()
+
+    if args.deadline is not None and not args.deadline > 0:
+        parser.error("--deadline must be a positive number of seconds")
+
+    if args.test:
+        ok = pipeline_core.test_tools()
+        sys.exit(0 if ok else 1)
+
+    entries = [(url, None) for url in args.urls]
+    if args.file:
+        entries.extend(read_url_file(args.file))
+    if not entries:
+        parser.error("no URLs given")
+
+    results = pipeline_core.process_batch(
+        entries, workers=args.workers, stream=args.stream, deadline=args.deadline
+    )
+
+    print(f"\n{'='*60}")
+    print(f"BATCH COMPLETE -- {len(results)} URLs")
+    print(f"{'='*60}")
+    failed = 0
+    for url, video_id, error in results:
+        if error:
+            failed += 1
+            print(f"  [FAIL] {url}: {error}")
+        else:
+            print(f"  [OK] {video_id}  {url}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Compact, array-backed storage for Whisper transcript segments.
+
+Whisper returns one dict per segment (tokens, probabilities, seek offsets...).
+For multi-hour audio that is hundreds of thousands of Python objects kept
+alive until the digest is built. The pipeline converts them immediately into
+a SegmentStore: two float arrays (start/end), one UTF-8 text buffer and an
+offsets array -- four objects regardless of length.
+
+Persisted as segments.bin next to transcript.txt and memory-mapped on load:
+
+    magic "SEGSTOR1" | count (u64) | starts f64[count] | ends f64[count]
+    | offsets u64[count + 1] | text bytes
+
+Usage:
+    python segment_store.py <video_dir>          # print segments from segments.bin
+    python segment_store.py --measure [hours]    # memory per hour: dicts vs store
+
+Library:
+    from segment_store import SegmentStore
+    store = SegmentStore.load(video_dir / "segments.bin")
+    for start, end, text in store:
+        ...
+"""
+
+import mmap
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from pathlib import Path
+
+SEGMENTS_FILE = "segments.bin"
+
+STORE_MAGIC = b"SEGSTOR1"
+_HEADER = struct.Struct("<8sQ")
+
+Segment = namedtuple("Segment", "start end text")
+
+
+class SegmentStore:
+    """Append-only columnar segment list; read-only when memory-mapped."""
+
+    def __init__(self):
+        self.starts = array("d")
+        self.ends = array("d")
+        self.offsets = array("Q", [0])
+        self.text = bytearray()
+        self._mmap = None
+
+    @classmethod
+    def from_whisper(cls, segments):
+        """Build a store from Whisper's segment dicts, keeping only start/end/text."""
+        store = cls()
+        for seg in segments:
+            store.append(seg["start"], seg["end"], seg["text"])
+        return store
+
+    def append(self, start, end, text):
+        if self._mmap is not None:
+            raise TypeError("Memory-mapped SegmentStore is read-only")
+        self.starts.append(start)
+        self.ends.append(end)
+        self.text += text.strip().encode("utf-8")
+        self.offsets.append(len(self.text))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text_at(self, i):
+        return bytes(self.text[self.offsets[i]:self.offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return Segment(self.starts[i], self.ends[i], self.text_at(i))
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield Segment(self.starts[i], self.ends[i], self.text_at(i))
+
+    def nbytes(self):
+        """Payload size in bytes (what segments.bin holds after the header)."""
+        return (len(self.starts) + len(self.ends) + len(self.offsets)) * 8 + len(self.text)
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(STORE_MAGIC, len(self)))
+            f.write(memoryview(self.starts).cast("B"))
+            f.write(memoryview(self.ends).cast("B"))
+            f.write(memoryview(self.offsets).cast("B"))
+            f.write(self.text)
+
+    @classmethod
+    def load(cls, path):
+        """Memory-map segments.bin; the arrays are views, nothing is copied."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count = _HEADER.unpack_from(mm)
+        if magic != STORE_MAGIC:
+            mm.close()
+            raise ValueError(f"Not a segment store: {path}")
+
+        view = memoryview(mm)
+        pos = _HEADER.size
+        store = cls.__new__(cls)
+        store.starts = view[pos:pos + 8 * count].cast("d")
+        pos += 8 * count
+        store.ends = view[pos:pos + 8 * count].cast("d")
+        pos += 8 * count
+        store.offsets = view[pos:pos + 8 * (count + 1)].cast("Q")
+        pos += 8 * (count + 1)
+        store.text = view[pos:]
+        store._mmap = mm
+        return store
+
+    def close(self):
+        """Release a memory-mapped store (no-op for in-memory stores)."""
+        if self._mmap is None:
+            return
+        for name in ("starts", "ends", "offsets", "text"):
+            getattr(self, name).release()
+        self._mmap.close()
+        self._mmap = None
+
+
+def _synthetic_whisper_segments(hours):
+    """Segment dicts shaped like whisper's output (~4s per segment)."""
+    segments = []
+    t = 0.0
+    for i in range(int(hours * 3600 / 4)):
+        text = f" Synthetic segment number {i} with roughly a dozen spoken words in it."
+        segments.append({
+            "id": i, "seek": int(t * 100), "start": t, "end": t + 4.0, "text": text,
+            "tokens": list(range(50364 + i % 7, 50364 + i % 7 + 16)),
+            "temperature": 0.0, "avg_logprob": -0.25, "compression_ratio": 1.4,
+            "no_speech_prob": 0.01,
+        })
+        t += 4.0
+    return segments
+
+
+def measure(hours=1.0):
+    """Print traced memory per hour of audio for dict segments vs SegmentStore."""
+    import gc
+    import tracemalloc
+
+    gc.collect()
+    tracemalloc.start()
+    segments = _synthetic_whisper_segments(hours)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    store = SegmentStore.from_whisper(segments)
+    del segments
+    gc.collect()
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    per_hour = 1 / hours
+    print(f"Segments: {len(store):,} ({hours:g} h of audio)")
+    print(f"  Whisper dicts:  {dict_bytes * per_hour / 1024 / 1024:8.2f} MB per hour")
+    print(f"  SegmentStore:   {store_bytes * per_hour / 1024 / 1024:8.2f} MB per hour")
+    print(f"  segments.bin:   {(store.nbytes() + _HEADER.size) * per_hour / 1024 / 1024:8.2f} MB per hour")
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] == "--measure":
+        measure(float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
+        return
+    if len(sys.argv) != 2:
+        print("Usage:")
+        print("  python segment_store.py <video_dir>")
+        print("  python segment_store.py --measure [hours]")
+        sys.exit(1)
+
+    store = SegmentStore.load(Path(sys.argv[1]) / SEGMENTS_FILE)
+    for start, end, text in store:
+        print(f"[{start:.1f}s - {end:.1f}s] {text}")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()